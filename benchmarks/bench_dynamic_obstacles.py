@@ -0,0 +1,112 @@
+"""
+Cost of updating the moving obstacles at each time step.
+
+A set of constant-velocity vessel obstacles is stepped with the legacy update,
+which builds each shapely boundary by rotating and translating the hull polygon,
+kept below as reference, and with DynamicObstacleSet, which transforms all hulls
+in one batch and builds the boundaries on demand. The batched hulls are checked
+to be identical to the reference boundaries, and the update latency is reported
+with and without materialising the boundaries afterwards.
+
+Usage:
+    python benchmarks/bench_dynamic_obstacles.py --obstacles 17 --steps 1000
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+import shapely.geometry
+import shapely.affinity
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.objects.obstacles import BaseObstacle, VesselObstacle
+from gym_auv.objects.motion_models import ConstantVelocity
+from gym_auv.objects.dynamic_obstacles import DynamicObstacleSet
+
+
+def reference_boundary(obstacle):
+    boundary = shapely.geometry.Polygon(obstacle.points)
+    boundary = shapely.affinity.rotate(boundary, obstacle.heading, use_radians=True, origin='centroid')
+    return shapely.affinity.translate(boundary, xoff=obstacle.position[0], yoff=obstacle.position[1])
+
+
+def reference_update(obstacles, dt):
+    for obstacle in obstacles:
+        BaseObstacle.update(obstacle, dt)
+        obstacle._boundary = reference_boundary(obstacle)
+        if not obstacle._boundary.is_valid:
+            obstacle._boundary = obstacle._boundary.buffer(0)
+
+
+def random_obstacles(rng, n_obstacles):
+    obstacles = []
+    for _ in range(n_obstacles):
+        direction = rng.rand()*2*np.pi
+        velocity = rng.uniform(0.5, 5)*np.array([np.cos(direction), np.sin(direction)])
+        motion = ConstantVelocity(rng.uniform(-1000, 1000, size=2), velocity, duration=9999)
+        obstacles.append(VesselObstacle(width=rng.uniform(5, 30), motion=motion))
+    return obstacles
+
+
+def main(args):
+    reference_obstacles = random_obstacles(np.random.RandomState(args.seed), args.obstacles)
+    obstacles = random_obstacles(np.random.RandomState(args.seed), args.obstacles)
+    dynamic_obstacles = DynamicObstacleSet(obstacles)
+
+    n_mismatches = 0
+    reference_duration = batch_duration = materialise_duration = 0
+    for _ in range(args.steps):
+        start = perf_counter()
+        reference_update(reference_obstacles, args.dt)
+        reference_duration += perf_counter() - start
+
+        start = perf_counter()
+        dynamic_obstacles.update(args.dt)
+        batch_duration += perf_counter() - start
+
+        start = perf_counter()
+        boundaries = [obstacle.boundary for obstacle in obstacles]
+        materialise_duration += perf_counter() - start
+
+        n_mismatches += sum(
+            not boundary.equals_exact(reference.boundary, 0) for boundary, reference in zip(boundaries, reference_obstacles)
+        )
+
+    print('Obstacles: {}, steps: {}, boundary mismatches: {}'.format(args.obstacles, args.steps, n_mismatches))
+    print('{:<40}{:>16}'.format('Implementation', 'ms/step'))
+    print('{:<40}{:>16.3f}'.format('Per-obstacle shapely update', 1e3*reference_duration/args.steps))
+    print('{:<40}{:>16.3f}'.format('DynamicObstacleSet', 1e3*batch_duration/args.steps))
+    print('{:<40}{:>16.3f}'.format('DynamicObstacleSet + all boundaries', 1e3*(batch_duration + materialise_duration)/args.steps))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--obstacles',
+        help='Number of moving obstacles.',
+        type=int,
+        default=17
+    )
+    parser.add_argument(
+        '--steps',
+        help='Number of time steps.',
+        type=int,
+        default=1000
+    )
+    parser.add_argument(
+        '--dt',
+        help='Time step [s].',
+        type=float,
+        default=1.0
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the obstacle generation.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,89 @@
+"""
+Cost of storing and collecting the episode statistics during training.
+
+Episodes are appended both to the dict of arrays grown with np.append, as
+previously done by BaseEnvironment.save_latest_episode, and to EpisodeStatistics.
+At every episode, the bytes sent from a training subprocess are measured as the
+pickled size of the whole history, previously fetched with get_attr('history'),
+and of the new rows returned by read_new(), as fetched with
+env_method('read_new_statistics').
+
+Usage:
+    python benchmarks/bench_episode_statistics.py --episodes 1000 10000 100000
+"""
+import os
+import sys
+import pickle
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.utils.episode_statistics import EpisodeStatistics
+
+COLUMNS = [
+    "cross_track_error",
+    "reached_goal",
+    "collision",
+    "reward",
+    "timesteps",
+    "duration",
+    "progress",
+    "pathlength",
+]
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+
+    header = '{:>12}{:>18}{:>18}{:>18}{:>18}{:>8}'.format(
+        'Episodes', 'np.append [us]', 'Chunked [us]', 'get_attr [B]', 'read_new [B]', 'Equal'
+    )
+    print(header)
+    print('-'*len(header))
+    for n_episodes in args.episodes:
+        history = dict.fromkeys(COLUMNS, np.array([]))
+        statistics = EpisodeStatistics(COLUMNS)
+        append_duration = chunked_duration = 0
+        for _ in range(n_episodes):
+            stats = dict(zip(COLUMNS, rng.uniform(size=len(COLUMNS))))
+            start = perf_counter()
+            for key in history.keys():
+                history[key] = np.append(history[key], stats[key])
+            append_duration += perf_counter() - start
+            start = perf_counter()
+            statistics.append(stats)
+            chunked_duration += perf_counter() - start
+
+        # The delta is measured for one episode completed after the previous read
+        full_bytes = len(pickle.dumps(history))
+        statistics.read_new()
+        statistics.append(stats)
+        delta_bytes = len(pickle.dumps(statistics.read_new()))
+        equal = all(np.array_equal(history[key], statistics[key][:-1]) for key in COLUMNS)
+
+        print('{:>12}{:>18.2f}{:>18.2f}{:>18}{:>18}{:>8}'.format(
+            n_episodes, 1e6*append_duration/n_episodes, 1e6*chunked_duration/n_episodes,
+            full_bytes, delta_bytes, str(equal)
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--episodes',
+        help='Numbers of episodes to test.',
+        type=int,
+        nargs='*',
+        default=[1000, 10000, 100000]
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the random statistics.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,142 @@
+"""
+Equivalence check and speed comparison of the vectorised feasibility pooling.
+
+Random sensor arrays are drawn from a number of distributions, including arrays
+with ties, zeros and values placed exactly at the survival thresholds, and the
+output of the vectorised implementations in gym_auv.objects.vessel is compared
+to the original loop based implementation, which is kept below as reference.
+
+Usage:
+    python benchmarks/bench_feasibility_pooling.py --cases 20000
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.objects.vessel import _feasibility_pooling, _sector_feasibility_pooling
+
+
+def reference_feasibility_pooling(x, width, theta):
+    N_sensors = x.shape[0]
+    sort_idx = np.argsort(x)
+    for idx in sort_idx:
+        surviving = x > x[idx] + width
+        d = x[idx]*theta
+        opening_width = 0
+        opening_span = 0
+        opening_start = -theta*(N_sensors-1)/2
+        found_opening = False
+        for isensor, sensor_survives in enumerate(surviving):
+            if sensor_survives:
+                opening_width += d
+                opening_span += theta
+                if opening_width > width:
+                    opening_center = opening_start + opening_span/2
+                    if abs(opening_center) < theta*(N_sensors-1)/4:
+                        found_opening = True
+            else:
+                opening_width += 0.5*d
+                opening_span += 0.5*theta
+                if opening_width > width:
+                    opening_center = opening_start + opening_span/2
+                    if abs(opening_center) < theta*(N_sensors-1)/4:
+                        found_opening = True
+                opening_width = 0
+                opening_span = 0
+                opening_start = -theta*(N_sensors-1)/2 + isensor*theta
+
+        if not found_opening:
+            return max(0, x[idx])
+
+    return max(0, np.max(x))
+
+
+def random_sensor_array(rng, n_sensors, sensor_range, width):
+    kind = rng.randint(5)
+    if kind == 0:
+        x = rng.uniform(0, sensor_range, size=n_sensors)
+    elif kind == 1:
+        # Few distinct values, giving many ties
+        x = rng.choice(rng.uniform(0, sensor_range, size=3), size=n_sensors)
+    elif kind == 2:
+        # Mostly free sensors with a blocked gap
+        x = np.full(n_sensors, sensor_range)
+        start = rng.randint(n_sensors)
+        x[start:start + rng.randint(1, n_sensors + 1)] = rng.uniform(0, sensor_range)
+    elif kind == 3:
+        # Values exactly at the survival thresholds of each other
+        x = rng.randint(0, 8, size=n_sensors)*width
+    else:
+        x = np.where(rng.rand(n_sensors) < 0.3, 0.0, rng.exponential(sensor_range/4, size=n_sensors))
+    return x.astype(np.float64)
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+
+    n_mismatches = 0
+    for _ in range(args.cases):
+        n_sensors = rng.randint(1, 61)
+        width = rng.choice([rng.uniform(0.1, 50), 20.0])
+        theta = rng.choice([rng.uniform(0.001, 0.2), 2*np.pi/180])
+        x = random_sensor_array(rng, n_sensors, 150.0, width)
+        expected = reference_feasibility_pooling(x, width, theta)
+        result = _feasibility_pooling(x, width, theta)
+        if result != expected:
+            n_mismatches += 1
+            print('Mismatch: expected {}, got {} for x={}, width={}, theta={}'.format(expected, result, list(x), width, theta))
+
+    # Comparing the sector-batched version on the default sensor layout
+    sector_start_indeces = [0, 54, 69, 79, 87, 95, 104, 114, 129]
+    n_sensors, width, theta = 180, 20.0, 2*np.pi/180
+    batch = np.array([random_sensor_array(rng, n_sensors, 150.0, width) for _ in range(args.batch)])
+    sector_bounds = sector_start_indeces + [n_sensors]
+
+    start = perf_counter()
+    expected = np.array([
+        [reference_feasibility_pooling(x[a:b], width, theta) for a, b in zip(sector_bounds[:-1], sector_bounds[1:])]
+        for x in batch
+    ])
+    reference_duration = perf_counter() - start
+    start = perf_counter()
+    single = np.array([_sector_feasibility_pooling(x, sector_start_indeces, width, theta) for x in batch])
+    single_duration = perf_counter() - start
+    start = perf_counter()
+    batched = _sector_feasibility_pooling(batch, sector_start_indeces, width, theta)
+    batched_duration = perf_counter() - start
+    n_mismatches += np.sum(expected != single) + np.sum(expected != batched)
+
+    print('Random cases: {}, mismatches: {}'.format(args.cases, n_mismatches))
+    print('{:<40}{:>16}'.format('Implementation', 'us/vessel'))
+    print('{:<40}{:>16.1f}'.format('Reference loop, per sector', 1e6*reference_duration/args.batch))
+    print('{:<40}{:>16.1f}'.format('Vectorised, all sectors of one vessel', 1e6*single_duration/args.batch))
+    print('{:<40}{:>16.1f}'.format('Vectorised, batch of {} vessels'.format(args.batch), 1e6*batched_duration/args.batch))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--cases',
+        help='Number of random sensor arrays to check.',
+        type=int,
+        default=20000
+    )
+    parser.add_argument(
+        '--batch',
+        help='Number of vessels in the timed batch.',
+        type=int,
+        default=256
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the random sensor arrays.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,115 @@
+"""
+Accuracy vs. speed benchmark for the vessel integrators.
+
+For every scenario, the vessel's initial state is taken from a freshly
+generated episode, and the same sequence of random actions is simulated
+with each integrator. The resulting trajectories are compared against the
+trajectory obtained with the (slow, but accurate) BDF reference integrator.
+
+Usage:
+    python benchmarks/bench_integrators.py --scenarios TestScenario1-v0 MovingObstaclesNoRules-v0 --steps 500
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import gym_auv
+import gym_auv.envs
+import gym_auv.utils.integrators as integrators
+from gym_auv.objects.vessel import Vessel
+
+DEFAULT_SCENARIOS = [
+    'TestScenario1-v0',
+    'TestScenario2-v0',
+    'TestHeadOn-v0',
+    'TestCrossing-v0',
+    'MovingObstaclesNoRules-v0',
+]
+
+
+def initial_state(env_id, seed):
+    """Returns the initial vessel attitude [x, y, psi] of the given scenario."""
+    env_name = env_id.split(':')[-1]
+    config = gym_auv.SCENARIOS[env_name]['config'].copy()
+    env_class = getattr(gym_auv.envs, gym_auv.SCENARIOS[env_name]['entry_point'].split(':')[-1])
+    env = env_class(config, render_mode=None)
+    env.seed(seed)
+    env.reset()
+    state = np.hstack([env.vessel.position, env.vessel.heading])
+    env.close()
+    return config, state
+
+
+def simulate(config, init_state, actions, integrator, n_substeps):
+    config = config.copy()
+    config['integrator'] = integrator
+    config['integrator_substeps'] = n_substeps
+    vessel = Vessel(config, init_state, width=config['vessel_width'])
+    start = perf_counter()
+    for action in actions:
+        vessel.step(action)
+    duration = perf_counter() - start
+    return vessel.path_taken.copy(), duration
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    actions = rng.uniform(-1, 1, size=(args.steps, 2))
+
+    header = '{:<28}{:<22}{:>10}{:>16}{:>16}{:>12}'.format(
+        'Scenario', 'Integrator', 'Substeps', 'Max error [m]', 'Final err. [m]', 'us/step'
+    )
+    print(header)
+    print('-'*len(header))
+    for env_id in args.scenarios:
+        config, init_state = initial_state(env_id, args.seed)
+        reference, ref_duration = simulate(config, init_state, actions, 'bdf', 1)
+        print('{:<28}{:<22}{:>10}{:>16}{:>16}{:>12.1f}'.format(
+            env_id, 'bdf', 1, '-', '-', 1e6*ref_duration/args.steps
+        ))
+        for name in integrators.INTEGRATORS:
+            if name == 'bdf':
+                continue
+            for n_substeps in args.substeps:
+                with np.errstate(all='ignore'):
+                    trajectory, duration = simulate(config, init_state, actions, name, n_substeps)
+                    errors = np.linalg.norm(trajectory - reference, axis=1)
+                print('{:<28}{:<22}{:>10}{:>16.4f}{:>16.4f}{:>12.1f}'.format(
+                    env_id, name, n_substeps, np.max(errors), errors[-1], 1e6*duration/args.steps
+                ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--scenarios',
+        help='Scenarios to take the initial vessel states from.',
+        nargs='*',
+        default=DEFAULT_SCENARIOS
+    )
+    parser.add_argument(
+        '--steps',
+        help='Number of timesteps to simulate.',
+        type=int,
+        default=500
+    )
+    parser.add_argument(
+        '--substeps',
+        help='Number of integrator substeps to test.',
+        type=int,
+        nargs='*',
+        default=[1, 2, 4]
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the scenario generation and the action sequence.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
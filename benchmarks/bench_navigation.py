@@ -0,0 +1,133 @@
+"""
+Equivalence check and cost of the batched navigation states.
+
+The legacy Vessel.navigate, which computed the navigation states of a single
+vessel with scalar code, is kept below as reference. Vessel states scattered
+around random paths of the moving-obstacle scenarios are navigated one by one
+with the reference, and with compute_navigation for one vessel at a time, as
+Vessel.navigate now does, and for all vessels in one call. The largest
+deviation of the navigation features from the reference is reported, along
+with the cost per vessel, also with extra look-ahead distances.
+
+Usage:
+    python benchmarks/bench_navigation.py --vessels 64 --steps 50
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+import numpy.linalg as linalg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import gym_auv.utils.geomutils as geom
+from gym_auv.objects.path import RandomCurveThroughOrigin
+from gym_auv.objects.navigation import NAVIGATION_FEATURES, compute_navigation
+
+
+def reference_navigate(path, state, look_ahead_distance):
+    position, heading = state[0:2], state[2]
+    vessel_arclength = path.get_closest_arclength(position)
+    path_direction = path.get_direction(vessel_arclength)
+    cross_track_error = geom.Rzyx(0, 0, -path_direction).dot(
+        np.hstack([path(vessel_arclength) - position, 0])
+    )[1]
+    target_arclength = min(path.length, vessel_arclength + look_ahead_distance)
+    look_ahead_path_direction = path.get_direction(target_arclength)
+    look_ahead_heading_error = float(geom.princip(look_ahead_path_direction - heading))
+    target_vector = path(target_arclength) - position
+    target_heading = np.arctan2(target_vector[1], target_vector[0])
+    heading_error = float(geom.princip(target_heading - heading))
+    linalg.norm(path.end - position)
+    navi_state_dict = {
+        'surge_velocity': state[3],
+        'sway_velocity': state[4],
+        'yaw_rate': state[5],
+        'look_ahead_heading_error': look_ahead_heading_error,
+        'heading_error': heading_error,
+        'cross_track_error': cross_track_error/100,
+    }
+    return np.array([navi_state_dict[state] for state in NAVIGATION_FEATURES])[np.newaxis, :]
+
+
+def random_states(rng, path, n_vessels):
+    arclengths = rng.uniform(0, path.length, size=n_vessels)
+    states = np.zeros((n_vessels, 6))
+    states[:, 0:2] = np.transpose(path(arclengths)) + rng.normal(0, 20, size=(n_vessels, 2))
+    states[:, 2] = rng.uniform(-np.pi, np.pi, size=n_vessels)
+    states[:, 3:6] = rng.normal(0, 1, size=(n_vessels, 3))
+    return states
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    paths = [RandomCurveThroughOrigin(rng, rng.randint(2, 10), length=800) for _ in range(args.steps)]
+    states = [random_states(rng, path, args.vessels) for path in paths]
+    n_queries = args.steps*args.vessels
+
+    start = perf_counter()
+    reference = [np.vstack([reference_navigate(path, state, args.look_ahead) for state in step_states]) for path, step_states in zip(paths, states)]
+    reference_duration = perf_counter() - start
+
+    start = perf_counter()
+    single = [np.vstack([compute_navigation(path, state, args.look_ahead)[0] for state in step_states]) for path, step_states in zip(paths, states)]
+    single_duration = perf_counter() - start
+
+    out = np.empty((args.vessels, len(NAVIGATION_FEATURES)))
+    start = perf_counter()
+    batch = [compute_navigation(path, step_states, args.look_ahead, out=out)[0].copy() for path, step_states in zip(paths, states)]
+    batch_duration = perf_counter() - start
+
+    extra_look_aheads = tuple(args.look_ahead*np.arange(2, 2 + args.extra_look_aheads)/2)
+    start = perf_counter()
+    extra = [compute_navigation(path, step_states, args.look_ahead, extra_look_aheads)[0] for path, step_states in zip(paths, states)]
+    extra_duration = perf_counter() - start
+
+    reference, single, batch, extra = np.vstack(reference), np.vstack(single), np.vstack(batch), np.vstack(extra)
+    print('Vessels: {}, steps: {}'.format(args.vessels, args.steps))
+    print('Max deviation per feature, single: {}'.format(np.abs(single - reference).max(axis=0)))
+    print('Max deviation per feature, batch:  {}'.format(np.abs(batch - reference).max(axis=0)))
+    print('Extra look-ahead columns equal to batch: {}'.format(np.array_equal(extra[:, :len(NAVIGATION_FEATURES)], batch)))
+    print('{:<48}{:>16}'.format('Implementation', 'us/vessel'))
+    print('{:<48}{:>16.1f}'.format('Scalar navigate (reference)', 1e6*reference_duration/n_queries))
+    print('{:<48}{:>16.1f}'.format('compute_navigation, one vessel per call', 1e6*single_duration/n_queries))
+    print('{:<48}{:>16.1f}'.format('compute_navigation, {} vessels per call'.format(args.vessels), 1e6*batch_duration/n_queries))
+    print('{:<48}{:>16.1f}'.format('  + {} extra look-ahead distances'.format(args.extra_look_aheads), 1e6*extra_duration/n_queries))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--vessels',
+        help='Number of vessels per path.',
+        type=int,
+        default=64
+    )
+    parser.add_argument(
+        '--steps',
+        help='Number of random paths, each navigated by all vessels.',
+        type=int,
+        default=50
+    )
+    parser.add_argument(
+        '--look-ahead',
+        help='Path look-ahead distance [m].',
+        type=float,
+        default=150
+    )
+    parser.add_argument(
+        '--extra-look-aheads',
+        help='Number of extra look-ahead distances.',
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the paths and vessel states.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
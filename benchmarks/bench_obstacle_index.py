@@ -0,0 +1,119 @@
+"""
+Query latency benchmark for the nearby-obstacle lookup.
+
+Random obstacle fields of growing size are generated, consisting of static
+polygons and moving vessels. For each field, the obstacles within sensor range
+of random query points are found both with the linear scan previously used by
+Vessel.perceive and with ObstacleIndex, and the results are checked to be equal.
+The moving vessels are stepped between queries, so the ObstacleIndex timings
+include its incremental updates.
+
+Usage:
+    python benchmarks/bench_obstacle_index.py --counts 100 1000 10000 --queries 200
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+import shapely.geometry
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.objects.obstacles import PolygonObstacle, VesselObstacle
+from gym_auv.objects.obstacle_index import ObstacleIndex
+
+
+def random_obstacles(rng, n_static, n_dynamic, extent):
+    obstacles = []
+    for _ in range(n_static):
+        center = rng.uniform(-extent, extent, size=2)
+        n_vertices = rng.randint(5, 30)
+        angles = np.sort(rng.uniform(0, 2*np.pi, size=n_vertices))
+        radii = rng.uniform(5, 40, size=n_vertices)
+        points = center + np.column_stack([radii*np.cos(angles), radii*np.sin(angles)])
+        obstacles.append(PolygonObstacle(points))
+    for _ in range(n_dynamic):
+        start = rng.uniform(-extent, extent, size=2)
+        end = start + rng.uniform(-500, 500, size=2)
+        obstacles.append(VesselObstacle(width=rng.uniform(5, 30), trajectory=[(0, tuple(start)), (500, tuple(end))]))
+    return obstacles
+
+
+def linear_scan(obstacles, point, distance):
+    return [obst for obst in obstacles if float(point.distance(obst.boundary)) < distance]
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+
+    header = '{:>10}{:>10}{:>14}{:>16}{:>16}{:>10}'.format(
+        'Static', 'Dynamic', 'Build [ms]', 'Linear [ms/q]', 'Index [ms/q]', 'Equal'
+    )
+    print(header)
+    print('-'*len(header))
+    for n_static in args.counts:
+        extent = 100*np.sqrt(n_static)
+        obstacles = random_obstacles(rng, n_static, args.dynamic, extent)
+        points = [shapely.geometry.Point(*p) for p in rng.uniform(-extent, extent, size=(args.queries, 2))]
+
+        start = perf_counter()
+        index = ObstacleIndex(obstacles, cell_size=args.distance)
+        build_duration = perf_counter() - start
+
+        linear_duration = index_duration = 0
+        equal = True
+        for point in points:
+            for obst in obstacles:
+                if not obst.static:
+                    obst.update(dt=1.0)
+            start = perf_counter()
+            expected = linear_scan(obstacles, point, args.distance)
+            linear_duration += perf_counter() - start
+            start = perf_counter()
+            result = index.query(point, args.distance)
+            index_duration += perf_counter() - start
+            equal = equal and result == expected
+
+        print('{:>10}{:>10}{:>14.2f}{:>16.3f}{:>16.3f}{:>10}'.format(
+            n_static, args.dynamic, 1e3*build_duration, 1e3*linear_duration/args.queries,
+            1e3*index_duration/args.queries, str(equal)
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--counts',
+        help='Numbers of static obstacles to test.',
+        type=int,
+        nargs='*',
+        default=[100, 1000, 5000, 20000]
+    )
+    parser.add_argument(
+        '--dynamic',
+        help='Number of moving vessel obstacles.',
+        type=int,
+        default=20
+    )
+    parser.add_argument(
+        '--queries',
+        help='Number of queries for each obstacle count.',
+        type=int,
+        default=200
+    )
+    parser.add_argument(
+        '--distance',
+        help='Query distance, i.e. the sensor range [m].',
+        type=float,
+        default=150.0
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the obstacle generation.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,73 @@
+"""
+Construction cost of Path.
+
+The fixed paths of the test and real-world scenarios are built from scratch,
+as previously done on every reset, and fetched with Path.cached, as now done
+by these scenarios. The random paths of the moving-obstacle scenarios, which
+are built on every reset, are timed as well, with and without materialising
+the shapely LineString, which is now only built on demand.
+
+Usage:
+    python benchmarks/bench_path_construction.py --repeats 20
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.objects.path import Path, RandomCurveThroughOrigin
+
+FIXED_PATHS = {
+    'TestScenario1': [[0, 1100], [0, 1100]],
+    'TestHeadOn': [[0, 0], [0, 250]],
+    'Sorbuoya': [[1000, 830, 700, 960, 1080, 1125], [910, 800, 700, 550, 750, 810]],
+    'Trondheim': [[520, 1070, 4080, 5473, 10170, 12220], [3330, 5740, 7110, 4560, 7360, 11390]],
+}
+
+
+def time_construction(build, n_repeats):
+    start = perf_counter()
+    for _ in range(n_repeats):
+        build()
+    return (perf_counter() - start)/n_repeats
+
+
+def main(args):
+    header = '{:<28}{:>16}{:>16}{:>16}'.format('Path', 'Build [ms]', 'Cached [ms]', '+ LineString')
+    print(header)
+    print('-'*len(header))
+    for name, waypoints in FIXED_PATHS.items():
+        build_duration = time_construction(lambda: Path(waypoints), args.repeats)
+        Path.cached(waypoints)
+        cached_duration = time_construction(lambda: Path.cached(waypoints), args.repeats)
+        linestring_duration = time_construction(lambda: Path(waypoints).linestring, args.repeats)
+        print('{:<28}{:>16.2f}{:>16.4f}{:>16.2f}'.format(
+            name, 1e3*build_duration, 1e3*cached_duration, 1e3*linestring_duration
+        ))
+
+    rng = np.random.RandomState(args.seed)
+    build_duration = time_construction(lambda: RandomCurveThroughOrigin(rng, rng.randint(2, 10), length=800), args.repeats)
+    linestring_duration = time_construction(lambda: RandomCurveThroughOrigin(rng, rng.randint(2, 10), length=800).linestring, args.repeats)
+    print('{:<28}{:>16.2f}{:>16}{:>16.2f}'.format('RandomCurveThroughOrigin', 1e3*build_duration, 'n/a', 1e3*linestring_duration))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--repeats',
+        help='Number of constructions timed for each path.',
+        type=int,
+        default=20
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the random paths.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
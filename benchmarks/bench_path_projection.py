@@ -0,0 +1,115 @@
+"""
+Equivalence check and latency of the closest-point projection onto a Path.
+
+Path.get_closest_arclength, which searches the path segments near the position
+with a KD-tree, or within a window around the arclength of the previous step
+when given as hint, is compared to LineString.project of the sampled path, as
+previously used. Random positions around random paths of the moving-obstacle
+scenarios and around the 12 km path of the Trondheim scenario are projected
+globally, and noisy positions along each path are projected in sequence with
+the previous arclength as hint, as done by Vessel.navigate. The random
+positions are also projected in one call to Path.get_closest_arclengths, as
+done by compute_navigation for several vessels, and counted as mismatches if
+they differ from the reference.
+
+Usage:
+    python benchmarks/bench_path_projection.py --queries 2000
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+import shapely.geometry
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.objects.path import Path, RandomCurveThroughOrigin
+
+
+def reference_closest_arclength(path, position):
+    return path.linestring.project(shapely.geometry.Point(position))
+
+
+def hinted_closest_arclengths(path, positions):
+    arclengths = []
+    arclength = None
+    for position in positions:
+        arclength = path.get_closest_arclength(position, arclength)
+        arclengths.append(arclength)
+    return arclengths
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    paths = [('RandomCurveThroughOrigin', RandomCurveThroughOrigin(rng, rng.randint(2, 10), length=800)) for _ in range(args.paths)]
+    paths.append(('Trondheim', Path([[520, 1070, 4080, 5473, 10170, 12220], [3330, 5740, 7110, 4560, 7360, 11390]])))
+
+    header = '{:<28}{:>10}{:>12}{:>12}{:>14}{:>14}{:>14}{:>14}'.format(
+        'Path', 'Points', 'Mismatches', 'Hinted', 'Shapely [us]', 'Global [us]', 'Batch [us]', 'Hinted [us]'
+    )
+    print(header)
+    print('-'*len(header))
+    for name, path in paths:
+        margin = 0.25*np.ptp(path._points, axis=0).max()
+        positions = rng.uniform(path._points.min(axis=0) - margin, path._points.max(axis=0) + margin, size=(args.queries, 2))
+        trajectory = np.transpose(path(np.linspace(0, path.length, args.queries)))
+        trajectory += rng.normal(0, args.noise, size=trajectory.shape)
+
+        path.get_closest_arclength(positions[0])
+        start = perf_counter()
+        reference = [reference_closest_arclength(path, position) for position in positions]
+        reference_duration = perf_counter() - start
+        start = perf_counter()
+        arclengths = [path.get_closest_arclength(position) for position in positions]
+        global_duration = perf_counter() - start
+        start = perf_counter()
+        batch = path.get_closest_arclengths(positions)
+        batch_duration = perf_counter() - start
+
+        reference_trajectory = [reference_closest_arclength(path, position) for position in trajectory]
+        start = perf_counter()
+        hinted = hinted_closest_arclengths(path, trajectory)
+        hinted_duration = perf_counter() - start
+
+        print('{:<28}{:>10}{:>12}{:>12}{:>14.1f}{:>14.1f}{:>14.1f}{:>14.1f}'.format(
+            name,
+            len(path._points),
+            sum(a != b for a, b in zip(arclengths, reference)) + sum(a != b for a, b in zip(batch, reference)),
+            sum(a != b for a, b in zip(hinted, reference_trajectory)),
+            1e6*reference_duration/args.queries,
+            1e6*global_duration/args.queries,
+            1e6*batch_duration/args.queries,
+            1e6*hinted_duration/args.queries
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--queries',
+        help='Number of positions projected onto each path.',
+        type=int,
+        default=2000
+    )
+    parser.add_argument(
+        '--paths',
+        help='Number of random paths.',
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        '--noise',
+        help='Standard deviation [m] of the positions along the paths projected with hints.',
+        type=float,
+        default=5.0
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the paths and positions.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,112 @@
+"""
+Accuracy and latency of the Path sample tables.
+
+For random paths of the moving-obstacle scenarios and the 12 km path of the
+Trondheim scenario, a sample table is built at each given resolution and the
+largest deviations of the interpolated position, direction and curvature from
+the spline are measured at random arclengths. The latency of a scalar lookup,
+as done by Vessel.navigate, and of a batch of arclengths is compared to the
+evaluation of the spline.
+
+Usage:
+    python benchmarks/bench_path_table.py --resolutions 0.1 0.5 1.0
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import gym_auv.utils.geomutils as geom
+from gym_auv.objects.path import Path, RandomCurveThroughOrigin
+
+
+def time_call(fun, arclengths):
+    start = perf_counter()
+    for arclength in arclengths:
+        fun(arclength)
+    return (perf_counter() - start)/len(arclengths)
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    paths = [('RandomCurveThroughOrigin', RandomCurveThroughOrigin(rng, rng.randint(2, 10), length=800)) for _ in range(args.paths)]
+    paths.append(('Trondheim', Path([[520, 1070, 4080, 5473, 10170, 12220], [3330, 5740, 7110, 4560, 7360, 11390]])))
+
+    header = '{:<28}{:>8}{:>12}{:>16}{:>16}{:>16}'.format(
+        'Path', 'h [m]', 'Build [ms]', 'Position [m]', 'Direction [rad]', 'Curvature [1/m]'
+    )
+    print(header)
+    print('-'*len(header))
+    for name, path in paths:
+        arclengths = rng.uniform(0, path.length, size=args.queries)
+        for resolution in args.resolutions:
+            start = perf_counter()
+            path.build_sample_table(resolution)
+            build_duration = perf_counter() - start
+            position_error = np.sqrt(np.sum((path.lookup_position(arclengths) - path(arclengths))**2, axis=0)).max()
+            direction_error = np.abs(geom.princip(path.lookup_direction(arclengths) - path.get_direction(arclengths))).max()
+            curvature_error = np.abs(path.lookup_curvature(arclengths) - path.get_curvature(arclengths)).max()
+            print('{:<28}{:>8.2f}{:>12.2f}{:>16.2e}{:>16.2e}{:>16.2e}'.format(
+                name, resolution, 1e3*build_duration, position_error, direction_error, curvature_error
+            ))
+
+    print()
+    header = '{:<28}{:>16}{:>16}'.format('Evaluation', 'Spline [us]', 'Table [us]')
+    print(header)
+    print('-'*len(header))
+    path = paths[-1][1]
+    arclengths = rng.uniform(0, path.length, size=args.queries)
+    print('{:<28}{:>16.2f}{:>16.2f}'.format(
+        'Scalar position', 1e6*time_call(path, arclengths), 1e6*time_call(path.lookup_position, arclengths)
+    ))
+    print('{:<28}{:>16.2f}{:>16.2f}'.format(
+        'Scalar direction', 1e6*time_call(path.get_direction, arclengths), 1e6*time_call(path.lookup_direction, arclengths)
+    ))
+    batches = np.split(arclengths, args.queries//args.batch_size)
+    print('{:<28}{:>16.2f}{:>16.2f}'.format(
+        'Batch of {} positions'.format(args.batch_size), 1e6*time_call(path, batches), 1e6*time_call(path.lookup_position, batches)
+    ))
+    print('{:<28}{:>16.2f}{:>16.2f}'.format(
+        'Batch of {} directions'.format(args.batch_size), 1e6*time_call(path.get_direction, batches), 1e6*time_call(path.lookup_direction, batches)
+    ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--resolutions',
+        help='Arclength spacings [m] of the sample tables.',
+        type=float,
+        nargs='+',
+        default=[0.1, 0.5, 1.0]
+    )
+    parser.add_argument(
+        '--queries',
+        help='Number of random arclengths evaluated on each path.',
+        type=int,
+        default=10000
+    )
+    parser.add_argument(
+        '--batch-size',
+        help='Number of arclengths per batch evaluation.',
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        '--paths',
+        help='Number of random paths.',
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the paths and arclengths.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,111 @@
+"""
+Accuracy and speed comparison of the rangefinder simulation engines.
+
+For every scenario, random actions are simulated and, at each timestep, the full
+sensor suite is simulated against the vessel's nearby obstacles using both the
+shapely based _simulate_sensor and the vectorised _simulate_sensors.
+
+Usage:
+    python benchmarks/bench_raycast.py --scenarios TestScenario2-v0 MovingObstaclesColreg-v0 --steps 100
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+import shapely.geometry
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import gym_auv
+import gym_auv.envs
+from gym_auv.objects.vessel import _simulate_sensor, _simulate_sensors
+
+DEFAULT_SCENARIOS = [
+    'TestScenario1-v0',
+    'TestScenario2-v0',
+    'TestCrossing-v0',
+    'MovingObstaclesNoRules-v0',
+    'MovingObstaclesColreg-v0',
+]
+
+
+def make_env(env_id, seed):
+    env_name = env_id.split(':')[-1]
+    config = gym_auv.SCENARIOS[env_name]['config'].copy()
+    env_class = getattr(gym_auv.envs, gym_auv.SCENARIOS[env_name]['entry_point'].split(':')[-1])
+    env = env_class(config, render_mode=None)
+    env.seed(seed)
+    env.reset()
+    return env
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+
+    header = '{:<28}{:>12}{:>16}{:>16}{:>12}{:>14}{:>14}'.format(
+        'Scenario', 'Segments', 'Max dist. err.', 'Max speed err.', 'Mismatch', 'shapely [ms]', 'numpy [ms]'
+    )
+    print(header)
+    print('-'*len(header))
+    for env_id in args.scenarios:
+        env = make_env(env_id, args.seed)
+        sensor_range = env.config["sensor_range"]
+        max_dist_error = max_speed_error = 0
+        n_mismatches = n_segments = n_evaluations = 0
+        shapely_duration = numpy_duration = 0
+        for _ in range(args.steps):
+            _, _, done, _ = env.step(rng.uniform(-1, 1, size=2))
+            if done:
+                env.reset()
+            obstacles = env.vessel._nearby_obstacles
+            if not obstacles:
+                continue
+            angles = env.vessel.sensor_angles + env.vessel.heading
+            p0_point = shapely.geometry.Point(*env.vessel.position)
+
+            start = perf_counter()
+            reference = [_simulate_sensor(angle, p0_point, sensor_range, obstacles) for angle in angles]
+            shapely_duration += perf_counter() - start
+            start = perf_counter()
+            distances, speeds, blocked = _simulate_sensors(angles, env.vessel.position, sensor_range, obstacles)
+            numpy_duration += perf_counter() - start
+
+            ref_distances, ref_speeds, ref_blocked = zip(*reference)
+            max_dist_error = max(max_dist_error, np.max(np.abs(np.array(ref_distances) - distances)))
+            max_speed_error = max(max_speed_error, np.max(np.abs(np.array(ref_speeds, dtype=float) - speeds)))
+            n_mismatches += np.sum(np.array(ref_blocked) != blocked)
+            n_segments += sum(len(obst.segments) for obst in obstacles)
+            n_evaluations += 1
+        env.close()
+
+        n_evaluations = max(1, n_evaluations)
+        print('{:<28}{:>12.0f}{:>16.2e}{:>16.2e}{:>12}{:>14.2f}{:>14.2f}'.format(
+            env_id, n_segments/n_evaluations, max_dist_error, max_speed_error, n_mismatches,
+            1e3*shapely_duration/n_evaluations, 1e3*numpy_duration/n_evaluations
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--scenarios',
+        help='Scenarios to simulate.',
+        nargs='*',
+        default=DEFAULT_SCENARIOS
+    )
+    parser.add_argument(
+        '--steps',
+        help='Number of timesteps to simulate for each scenario.',
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the scenario generation and the action sequence.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,113 @@
+"""
+Reset latency of the real-world scenarios.
+
+For every scenario, the time spent on its static obstacles at reset is measured
+when building them from the perimeters, as previously done by every reset, when
+loading them from the WKB disk cache, as done by the first reset of a new
+process, and when reusing the obstacles already built in the process. The
+built and cached obstacles are checked to have equal boundaries. If the
+scenario's terrain and AIS data files are available, the mean latency of a full
+env.reset() is reported as well.
+
+Usage:
+    python benchmarks/bench_realworld_reset.py --resets 10
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import gym_auv
+import gym_auv.envs
+import gym_auv.utils.scenario_assets as scenario_assets
+from gym_auv.objects.obstacles import PolygonObstacle
+
+SCENARIO_OBSTACLES = {
+    'Sorbuoya-v0': 'resources/obstacles_sorbuoya.npy',
+    'Agdenes-v0': 'resources/obstacles_entrance.npy',
+    'Trondheim-v0': 'resources/obstacles_trondheim.npy',
+    'Trondheimsfjorden-v0': 'resources/obstacles_trondheimsfjorden.npy',
+    'FilmScenario-v0': None,
+}
+
+
+def time_env_reset(env_id, n_resets, seed):
+    config = gym_auv.SCENARIOS[env_id]['config'].copy()
+    env_class = getattr(gym_auv.envs, gym_auv.SCENARIOS[env_id]['entry_point'].split(':')[-1])
+    try:
+        env = env_class(config, render_mode=None)
+    except FileNotFoundError:
+        return None
+    env.seed(seed)
+    start = perf_counter()
+    for _ in range(n_resets):
+        env.reset()
+    duration = perf_counter() - start
+    env.close()
+    return duration/n_resets
+
+
+def main(args):
+    header = '{:<24}{:>10}{:>14}{:>14}{:>14}{:>8}{:>14}'.format(
+        'Scenario', 'Obstacles', 'Build [ms]', 'WKB [ms]', 'Reuse [ms]', 'Equal', 'Reset [ms]'
+    )
+    print(header)
+    print('-'*len(header))
+    for env_id, obstacle_path in SCENARIO_OBSTACLES.items():
+        n_obstacles = build_duration = wkb_duration = reuse_duration = None
+        equal = None
+        if obstacle_path is not None and os.path.isfile(obstacle_path):
+            perimeters = scenario_assets.load_obstacle_perimeters(obstacle_path)
+            start = perf_counter()
+            built = [PolygonObstacle(perimeter) for perimeter in perimeters if len(perimeter) > 3]
+            build_duration = perf_counter() - start
+
+            # Writing the disk cache, then loading it as a new process would
+            scenario_assets.load_polygon_obstacles(obstacle_path)
+            scenario_assets._LOADED_ASSETS.pop(('polygon_obstacles', os.path.realpath(obstacle_path)))
+            start = perf_counter()
+            cached = scenario_assets.load_polygon_obstacles(obstacle_path)
+            wkb_duration = perf_counter() - start
+            start = perf_counter()
+            scenario_assets.load_polygon_obstacles(obstacle_path)
+            reuse_duration = perf_counter() - start
+
+            n_obstacles = len(cached)
+            equal = len(built) == len(cached) and all(
+                a.boundary.equals_exact(b.boundary, 0) for a, b in zip(built, cached)
+            )
+
+        reset_duration = time_env_reset(env_id, args.resets, args.seed)
+        print('{:<24}{:>10}{:>14}{:>14}{:>14}{:>8}{:>14}'.format(
+            env_id,
+            'n/a' if n_obstacles is None else n_obstacles,
+            'n/a' if build_duration is None else '{:.2f}'.format(1e3*build_duration),
+            'n/a' if wkb_duration is None else '{:.2f}'.format(1e3*wkb_duration),
+            'n/a' if reuse_duration is None else '{:.4f}'.format(1e3*reuse_duration),
+            'n/a' if equal is None else str(equal),
+            'n/a' if reset_duration is None else '{:.2f}'.format(1e3*reset_duration)
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--resets',
+        help='Number of resets timed for each scenario.',
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the scenario generation.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,286 @@
+"""
+Equivalence check and latency of the vectorised closeness rewards.
+
+The per-sensor loops previously used by ColavRewarder, ColavRewarder2 and
+ColregRewarder to calculate the closeness penalties are kept below as reference.
+Both implementations are evaluated on the same sequences of random sensor
+measurements, in which each sensor detects either nothing, a static obstacle or
+a moving obstacle with a random relative velocity, including velocities without
+a transversal component. The rewards, and the lambda parameter that
+ColregRewarder updates during its calculation, are expected to be identical.
+
+Usage:
+    python benchmarks/bench_rewarders.py --steps 2000
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import gym_auv
+from gym_auv.objects.vessel import Vessel
+from gym_auv.objects.rewarder import ColavRewarder, ColavRewarder2, ColregRewarder, deg2rad
+
+
+class ReferenceColavRewarder2(ColavRewarder2):
+    def calculate(self):
+        latest_data = self._vessel.req_latest_data()
+        nav_states = latest_data['navigation']
+        measured_distances = latest_data['distance_measurements']
+        measured_speeds = latest_data['speed_measurements']
+        collision = latest_data['collision']
+
+        if collision:
+            reward = self.params["collision"]
+            return reward
+
+        reward = 0
+
+        cross_track_error = nav_states['cross_track_error']
+        heading_error = nav_states['heading_error']
+
+        cross_track_performance = np.exp(-self.params['gamma_y_e'] * np.abs(cross_track_error))
+        path_reward = (1 + np.cos(heading_error) * self._vessel.speed / self._vessel.max_speed) * (
+                    1 + cross_track_performance) - 1
+
+        closeness_penalty_num = 0
+        closeness_penalty_den = 0
+        if self._vessel.n_sensors > 0:
+            for isensor in range(self._vessel.n_sensors):
+                angle = self._vessel.sensor_angles[isensor]
+                x = measured_distances[isensor]
+                speed_vec = measured_speeds[isensor]
+                weight = 1 / (1 + np.abs(self.params['gamma_theta'] * angle))
+                raw_penalty = self._vessel.config["sensor_range"] * np.exp(
+                    -self.params['gamma_x'] * x + self.params['gamma_v_y'] * max(0, speed_vec[1]))
+                weighted_penalty = weight * raw_penalty
+                closeness_penalty_num += weighted_penalty
+                closeness_penalty_den += weight
+
+            closeness_reward = -closeness_penalty_num / closeness_penalty_den
+        else:
+            closeness_reward = 0
+
+        living_penalty = 2.0
+
+        reward = path_reward + \
+                 0.05 * closeness_reward - \
+                 living_penalty
+
+        return reward
+
+class ReferenceColavRewarder(ColavRewarder):
+    def calculate(self):
+        latest_data = self._vessel.req_latest_data()
+        nav_states = latest_data['navigation']
+        measured_distances = latest_data['distance_measurements']
+        measured_speeds = latest_data['speed_measurements']
+        collision = latest_data['collision']
+
+        if collision:
+            reward = self.params["collision"]*(1-self.params["lambda"])
+            return reward
+
+        reward = 0
+
+        cross_track_error = nav_states['cross_track_error']
+        heading_error = nav_states['heading_error']
+
+        cross_track_performance = np.exp(-self.params['gamma_y_e']*np.abs(cross_track_error))
+        path_reward = (1 + np.cos(heading_error)*self._vessel.speed/self._vessel.max_speed)*(1 + cross_track_performance) - 1
+
+        closeness_penalty_num = 0
+        closeness_penalty_den = 0
+        if self._vessel.n_sensors > 0:
+            for isensor in range(self._vessel.n_sensors):
+                angle = self._vessel.sensor_angles[isensor]
+                x = measured_distances[isensor]
+                speed_vec = measured_speeds[isensor]
+                weight = 1 / (1 + np.abs(self.params['gamma_theta']*angle))
+                raw_penalty = self._vessel.config["sensor_range"]*np.exp(-self.params['gamma_x']*x +self.params['gamma_v_y']*max(0, speed_vec[1]))
+                weighted_penalty = weight*raw_penalty
+                closeness_penalty_num += weighted_penalty
+                closeness_penalty_den += weight
+
+            closeness_reward = -closeness_penalty_num/closeness_penalty_den
+        else:
+            closeness_reward = 0
+
+        living_penalty = self.params['lambda']*(2*self.params["neutral_speed"]+1) + self.params["eta"]*self.params["neutral_speed"]
+
+        reward = self.params['lambda']*path_reward + \
+            (1-self.params['lambda'])*closeness_reward - \
+            living_penalty + \
+            self.params["eta"]*self._vessel.speed/self._vessel.max_speed - \
+            self.params["penalty_yawrate"]*abs(self._vessel.yaw_rate)
+
+        return reward
+
+class ReferenceColregRewarder(ColregRewarder):
+    def calculate(self):
+        latest_data = self._vessel.req_latest_data()
+        nav_states = latest_data['navigation']
+        measured_distances = latest_data['distance_measurements']
+        measured_speeds = latest_data['speed_measurements']
+        collision = latest_data['collision']
+        if collision:
+            reward = self.params['collision']
+            return reward
+
+        reward = 0
+
+        cross_track_error = nav_states['cross_track_error']
+        heading_error = nav_states['heading_error']
+
+        cross_track_performance = np.exp(-self.params['gamma_y_e']*np.abs(cross_track_error))
+        path_reward = (1 + np.cos(heading_error)*self._vessel.speed/self._vessel.max_speed)*(1 + cross_track_performance) - 1
+
+        closeness_penalty_num = 0
+        closeness_penalty_den = 0
+        static_closeness_penalty_num = 0
+        static_closeness_penalty_den = 0
+        closeness_reward = 0
+        static_closeness_reward = 0
+        moving_distances = []
+        lambdas = []
+
+        speed_weight = 2
+
+        if self._vessel.n_sensors > 0:
+            for isensor in range(self._vessel.n_sensors):
+                angle = self._vessel.sensor_angles[isensor]
+                x = measured_distances[isensor]
+                speed_vec = measured_speeds[isensor]
+
+                if speed_vec.any():
+
+                    if speed_vec[1] > 0:
+                        self.params['lambda'] = 1/(1+np.exp(-0.04*x+4))
+                    if speed_vec[1] < 0:
+                        self.params['lambda'] = 1/(1+np.exp(-0.06*x+3))
+                    lambdas.append(self.params['lambda'])
+
+                    weight = 2 / (1 + np.exp(self.params['gamma_weight']*np.abs(angle)))
+                    moving_distances.append(x)
+
+                    if angle < 0*deg2rad and angle > -112.5*deg2rad:
+
+                        raw_penalty = 100*np.exp(-self.params['gamma_x_starboard']*x + speed_weight*speed_vec[1])
+                    else:
+                        raw_penalty = 100*np.exp(-self.params['gamma_x_port']*x + speed_weight*speed_vec[1])
+
+                    weighted_penalty = (1-self.params['lambda'])*weight*raw_penalty
+                    closeness_penalty_num += weighted_penalty
+                    closeness_penalty_den += weight
+
+                else:
+
+                    weight = 1 / (1 + np.abs(self.params['gamma_theta']*angle))
+                    raw_penalty = 100*np.exp(-self.params['gamma_x_stat']*x)
+                    weighted_penalty = weight*raw_penalty
+                    static_closeness_penalty_num += weighted_penalty
+                    static_closeness_penalty_den += weight
+
+            if closeness_penalty_num:
+                closeness_reward = -closeness_penalty_num/closeness_penalty_den
+
+            if static_closeness_penalty_num:
+                static_closeness_reward = -static_closeness_penalty_num/static_closeness_penalty_den
+
+        if len(lambdas):
+            path_lambda = np.amin(lambdas)
+        else:
+            path_lambda = 1
+
+        living_penalty = 1
+
+        reward = path_lambda*path_reward + \
+            static_closeness_reward + \
+            closeness_reward - \
+            living_penalty + \
+            self.params['eta']*self._vessel.speed/self._vessel.max_speed
+
+        if reward < 0:
+            reward *= self.params['negative_multiplier']
+
+        return reward
+
+
+REWARDERS = [
+    ('ColavRewarder', ReferenceColavRewarder, ColavRewarder),
+    ('ColavRewarder2', ReferenceColavRewarder2, ColavRewarder2),
+    ('ColregRewarder', ReferenceColregRewarder, ColregRewarder),
+]
+
+
+def random_measurements(rng, n_sensors, sensor_range):
+    distances = np.full(n_sensors, sensor_range)
+    speeds = np.zeros((n_sensors, 2))
+    # Each sensor detects nothing, a static obstacle or a moving obstacle
+    kind = rng.choice(3, size=n_sensors, p=rng.dirichlet(np.ones(3)))
+    detected = kind > 0
+    distances[detected] = rng.uniform(0, sensor_range, size=detected.sum())
+    moving = kind == 2
+    speeds[moving] = rng.uniform(-3, 3, size=(moving.sum(), 2))
+    # Moving obstacles without transversal velocity leave lambda unchanged
+    speeds[moving & (rng.rand(n_sensors) < 0.1), 1] = 0
+    return distances, speeds
+
+
+def set_measurements(vessel, rng):
+    distances, speeds = random_measurements(rng, vessel.n_sensors, vessel.config["sensor_range"])
+    vessel._last_sensor_dist_measurements = distances
+    vessel._last_sensor_speed_measurements = speeds
+    vessel._last_navi_state_dict = {
+        'cross_track_error': rng.uniform(-100, 100),
+        'heading_error': rng.uniform(-np.pi, np.pi)
+    }
+    vessel._collision = rng.rand() < 0.01
+    vessel._state[3:6] = rng.uniform(-2, 2, size=3)
+
+
+def main(args):
+    vessel = Vessel(gym_auv.DEFAULT_CONFIG.copy(), np.zeros(3))
+    print('Sensors: {}, steps: {}'.format(vessel.n_sensors, args.steps))
+    print('{:<20}{:>12}{:>20}{:>20}'.format('Rewarder', 'Mismatches', 'Reference [us]', 'Vectorised [us]'))
+    for name, reference_class, rewarder_class in REWARDERS:
+        reference_rewarder = reference_class(vessel, test_mode=False)
+        rewarder = rewarder_class(vessel, test_mode=False)
+        rng = np.random.RandomState(args.seed)
+        n_mismatches = 0
+        reference_duration = duration = 0
+        for _ in range(args.steps):
+            set_measurements(vessel, rng)
+            start = perf_counter()
+            expected = reference_rewarder.calculate()
+            reference_duration += perf_counter() - start
+            start = perf_counter()
+            reward = rewarder.calculate()
+            duration += perf_counter() - start
+            if reward != expected or rewarder.params['lambda'] != reference_rewarder.params['lambda']:
+                n_mismatches += 1
+        print('{:<20}{:>12}{:>20.1f}{:>20.1f}'.format(
+            name, n_mismatches, 1e6*reference_duration/args.steps, 1e6*duration/args.steps
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--steps',
+        help='Number of reward calculations per rewarder.',
+        type=int,
+        default=2000
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the random measurements.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
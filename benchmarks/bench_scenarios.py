@@ -0,0 +1,315 @@
+"""
+Reproducible performance benchmark of all registered scenarios.
+
+Every scenario in gym_auv.SCENARIOS is constructed headless, i.e. with
+render_mode=None, seeded, and driven with random or constant actions. For each
+scenario, the construction and reset latency, the step throughput, the
+per-stage breakdown of env.step (see gym_auv.utils.step_profiler), the peak
+resident memory and the memory allocated per step are measured. Scenarios that
+cannot be constructed, e.g. as their terrain or AIS data files are missing, are
+reported as skipped.
+
+Each scenario is run in a fresh process by default, such that the peak resident
+memory is that of the scenario alone. The allocations are measured with
+tracemalloc in a separate, shorter run, as tracing slows down the steps.
+
+The results are written as JSON, which can be passed back as a baseline to flag
+the metrics that regressed by more than a given fraction, e.g. in CI:
+
+Usage:
+    python benchmarks/bench_scenarios.py --steps 1000 --output results.json
+    python benchmarks/bench_scenarios.py --baseline results.json --threshold 0.2
+"""
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+import tracemalloc
+import multiprocessing
+from time import perf_counter
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import gym_auv
+import gym_auv.envs
+from gym_auv.utils.step_profiler import summarize_profile
+
+# Metrics compared against the baseline, all of which are better when lower
+REGRESSION_METRICS = ('init_ms', 'reset_ms', 'step_ms', 'peak_rss_mib', 'alloc_kib_per_step')
+
+
+def peak_rss_mib():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is given in bytes on macOS and in KiB on Linux
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss/2**20 if sys.platform == 'darwin' else maxrss/2**10
+
+
+def make_env(env_id, seed, profile_step=False):
+    config = gym_auv.SCENARIOS[env_id]['config'].copy()
+    config['profile_step'] = profile_step
+    env_class = getattr(gym_auv.envs, gym_auv.SCENARIOS[env_id]['entry_point'].split(':')[-1])
+    # Some scenarios are generated with the global random state
+    np.random.seed(seed)
+    env = env_class(config, render_mode=None)
+    env.seed(seed)
+    np.random.seed(seed)
+    return env
+
+
+def run_steps(env, actions, n_steps):
+    """Steps the environment, resetting it at the end of each episode.
+    Returns the total duration of the steps and of the resets [s] and the
+    number of resets."""
+    step_duration = reset_duration = 0
+    n_resets = 0
+    for i in range(n_steps):
+        start = perf_counter()
+        _, _, done, _ = env.step(actions[i])
+        step_duration += perf_counter() - start
+        if done:
+            start = perf_counter()
+            env.reset()
+            reset_duration += perf_counter() - start
+            n_resets += 1
+    return step_duration, reset_duration, n_resets
+
+
+def sample_actions(env, args, n_steps):
+    action_space = env.action_space
+    if args.actions == 'constant':
+        action = np.clip(np.full(action_space.shape, args.constant_action), action_space.low, action_space.high)
+        return np.tile(action, (n_steps, 1)).astype(action_space.dtype)
+    rng = np.random.RandomState(args.seed)
+    return rng.uniform(action_space.low, action_space.high, size=(n_steps,) + action_space.shape).astype(action_space.dtype)
+
+
+def benchmark_scenario(env_id, args):
+    """Returns the metrics of a scenario as a dict, or a dict holding the
+    reason it was skipped."""
+    try:
+        start = perf_counter()
+        env = make_env(env_id, args.seed, profile_step=True)
+        init_duration = perf_counter() - start
+    except Exception as e:
+        return {'skipped': '{}: {}'.format(type(e).__name__, e)}
+
+    start = perf_counter()
+    for _ in range(args.resets):
+        env.reset()
+    reset_duration = perf_counter() - start
+
+    env.reset()
+    env.get_profile(reset=True)
+    actions = sample_actions(env, args, args.steps)
+    step_duration, _, n_episode_resets = run_steps(env, actions, args.steps)
+    profile = summarize_profile(env.get_profile())
+    env.close()
+
+    # Allocations, with a separate environment as tracing slows down the steps
+    env = make_env(env_id, args.seed)
+    actions = sample_actions(env, args, args.alloc_steps)
+    tracemalloc.start()
+    traced_before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    blocks_before = sys.getallocatedblocks()
+    run_steps(env, actions, args.alloc_steps)
+    blocks_after = sys.getallocatedblocks()
+    traced_after, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    env.close()
+
+    return {
+        'init_ms': 1e3*init_duration,
+        'reset_ms': 1e3*reset_duration/args.resets if args.resets else None,
+        'step_ms': 1e3*step_duration/args.steps,
+        'steps_per_s': args.steps/step_duration,
+        'episode_resets': n_episode_resets,
+        'stages': {
+            stage: {
+                'mean_ms': 1e3*stats['mean'],
+                'p95_ms': 1e3*stats['p95'],
+                'max_ms': 1e3*stats['max'],
+                'share': stats['share']
+            } for stage, stats in profile.items()
+        },
+        'peak_rss_mib': peak_rss_mib(),
+        # Memory traced during the steps, including the episode resets
+        'alloc_kib_per_step': (traced_peak - traced_before)/2**10/args.alloc_steps,
+        'retained_kib_per_step': (traced_after - traced_before)/2**10/args.alloc_steps,
+        'retained_blocks_per_step': (blocks_after - blocks_before)/args.alloc_steps,
+    }
+
+
+def run_isolated(env_id, args):
+    # A fresh interpreter per scenario, such that the peak memory is its own
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(benchmark_scenario, (env_id, args))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_regressions(results, baseline, threshold):
+    """Returns a list of tuples (scenario, metric, baseline value, value) of
+    the metrics that increased by more than the threshold fraction."""
+    regressions = []
+    for env_id, metrics in results['scenarios'].items():
+        baseline_metrics = baseline['scenarios'].get(env_id)
+        if baseline_metrics is None or 'skipped' in metrics or 'skipped' in baseline_metrics:
+            continue
+        for metric in REGRESSION_METRICS:
+            value, baseline_value = metrics.get(metric), baseline_metrics.get(metric)
+            if value is None or baseline_value is None or baseline_value <= 0:
+                continue
+            if value > (1 + threshold)*baseline_value:
+                regressions.append((env_id, metric, baseline_value, value))
+    return regressions
+
+
+def print_results(results):
+    header = '{:<28}{:>10}{:>12}{:>12}{:>12}{:>12}{:>12}'.format(
+        'Scenario', 'Init [ms]', 'Reset [ms]', 'Step [ms]', 'Steps/s', 'RSS [MiB]', 'KiB/step'
+    )
+    print(header)
+    print('-'*len(header))
+    for env_id, metrics in results['scenarios'].items():
+        if 'skipped' in metrics:
+            print('{:<28}skipped ({})'.format(env_id, metrics['skipped']))
+            continue
+        print('{:<28}{:>10.1f}{:>12}{:>12.3f}{:>12.0f}{:>12}{:>12.1f}'.format(
+            env_id,
+            metrics['init_ms'],
+            'n/a' if metrics['reset_ms'] is None else '{:.2f}'.format(metrics['reset_ms']),
+            metrics['step_ms'],
+            metrics['steps_per_s'],
+            'n/a' if metrics['peak_rss_mib'] is None else '{:.0f}'.format(metrics['peak_rss_mib']),
+            metrics['alloc_kib_per_step']
+        ))
+        print('    ' + ', '.join(
+            '{} {:.3f} ms ({:.0%})'.format(stage, stats['mean_ms'], stats['share'])
+            for stage, stats in metrics['stages'].items()
+        ))
+
+
+def main(args):
+    env_ids = [env_id for env_id in gym_auv.SCENARIOS if not args.scenarios or env_id in args.scenarios]
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'scenarios': {}
+    }
+    for env_id in env_ids:
+        print('Benchmarking {}...'.format(env_id), file=sys.stderr)
+        if args.no_isolate:
+            results['scenarios'][env_id] = benchmark_scenario(env_id, args)
+        else:
+            results['scenarios'][env_id] = run_isolated(env_id, args)
+
+    print_results(results)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        print('\nCompared to {} (commit {}), threshold {:.0%}: {} regressions'.format(
+            args.baseline, baseline['meta'].get('commit'), args.threshold, len(regressions)
+        ))
+        for env_id, metric, baseline_value, value in regressions:
+            print('    {:<28}{:<24}{:>12.3f} -> {:>12.3f} ({:+.0%})'.format(
+                env_id, metric, baseline_value, value, value/baseline_value - 1
+            ))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--scenarios',
+        help='Scenarios to benchmark, defaults to all registered scenarios.',
+        nargs='+',
+        default=None
+    )
+    parser.add_argument(
+        '--steps',
+        help='Number of steps timed for each scenario.',
+        type=int,
+        default=1000
+    )
+    parser.add_argument(
+        '--resets',
+        help='Number of resets timed for each scenario.',
+        type=int,
+        default=5
+    )
+    parser.add_argument(
+        '--alloc-steps',
+        help='Number of steps traced with tracemalloc for each scenario.',
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        '--actions',
+        help='Whether the vessel is driven with uniformly random or constant actions.',
+        choices=['random', 'constant'],
+        default='random'
+    )
+    parser.add_argument(
+        '--constant-action',
+        help='Value of every action component when using constant actions.',
+        type=float,
+        default=0.5
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the scenario generation and the random actions.',
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        '--output',
+        help='Path of the JSON file the results are written to.',
+        default=None
+    )
+    parser.add_argument(
+        '--baseline',
+        help='Path of a JSON file of earlier results to compare against. The script exits with status 1 if any metric regressed.',
+        default=None
+    )
+    parser.add_argument(
+        '--threshold',
+        help='Relative increase of a metric above which it is flagged as a regression.',
+        type=float,
+        default=0.2
+    )
+    parser.add_argument(
+        '--no-isolate',
+        help='Run all scenarios in this process instead of one process per scenario. The peak memory is then cumulative.',
+        action='store_true'
+    )
+    args = parser.parse_args()
+    main(args)
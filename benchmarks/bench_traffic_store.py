@@ -0,0 +1,191 @@
+"""
+Equivalence check and reset latency of the preprocessed AIS traffic store.
+
+The vessel trajectories sampled by TrafficStore are compared, for a number of
+seeds, to those of the AIS parsing loop previously run by RealWorldEnv._generate
+on every reset, which is kept below as reference. The random number generators
+are also checked to be left in the same state. By default, a synthetic AIS data
+file is generated, holding short vessels, missing lengths, long gaps, repeated
+timestamps and implausible speeds.
+
+Usage:
+    python benchmarks/bench_traffic_store.py --csv resources/vessel_data.csv --n-vessels 999999
+"""
+import os
+import sys
+import argparse
+import tempfile
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.utils.traffic_store import TrafficStore, VESSEL_SPEED_RANGE_LOWER, VESSEL_SPEED_RANGE_UPPER
+
+
+def reference_vessel_trajectories(rng, vessel_data_path, n_vessels, x0, y0):
+    vessel_trajectories = []
+    df = pd.read_csv(vessel_data_path)
+    vessels = dict(tuple(df.groupby('Vessel_Name')))
+    vessel_names = sorted(list(vessels.keys()))
+
+    while len(vessel_trajectories) < n_vessels:
+        if len(vessel_names) == 0:
+            break
+        vessel_idx = rng.randint(0, len(vessel_names))
+        vessel_name = vessel_names.pop(vessel_idx)
+
+        vessels[vessel_name] = vessels[vessel_name].copy()
+        vessels[vessel_name]['AIS_Timestamp'] = pd.to_datetime(vessels[vessel_name]['AIS_Timestamp'])
+        vessels[vessel_name]['AIS_Timestamp'] -= vessels[vessel_name].iloc[0]['AIS_Timestamp']
+        start_timestamp = None
+
+        last_timestamp = pd.to_timedelta(0, unit='D')
+        last_east = None
+        last_north = None
+        cutoff_dt = pd.to_timedelta(0.1, unit='D')
+        path = []
+        for _, row in vessels[vessel_name].iterrows():
+            east = row['AIS_East']/10.0
+            north = row['AIS_North']/10.0
+            if row['AIS_Length_Overall'] < 12:
+                continue
+            if len(path) == 0:
+                start_timestamp = row['AIS_Timestamp']
+            timedelta = row['AIS_Timestamp'] - last_timestamp
+            if timedelta < cutoff_dt:
+                if last_east is not None:
+                    dx = east - last_east
+                    dy = north - last_north
+                    distance = np.sqrt(dx**2 + dy**2)
+                    seconds = timedelta.seconds
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        speed = distance/seconds
+                    if speed < VESSEL_SPEED_RANGE_LOWER or speed > VESSEL_SPEED_RANGE_UPPER:
+                        path = []
+                        continue
+
+                path.append((int((row['AIS_Timestamp']-start_timestamp).total_seconds()), (east-x0, north-y0)))
+            else:
+                if len(path) > 1 and not np.isnan(row['AIS_Length_Overall']) and row['AIS_Length_Overall'] > 0:
+                    start_index = rng.randint(0, len(path)-1)
+                    vessel_trajectories.append((row['AIS_Length_Overall']/10.0, path[start_index:], vessel_name))
+                path = []
+            last_timestamp = row['AIS_Timestamp']
+            last_east = east
+            last_north = north
+    return vessel_trajectories
+
+
+def synthetic_ais_data(rng, n_vessels, n_messages):
+    rows = []
+    for vessel_idx in range(n_vessels):
+        length = rng.choice([np.nan, 0, 8, 15, 40, 120])
+        timestamp = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.randint(0, 3600), unit='s')
+        east, north = rng.uniform(0, 1e5, size=2)
+        for _ in range(n_messages):
+            kind = rng.randint(20)
+            if kind == 0:
+                dt = rng.randint(9000, 20000)     # Gap longer than 0.1 days
+            elif kind == 1:
+                dt = 0                            # Repeated timestamp
+            else:
+                dt = rng.randint(5, 120)
+            speed = rng.uniform(0, 40) if kind == 2 else rng.uniform(0.5, 15)
+            heading = rng.uniform(0, 2*np.pi)
+            timestamp += pd.to_timedelta(dt, unit='s')
+            east += speed*dt*np.cos(heading)
+            north += speed*dt*np.sin(heading)
+            if rng.randint(30) == 0:
+                length = rng.choice([np.nan, 10, 25, 60])
+            rows.append(('Vessel_{}'.format(vessel_idx), str(timestamp), round(east, 1), round(north, 1), length))
+    return pd.DataFrame(rows, columns=['Vessel_Name', 'AIS_Timestamp', 'AIS_East', 'AIS_North', 'AIS_Length_Overall'])
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = args.csv
+        if csv_path is None:
+            csv_path = os.path.join(tmp_dir, 'vessel_data.csv')
+            synthetic_ais_data(np.random.RandomState(args.seed), args.vessels, args.messages).to_csv(csv_path, index=False)
+
+        start = perf_counter()
+        traffic_store = TrafficStore.load_or_build(csv_path) if args.csv is not None else TrafficStore.from_csv(csv_path)
+        build_duration = perf_counter() - start
+
+        n_mismatches = 0
+        reference_duration = store_duration = 0
+        for seed in range(args.seeds):
+            reference_rng, rng = np.random.RandomState(seed), np.random.RandomState(seed)
+            start = perf_counter()
+            expected = reference_vessel_trajectories(reference_rng, csv_path, args.n_vessels, args.x0, args.y0)
+            reference_duration += perf_counter() - start
+            start = perf_counter()
+            result = traffic_store.sample_trajectories(rng, args.n_vessels, args.x0, args.y0)
+            store_duration += perf_counter() - start
+            result = [(length, motion.trajectory, name) for length, motion, name in result]
+            if result != expected or reference_rng.randint(1 << 30) != rng.randint(1 << 30):
+                n_mismatches += 1
+
+    print('Vessels: {}, trajectory segments: {}, points: {}'.format(
+        len(traffic_store.vessel_names), len(traffic_store.segment_lengths), len(traffic_store.points)
+    ))
+    print('Seeds: {}, mismatches: {}'.format(args.seeds, n_mismatches))
+    print('{:<40}{:>16}'.format('Implementation', 'ms/reset'))
+    print('{:<40}{:>16.2f}'.format('Reference parsing loop', 1e3*reference_duration/args.seeds))
+    print('{:<40}{:>16.2f}'.format('Traffic store', 1e3*store_duration/args.seeds))
+    print('{:<40}{:>16.2f}'.format('Traffic store build (once)', 1e3*build_duration))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--csv',
+        help='AIS data file to test. If not given, a synthetic file is generated.',
+    )
+    parser.add_argument(
+        '--vessels',
+        help='Number of vessels in the synthetic AIS data.',
+        type=int,
+        default=60
+    )
+    parser.add_argument(
+        '--messages',
+        help='Number of messages per vessel in the synthetic AIS data.',
+        type=int,
+        default=200
+    )
+    parser.add_argument(
+        '--n-vessels',
+        help='Number of trajectories sampled per reset, i.e. RealWorldEnv.n_vessels.',
+        type=int,
+        default=999999
+    )
+    parser.add_argument(
+        '--x0',
+        help='Scenario origin east coordinate.',
+        type=float,
+        default=5000
+    )
+    parser.add_argument(
+        '--y0',
+        help='Scenario origin north coordinate.',
+        type=float,
+        default=3900
+    )
+    parser.add_argument(
+        '--seeds',
+        help='Number of seeds to compare.',
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the synthetic AIS data.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
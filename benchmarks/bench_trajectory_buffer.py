@@ -0,0 +1,86 @@
+"""
+Cost of storing the vessel trajectory over long episodes.
+
+The states of an episode of the given length are appended one at a time, both
+with np.vstack, as previously done by Vessel, and with TrajectoryBuffer in its
+growing and ring-buffer modes. The stored rows are checked to be equal, and
+the time per append is reported for consecutive parts of the episode, showing
+the growth of the vstack cost towards the end of the episode.
+
+Usage:
+    python benchmarks/bench_trajectory_buffer.py --steps 10000 --ring-length 100
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.utils.trajectory_buffer import TrajectoryBuffer
+
+N_PARTS = 5
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    states = rng.normal(size=(args.steps, 6))
+    part_length = args.steps//N_PARTS
+
+    vstack_durations = np.zeros(N_PARTS)
+    growing_durations = np.zeros(N_PARTS)
+    ring_durations = np.zeros(N_PARTS)
+    prev_states = np.vstack([states[0]])
+    growing = TrajectoryBuffer(6)
+    growing.append(states[0])
+    ring = TrajectoryBuffer(6, max_length=args.ring_length)
+    ring.append(states[0])
+    for t in range(1, args.steps):
+        part = min(t//part_length, N_PARTS - 1)
+        start = perf_counter()
+        prev_states = np.vstack([prev_states, states[t]])
+        vstack_durations[part] += perf_counter() - start
+        start = perf_counter()
+        growing.append(states[t])
+        growing_durations[part] += perf_counter() - start
+        start = perf_counter()
+        ring.append(states[t])
+        ring_durations[part] += perf_counter() - start
+
+    equal = np.array_equal(prev_states, growing.data) and np.array_equal(prev_states[-args.ring_length:], ring.data)
+
+    header = '{:>16}{:>16}{:>16}{:>16}'.format('Steps', 'vstack [us]', 'Growing [us]', 'Ring [us]')
+    print(header)
+    print('-'*len(header))
+    for part in range(N_PARTS):
+        print('{:>16}{:>16.2f}{:>16.2f}{:>16.2f}'.format(
+            '{}-{}'.format(part*part_length, (part + 1)*part_length), 1e6*vstack_durations[part]/part_length,
+            1e6*growing_durations[part]/part_length, 1e6*ring_durations[part]/part_length
+        ))
+    print('Stored rows equal: {}'.format(equal))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--steps',
+        help='Number of timesteps in the episode.',
+        type=int,
+        default=10000
+    )
+    parser.add_argument(
+        '--ring-length',
+        help='Number of most recent states kept in ring-buffer mode.',
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the random states.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
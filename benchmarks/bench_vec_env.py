@@ -0,0 +1,92 @@
+"""
+Throughput benchmark for the vectorised environments.
+
+Compares the number of environment steps per second obtained with
+stable-baselines' SubprocVecEnv (one environment per process), AUVVecEnv
+(all environments in the current process) and ShardedVecEnv (several
+AUVVecEnv instances in subprocesses), the latter with the observations
+written to shared memory and sent back through the pipes.
+
+Usage:
+    python benchmarks/bench_vec_env.py --env MovingObstaclesNoRules-v0 --num-envs 32 --num-cpu 4 --steps 200
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import gym_auv
+from gym_auv.vec_env import make_env_fn, make_auv_vec_env
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+
+def run(vec_env, steps, seed):
+    rng = np.random.RandomState(seed)
+    vec_env.seed(seed)
+    vec_env.reset()
+    actions = rng.uniform(-1, 1, size=(steps, vec_env.num_envs, 2))
+    start = perf_counter()
+    for step_actions in actions:
+        vec_env.step(step_actions)
+    duration = perf_counter() - start
+    vec_env.close()
+    return steps*vec_env.num_envs/duration
+
+
+def main(args):
+    config = gym_auv.SCENARIOS[args.env]['config'].copy()
+
+    results = []
+    env_fns = [make_env_fn(args.env, config, seed=args.seed + i) for i in range(args.num_cpu)]
+    results.append(('SubprocVecEnv', args.num_cpu, args.num_cpu, run(SubprocVecEnv(env_fns), args.steps, args.seed)))
+    vec_env = make_auv_vec_env(args.env, config, args.num_envs, seed=args.seed)
+    results.append(('AUVVecEnv', 1, args.num_envs, run(vec_env, args.steps, args.seed)))
+    vec_env = make_auv_vec_env(args.env, config, args.num_envs, n_processes=args.num_cpu, seed=args.seed)
+    results.append(('ShardedVecEnv', args.num_cpu, args.num_envs, run(vec_env, args.steps, args.seed)))
+    vec_env = make_auv_vec_env(args.env, config, args.num_envs, n_processes=args.num_cpu, seed=args.seed, use_shared_memory=False)
+    results.append(('  (pickled obs)', args.num_cpu, args.num_envs, run(vec_env, args.steps, args.seed)))
+
+    header = '{:<20}{:>12}{:>12}{:>16}'.format('VecEnv', 'Processes', 'Envs', 'Steps/s')
+    print(header)
+    print('-'*len(header))
+    for name, n_processes, n_envs, steps_per_sec in results:
+        print('{:<20}{:>12}{:>12}{:>16.1f}'.format(name, n_processes, n_envs, steps_per_sec))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--env',
+        help='Scenario to simulate.',
+        default='MovingObstaclesNoRules-v0'
+    )
+    parser.add_argument(
+        '--num-envs',
+        help='Total number of environments simulated by the gym_auv vectorised environments.',
+        type=int,
+        default=32
+    )
+    parser.add_argument(
+        '--num-cpu',
+        help='Number of processes.',
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        '--steps',
+        help='Number of vectorised steps to simulate.',
+        type=int,
+        default=200
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the environments and the action sequence.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,187 @@
+"""
+Equivalence check and construction cost of the VesselObstacle motion models.
+
+The legacy VesselObstacle, which expanded its trajectory list into one velocity
+per second of the trajectory, is kept below as reference. Obstacles following
+random time-stamped trajectories, as sampled from AIS data, are simulated past
+the end of their trajectories with both implementations and are expected to
+match exactly. The constant-velocity obstacles of the moving-obstacle scenarios
+are compared to the 10000-point trajectory lists previously built for them,
+differing only by the rounding of the velocities computed from the list.
+
+Usage:
+    python benchmarks/bench_vessel_obstacle.py --steps 3000 --obstacles 17
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from gym_auv.objects.obstacles import VesselObstacle
+from gym_auv.objects.motion_models import ConstantVelocity, PiecewiseLinear
+
+
+class ReferenceVesselObstacle(VesselObstacle):
+    def _setup(self, width, trajectory, init_position=None, init_heading=None, init_update=True, name=''):
+        self.static = False
+        self.width = width
+        self.reference_trajectory = trajectory
+        self.trajectory_velocities = []
+        self.name = name
+        i = 0
+        while i < len(trajectory)-1:
+            cur_t = trajectory[i][0]
+            next_t = trajectory[i+1][0]
+            cur_waypoint = trajectory[i][1]
+            next_waypoint = trajectory[i+1][1]
+
+            dx = (next_waypoint[0] - cur_waypoint[0])/(next_t - cur_t)
+            dy = (next_waypoint[1] - cur_waypoint[1])/(next_t - cur_t)
+
+            for _ in range(cur_t, next_t):
+                self.trajectory_velocities.append((dx, dy))
+
+            i+= 1
+
+        self.waypoint_counter = 0
+        self.points = [
+            (-self.width/2, -self.width/2),
+            (-self.width/2, self.width/2),
+            (self.width/2, self.width/2),
+            (3/2*self.width, 0),
+            (self.width/2, -self.width/2),
+        ]
+        if init_position is not None:
+            self.position = init_position
+        else:
+            self.position = np.array(self.reference_trajectory[0][1])
+        self.init_position = self.position.copy()
+        if init_heading is not None:
+            self.heading = init_heading
+        else:
+            self.heading = np.pi/2
+
+        if init_update:
+            self.update(dt=0.1)
+
+    def _update(self, dt):
+        self.waypoint_counter += dt
+
+        index = int(np.floor(self.waypoint_counter))
+
+        if index >= len(self.trajectory_velocities) - 1:
+            self.waypoint_counter = 0
+            index = 0
+            self.position = np.array(self.reference_trajectory[0][1])
+
+        dx = self.trajectory_velocities[index][0]
+        dy = self.trajectory_velocities[index][1]
+
+        self.dx = dt*dx
+        self.dy = dt*dy
+        self.heading = np.arctan2(self.dy, self.dx)
+        self.position = self.position + np.array([self.dx, self.dy])
+        self._prev_position.append(self.position)
+        self._prev_heading.append(self.heading)
+
+        return True
+
+
+def random_trajectory(rng, n_waypoints):
+    times = np.cumsum(rng.randint(1, 120, size=n_waypoints)) - 1
+    waypoints = np.cumsum(rng.uniform(-50, 50, size=(n_waypoints, 2)), axis=0)
+    return list(zip(times.tolist(), map(tuple, waypoints.tolist())))
+
+
+def constant_velocity_trajectory(rng):
+    position = rng.uniform(-1000, 1000, size=2)
+    direction = rng.rand()*2*np.pi
+    speed = rng.uniform(0.5, 5)
+    trajectory = []
+    for i in range(10000):
+        trajectory.append((i, (
+            position[0] + i*speed*np.cos(direction),
+            position[1] + i*speed*np.sin(direction)
+        )))
+    return trajectory, ConstantVelocity(position, speed*np.array([np.cos(direction), np.sin(direction)]), duration=9999)
+
+
+def max_deviation(reference, obstacle, n_steps):
+    deviation = np.abs(reference.position - obstacle.position).max()
+    for _ in range(n_steps):
+        reference.update(dt=1.0)
+        obstacle.update(dt=1.0)
+        deviation = max(deviation, np.abs(reference.position - obstacle.position).max())
+        deviation = max(deviation, abs(reference.heading - obstacle.heading))
+    return deviation
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+
+    n_mismatches = 0
+    for _ in range(args.trajectories):
+        trajectory = random_trajectory(rng, rng.randint(3, 50))
+        reference = ReferenceVesselObstacle(width=10, trajectory=trajectory)
+        obstacle = VesselObstacle(width=10, motion=PiecewiseLinear.from_trajectory(trajectory))
+        n_steps = 2*reference.reference_trajectory[-1][0]
+        if max_deviation(reference, obstacle, n_steps) != 0:
+            n_mismatches += 1
+    print('Piecewise-linear trajectories: {}, mismatches: {}'.format(args.trajectories, n_mismatches))
+
+    trajectories, motions = zip(*[constant_velocity_trajectory(rng) for _ in range(args.obstacles)])
+    deviation = max(
+        max_deviation(ReferenceVesselObstacle(width=10, trajectory=trajectory), VesselObstacle(width=10, motion=motion), args.steps)
+        for trajectory, motion in zip(trajectories, motions)
+    )
+    print('Constant-velocity obstacles: {}, steps: {}, max deviation: {:.3g} m'.format(args.obstacles, args.steps, deviation))
+
+    timings = []
+    start = perf_counter()
+    for _ in range(args.obstacles):
+        trajectory, _ = constant_velocity_trajectory(rng)
+        ReferenceVesselObstacle(width=10, trajectory=trajectory)
+    timings.append(('Trajectory list (reference)', perf_counter() - start))
+    start = perf_counter()
+    for _ in range(args.obstacles):
+        position, direction, speed = rng.uniform(-1000, 1000, size=2), rng.rand()*2*np.pi, rng.uniform(0.5, 5)
+        VesselObstacle(width=10, motion=ConstantVelocity(position, speed*np.array([np.cos(direction), np.sin(direction)]), 9999))
+    timings.append(('Constant velocity', perf_counter() - start))
+
+    print('{:<40}{:>16}'.format('Construction of {} obstacles'.format(args.obstacles), 'ms/reset'))
+    for name, duration in timings:
+        print('{:<40}{:>16.2f}'.format(name, 1e3*duration))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--steps',
+        help='Number of steps simulated for the constant-velocity obstacles.',
+        type=int,
+        default=3000
+    )
+    parser.add_argument(
+        '--obstacles',
+        help='Number of constant-velocity obstacles, i.e. moving obstacles per reset.',
+        type=int,
+        default=17
+    )
+    parser.add_argument(
+        '--trajectories',
+        help='Number of random piecewise-linear trajectories to compare.',
+        type=int,
+        default=50
+    )
+    parser.add_argument(
+        '--seed',
+        help='Seed for the random trajectories.',
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    main(args)
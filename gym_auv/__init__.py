@@ -24,6 +24,17 @@ DEFAULT_CONFIG = {
     "t_step_size": 1.0, # 1.0 originally                             # Length of simulation timestep [s]
     "sensor_frequency": 1.0,                        # Sensor execution frequency (0.0 = never execute, 1.0 = always execute)
     "observe_frequency": 1.0,                       # Frequency of using actual obstacles instead of virtual ones for detection
+    "integrator": "rk4",                            # Integrator for the vessel dynamics ('rk4', 'rk45', 'semi_implicit_euler', 'linearized', 'bdf')
+    "integrator_substeps": 2,                       # Number of integrator steps per simulation timestep. The explicit integrators
+                                                    # ('rk45', 'semi_implicit_euler') are unstable at 1.0s steps with a single substep.
+    "trajectory_max_length": None,                  # Number of most recent vessel states kept in the trajectory history (None = the whole episode).
+                                                    # Limiting it keeps memory constant during training, but the episode logs only hold the last states.
+    "lean_training": False,                         # Whether to only keep the running episode statistics stored in history, skipping the capture of
+                                                    # the vessel trajectory and last_episode, unless recording is enabled with set_recording().
+    "profile_step": False,                          # Whether to time the stages of env.step() (obstacle update, vessel simulation, observation,
+                                                    # reward and history), see get_profile().
+    "observation_buffers": False,                   # Whether observe() writes into preallocated float32 buffers matching the observation space,
+                                                    # which are overwritten at every step, instead of returning new arrays (see set_observation_buffers()).
 
     # ---- VESSEL ---- #
     'thrust_max_auv': 2.0,                          # Maximum thrust of the AUV [N]
@@ -31,6 +42,8 @@ DEFAULT_CONFIG = {
     "vessel_width": 1.255,                          # Width of vessel [m]
     "feasibility_width_multiplier": 5.0,            # Multiplier for vessel width in feasibility pooling algorithm 
     "look_ahead_distance": 150,                     # Path look-ahead distance for vessel [m]
+    "path_table_resolution": None,                  # Arclength spacing [m] of the path sample table interpolated by the navigation,
+                                                    # or None to evaluate the path spline (see Path.build_sample_table).
     'render_distance': 300,                         # 3D rendering render distance [m]
     "sensing": True,                                # Whether rangerfinder sensors for perception should be activated
     "sensor_interval_load_obstacles": 25,           # Interval for loading nearby obstacles
@@ -40,6 +53,9 @@ DEFAULT_CONFIG = {
     "sensor_rotation": False,                       # Whether to activate the sectors in a rotating pattern (for performance reasons)
     "sensor_range": 150.0,                          # Range of rangefinder sensors [m]
     "sensor_log_transform": True,                   # Whether to use a log. transform when calculating closeness                 #
+    "sensor_engine": "numpy",                       # Rangefinder simulation engine, either 'numpy' (vectorised ray casting) or 'shapely'
+    "sensor_terrain_sdf": False,                    # Whether to sense the static terrain of real-world scenarios through a precomputed signed distance field, within 0.1 m for most rays, while rays clipping an obstacle along less than about a grid spacing may pass through it
+    "sensor_terrain_sdf_resolution": 1.0,           # Grid spacing of the terrain signed distance field [m]
     "observe_obstacle_fun": observe_obstacle_fun,   # Function that outputs whether an obstacle should be observed (True),
                                                     # or if a virtual obstacle based on the latest reading should be used (False).
                                                     # This represents a trade-off between sensor accuracy and computation speed.
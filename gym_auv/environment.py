@@ -2,13 +2,16 @@ import gym
 import numpy as np
 from gym.utils import seeding
 
+from gym_auv.rendering import FPS
 from gym_auv.objects.vessel import Vessel
+from gym_auv.objects.obstacle_index import ObstacleIndex
+from gym_auv.objects.dynamic_obstacles import DynamicObstacleSet
 from gym_auv.objects.rewarder import ColavRewarder, PathRewarder
-import gym_auv.rendering.render2d as render2d
-import gym_auv.rendering.render3d as render3d
+from gym_auv.utils.episode_statistics import EpisodeStatistics
+from gym_auv.utils.episode_writer import EpisodeWriter, worker_filename
+from gym_auv.utils.step_profiler import StepProfiler
 from abc import ABC, abstractmethod
 
-import tables
 import os
 
 class BaseEnvironment(gym.Env, ABC):
@@ -16,7 +19,7 @@ class BaseEnvironment(gym.Env, ABC):
 
     metadata = {
         'render.modes': ['human', 'rgb_array', 'state_pixels'],
-        'video.frames_per_second': render2d.FPS
+        'video.frames_per_second': FPS
     }
 
     def __init__(self, env_config, test_mode=False, render_mode='2d', verbose=False):
@@ -58,11 +61,12 @@ class BaseEnvironment(gym.Env, ABC):
         self.t_step = 0
         self.cumulative_reward = 0
         self.rewarder = None
+        self.profiler = StepProfiler() if self.config["profile_step"] else None
 
         # NOTE:
         self.dock = None
 
-        self.history = dict.fromkeys(
+        self.history = EpisodeStatistics(
             [
                 "cross_track_error",
                 "reached_goal",
@@ -72,13 +76,15 @@ class BaseEnvironment(gym.Env, ABC):
                 "duration",
                 "progress",
                 "pathlength",
-            ],
-            np.array([]),
+            ]
         )
         # self.history = []
 
         # Declaring attributes
         self.obstacles = []
+        self.obstacle_index = None
+        self.dynamic_obstacles = None
+        self.distance_field = None
         self.vessel = None
         self.path = None
         
@@ -90,6 +96,9 @@ class BaseEnvironment(gym.Env, ABC):
         self.rng = None
         self.seed()
         self._tmp_storage = None
+        self.recording = not self.config["lean_training"]
+        self._episode_writer = None
+        self._saved_episode = None
         self._last_image_frame = None
 
         self._action_space = gym.spaces.Box(
@@ -113,13 +122,19 @@ class BaseEnvironment(gym.Env, ABC):
             'perception': self._perception_space,
             'navigation': self._navigation_space
         })
+        self._obs_buffers = None
+        if self.config["observation_buffers"]:
+            self.set_observation_buffers()
 
-        # Initializing rendering
+        # Initializing rendering. The renderers are imported on demand, as they require a
+        # display, such that environments with render_mode=None can be used headless.
         self._viewer2d = None
         self._viewer3d = None
         if self.render_mode == '2d' or self.render_mode == 'both':
+            import gym_auv.rendering.render2d as render2d
             render2d.init_env_viewer(self)
         if self.render_mode == '3d' or self.render_mode == 'both':
+            import gym_auv.rendering.render3d as render3d
             if self.config['render_distance'] == 'random':
                 self.render_distance = self.rng.randint(300, 2000)
             else:
@@ -175,10 +190,13 @@ class BaseEnvironment(gym.Env, ABC):
         if self.verbose:    print('Generating scenario...')
         self._generate()
         self.rewarder = self._rewarder_class(self.vessel, self.test_mode) # Resetting rewarder instance
+        if not self.recording:
+            self.vessel.set_trajectory_max_length(1)
         if self.verbose:    print('Generated scenario')
 
         # Initializing 3d viewer
         if self.render_mode == '3d':
+            import gym_auv.rendering.render3d as render3d
             render3d.init_boat_model(self)
             #self._viewer3d.create_path(self.path)
 
@@ -186,30 +204,87 @@ class BaseEnvironment(gym.Env, ABC):
         obs = self.observe()
         if self.verbose:    print('Calculated initial observation')
 
-        # Resetting temporary data storage
+        # Resetting temporary data storage, holding running sums over the episode
         self._tmp_storage = {
-            'cross_track_error': [],
+            'cross_track_error': 0.0,
         }
 
         return obs
 
-    def observe(self):  # -> np.ndarray:
+    def set_observation_buffers(self, perception:np.ndarray=None, navigation:np.ndarray=None) -> None:
+        """
+        Makes observe() write the observations into the given arrays, e.g. views of the
+        observation buffers of a vectorised environment, instead of returning new arrays
+        at every step. The sensor closenesses and navigation states are written directly
+        into the buffers, while the sensor simulation and the navigation kernel still use
+        temporary arrays. Buffers that are not given are allocated. Both must match the
+        shape and dtype of the corresponding observation space, or ValueError is raised.
+
+        The observations returned by observe(), step() and reset() then reference the
+        buffers, which are overwritten by the next step or reset, and must thus be copied
+        if kept. The final observation of an episode is returned as a copy, as it is kept
+        by vectorised environments while resetting.
+
+        Parameters
+        ----------
+        perception : np.ndarray
+            Buffer of the perception states.
+        navigation : np.ndarray
+            Buffer of the navigation states.
+        """
+        obs_buffers = {}
+        for key, buffer in (('perception', perception), ('navigation', navigation)):
+            space = self._observation_space[key]
+            if buffer is None:
+                buffer = np.zeros(space.shape, dtype=space.dtype)
+            if buffer.shape != space.shape or buffer.dtype != space.dtype:
+                raise ValueError('Expected a {} buffer of shape {} and dtype {}, got {} and {}'.format(
+                    key, space.shape, space.dtype, buffer.shape, buffer.dtype
+                ))
+            obs_buffers[key] = buffer
+        self._obs_buffers = obs_buffers
+
+    def observe(self, perception_states:np.ndarray=None):  # -> np.ndarray:
         """Returns the array of observations at the current time-step.
 
+        Parameters
+        ----------
+        perception_states : np.ndarray
+            Perception states of the current time-step, if already simulated, e.g.
+            by AUVVecEnv for several environments at once, in which case only the
+            navigation states are calculated.
+
         Returns
         -------
         obs : np.ndarray
             The observation of the environment.
         """
-        navigation_states = self.vessel.navigate(self.path)
-        if bool(self.config["sensing"]):
-            perception_states = self.vessel.perceive(self.obstacles)
-        else:
-            perception_states = []
+        obs_buffers = self._obs_buffers
+        navigation_states = self.vessel.navigate(self.path, out=None if obs_buffers is None else obs_buffers['navigation'])
+        if perception_states is None and bool(self.config["sensing"]):
+            self._update_obstacle_index()
+            perception_states = self.vessel.perceive(
+                self.obstacles, obstacle_index=self.obstacle_index, distance_field=self.distance_field,
+                out=None if obs_buffers is None else obs_buffers['perception']
+            )
+        elif perception_states is None:
+            perception_states = [] if obs_buffers is None else obs_buffers['perception']
 
         obs = {'perception' : perception_states, 'navigation' : navigation_states }
         return obs
 
+    def simulate_sensors(self) -> bool:
+        """Simulates the sensors of the vessel without pooling them into sectors, see
+        Vessel.simulate_sensors. Returns whether the sectors must be pooled."""
+        self._update_obstacle_index()
+        return self.vessel.simulate_sensors(
+            self.obstacles, obstacle_index=self.obstacle_index, distance_field=self.distance_field
+        )
+
+    def _update_obstacle_index(self) -> None:
+        if self.obstacle_index is None or not self.obstacle_index.indexes(self.obstacles):
+            self.obstacle_index = ObstacleIndex(self.obstacles, cell_size=self.config["sensor_range"])
+
     def step(self, action:list) -> (np.ndarray, float, bool, dict):
         """
         Steps the environment by one timestep. Returns observation, reward, done, info.
@@ -231,6 +306,20 @@ class BaseEnvironment(gym.Env, ABC):
             Dictionary with data used for reporting or debugging
         """
 
+        action = self._pre_step(action)
+
+        # Updating vessel state from its dynamics model
+        self.vessel.step(action)
+        if self.profiler is not None:
+            self.profiler.lap('vessel')
+        # print(f"Velocity from environment {self.vessel.velocity}")
+
+        return self._post_step()
+
+    def _pre_step(self, action:list) -> np.ndarray:
+        """Updates the environment before the vessel is simulated one timestep forward.
+        Returns the action to be applied to the vessel."""
+
         # action[0] = (
             # (action[0] + 1) / 2
         # )  # Done to be compatible with RL algorithms that require symmetric action spaces
@@ -243,14 +332,23 @@ class BaseEnvironment(gym.Env, ABC):
         # print(f"action: {action}")
 
         # If the environment is dynamic, calling self.update will change it.
+        if self.profiler is not None:
+            self.profiler.start()
         self._update()
+        if self.profiler is not None:
+            self.profiler.lap('update')
 
-        # Updating vessel state from its dynamics model
-        self.vessel.step(action)
-        # print(f"Velocity from environment {self.vessel.velocity}")
+        return action
+
+    def _post_step(self, perception_states:np.ndarray=None) -> (np.ndarray, float, bool, dict):
+        """Observes the environment after the vessel has been simulated one timestep
+        forward, using the given perception states if already simulated, see
+        observe(). Returns observation, reward, done, info."""
 
         # Getting observation vector
-        obs = self.observe()
+        obs = self.observe(perception_states)
+        if self.profiler is not None:
+            self.profiler.lap('observe')
         vessel_data = self.vessel.req_latest_data()
         self.collision = vessel_data['collision']
         self.reached_goal = vessel_data['reached_goal']
@@ -259,6 +357,8 @@ class BaseEnvironment(gym.Env, ABC):
 
         # Receiving agent's reward
         reward = self.rewarder.calculate()
+        if self.profiler is not None:
+            self.profiler.lap('reward')
         self.last_reward = reward
         self.cumulative_reward += reward
 
@@ -270,8 +370,13 @@ class BaseEnvironment(gym.Env, ABC):
 
         # Testing criteria for ending the episode
         done = self._isdone()
+        if done and self._obs_buffers is not None:
+            # The buffers are overwritten by the following reset
+            obs = {key: np.copy(value) for key, value in obs.items()}
 
         self._save_latest_step()
+        if self.profiler is not None:
+            self.profiler.lap('save')
 
         self.t_step += 1
 
@@ -287,7 +392,9 @@ class BaseEnvironment(gym.Env, ABC):
 
     def _update(self) -> None:
         """Updates the environment at each time-step. Can be customized in sub-classes."""
-        [obst.update(dt=self.config["t_step_size"]) for obst in self.obstacles if not obst.static]
+        if self.dynamic_obstacles is None or not self.dynamic_obstacles.manages(self.obstacles):
+            self.dynamic_obstacles = DynamicObstacleSet(self.obstacles)
+        self.dynamic_obstacles.update(dt=self.config["t_step_size"])
 
     @abstractmethod
     def _generate(self) -> None:    
@@ -302,6 +409,8 @@ class BaseEnvironment(gym.Env, ABC):
             self._viewer2d.close()
         if self._viewer3d is not None:
             self._viewer3d.close()
+        if self._episode_writer is not None:
+            self._episode_writer.close()
 
     def render(self, mode='human'):
         """Render one frame of the environment. 
@@ -309,8 +418,10 @@ class BaseEnvironment(gym.Env, ABC):
         image_arr = None
         try:
             if self.render_mode == '2d' or self.render_mode == 'both':
+                import gym_auv.rendering.render2d as render2d
                 image_arr = render2d.render_env(self, mode)
             if self.render_mode == '3d' or self.render_mode == 'both':
+                import gym_auv.rendering.render3d as render3d
                 image_arr = render3d.render_env(self, mode, self.config["t_step_size"])
         except OSError:
             image_arr = self._last_image_frame
@@ -325,6 +436,23 @@ class BaseEnvironment(gym.Env, ABC):
 
         return image_arr
 
+    def set_recording(self, recording:bool) -> None:
+        """
+        Enables or disables the capture of the vessel trajectory and of the last_episode
+        data used for reporting. Disabled by default if the 'lean_training' config
+        is set, in which case only the running statistics stored in history are kept.
+        When enabled during an episode, the trajectory is recorded from the current
+        timestep.
+
+        Parameters
+        ----------
+        recording : bool
+            Whether to record trajectories.
+        """
+        self.recording = recording
+        if self.vessel is not None:
+            self.vessel.set_trajectory_max_length(self.config["trajectory_max_length"] if recording else 1)
+
     def seed(self, seed=None):
         """Reseeds the random number generator used in the environment"""
         self.rng, seed = seeding.np_random(seed)
@@ -332,18 +460,21 @@ class BaseEnvironment(gym.Env, ABC):
 
     def _save_latest_step(self):
         latest_data = self.vessel.req_latest_data()
-        self._tmp_storage['cross_track_error'].append(abs(latest_data['navigation']['cross_track_error'])*100)
+        self._tmp_storage['cross_track_error'] += abs(latest_data['navigation']['cross_track_error'])*100
 
     def save_latest_episode(self, save_history=True):
         #print('Saving latest episode with save_history = ' + str(save_history))
-        self.last_episode = {
-            'path': self.path(np.linspace(0, self.path.length, 1000)) if self.path is not None else None,
-            'path_taken': np.array(self.vessel.path_taken),
-            'obstacles': np.array(self.obstacles)
-        }
+        if self.recording:
+            self.last_episode = {
+                'path': self.path(np.linspace(0, self.path.length, 1000)) if self.path is not None else None,
+                'path_taken': np.array(self.vessel.path_taken),
+                'obstacles': np.array(self.obstacles)
+            }
+        else:
+            self.last_episode = None
         if save_history:
             stats = {
-                'cross_track_error': np.array(self._tmp_storage['cross_track_error']).mean(),
+                'cross_track_error': self._tmp_storage['cross_track_error']/self.t_step,
                 'reached_goal': int(self.reached_goal),
                 'collision': int(self.collision),
                 'reward': self.cumulative_reward,
@@ -352,98 +483,77 @@ class BaseEnvironment(gym.Env, ABC):
                 'progress': self.progress,
                 'pathlength': self.path.length
             }
-            for key in self.history.keys():
-                self.history[key] = np.append(self.history[key], stats[key])
+            self.history.append(stats)
+            self._saved_episode = self.episode
+            if self._episode_writer is not None and self.recording:
+                self._episode_writer.write(self.episode, stats, self.last_episode)
 
+    def read_new_statistics(self) -> dict:
+        """Returns the statistics of the episodes completed since the last call, as
+        a dict holding an array for each statistic. Meant to be called through
+        env_method, so that only the new episodes are sent from the subprocesses."""
+        return self.history.read_new()
 
-    def store_statistics_to_file(self, path):
-        path_history = os.path.join(path, 'history.h5')
 
-        if not self.history:
+    def get_profile(self, reset:bool=False) -> dict:
+        """
+        Returns the durations of the stages of step() recorded since the
+        environment was created or last reset the profile, or None if the
+        'profile_step' config is not set. Meant to be called through env_method,
+        and merged with gym_auv.utils.step_profiler.merge_profiles.
+
+        Parameters
+        ----------
+        reset : bool
+            Whether to clear the recorded durations.
+
+        Returns
+        -------
+        profile : dict
+            See StepProfiler.get_profile.
+        """
+        if self.profiler is None:
+            return None
+        profile = self.profiler.get_profile()
+        if reset:
+            self.profiler.reset()
+        return profile
+
+    def attach_episode_writer(self, path:str, worker_index:int=None, flush_interval:int=100) -> None:
+        """
+        Attaches a persistent EpisodeWriter, logging the statistics and trajectory of
+        every subsequent episode to an HDF5 file in the given directory. Enables
+        recording of trajectories, see set_recording().
+
+        Parameters
+        ----------
+        path : str
+            Directory of the HDF5 file.
+        worker_index : int
+            Index of the training process or environment, giving each of them
+            its own file. If None, the file is named 'history.h5'.
+        flush_interval : int
+            Number of episodes buffered before writing to the file.
+        """
+        if self._episode_writer is not None:
+            self._episode_writer.close()
+        self._episode_writer = EpisodeWriter(os.path.join(path, worker_filename(worker_index)), flush_interval=flush_interval)
+        self.set_recording(True)
+
+    def store_statistics_to_file(self, path):
+        """Writes the statistics and trajectory of the latest episode to history.h5 in
+        the given directory, numbered with self.episode as when it was saved. The writer
+        attached by attach_episode_writer() is left as is, and only flushed if it
+        writes to the same file."""
+        if not len(self.history):
             print("DEBUG: environment.py: store_statistics_to_file(): self.history is empty, skipping...")
             return
 
-        if not os.path.exists(path_history):
-            f = tables.open_file(path_history, mode='w', title="Training Statistics")
-
-            group = f.create_group("/", "RL_agent", "DRL Agent Training statistics")
-            history_table = f.create_table(group, "history", Log, "History")
-            trajectory_table = f.create_table(group, "trajectory", TrajectoryLog, "Trajectories")
-
-            table_row = history_table.row  # Points to first row if table instance
-            table_row["episode"] = self.episode
-            table_row["timesteps"] = self.history["timesteps"]
-            table_row["duration"] = self.history["duration"]
-            table_row["reached_goal"] = self.history["reached_goal"]
-            table_row["collision"] = self.history["collision"]
-            table_row["cross_track_error"] = self.history["cross_track_error"]
-            table_row["reward"] = self.history["reward"]
-            table_row["progress"] = self.history["progress"]
-            table_row["pathlength"] = self.history["pathlength"]
-            table_row.append()
-            history_table.flush()
-
-            #path_array = f.create_array(group, "path", np.array(self.last_episode["path"]), "Path")
-            #path_taken_array = f.create_array(group, "path_taken", np.array(self.last_episode["path_taken"]), "Path taken")
-            #obstacles_array = f.create_array(group, "obstacles", np.array(self.last_episode["obstacles"]), "Obstacles")
-            table_row = trajectory_table.row
-            table_row["episode"] = self.episode
-            table_row["path"] = self.last_episode["path"]
-            table_row["path_taken"][:self.last_episode["path_taken"].shape[0], :] = self.last_episode["path_taken"]
-            table_row["obstacles"][:self.last_episode["obstacles"].shape[0], :] = self.last_episode["obstacles"] \
-                if self.last_episode["obstacles"] else None
-            table_row.append()
-            trajectory_table.flush()
-
-            f.close()
-        else:
-            f = tables.open_file(path_history, mode='a')
-            history_table = f.root.RL_agent.history
-            trajectory_table = f.root.RL_agent.trajectory
-
-            table_row = history_table.row
-
-            table_row["episode"] = self.episode
-            table_row["timesteps"] = self.history["timesteps"]
-            table_row["duration"] = self.history["duration"]
-            table_row["reached_goal"] = self.history["reached_goal"]
-            table_row["collision"] = self.history["collision"]
-            table_row["cross_track_error"] = self.history["cross_track_error"]
-            table_row["reward"] = self.history["reward"]
-            table_row["progress"] = self.history["progress"]
-            table_row["pathlength"] = self.history["pathlength"]
-            table_row.append()
-            history_table.flush()
-
-            #path_array_row = f.RL_agent.path.row
-            #path_array_row = self.last_episode["path"]
-            #path_taken_array = f.RL_agent.path_taken
-            #obstacles_array = f.RL_agent.obstacles
-            table_row = trajectory_table.row
-            table_row["episode"] = self.episode
-            table_row["path"] = self.last_episode["path"]
-            table_row["path_taken"][:self.last_episode["path_taken"].shape[0], :] = self.last_episode["path_taken"]
-            table_row["obstacles"][:self.last_episode["obstacles"].shape[0], :] = self.last_episode["obstacles"] \
-                if self.last_episode["obstacles"] else None
-            table_row.append()
-            trajectory_table.flush()
-
-            f.close()
-
-
-class Log(tables.IsDescription):
-    episode = tables.Int32Col()
-    timesteps = tables.Int32Col()
-    duration = tables.Float32Col()
-    reached_goal = tables.Int32Col()
-    collision = tables.Int32Col()
-    cross_track_error = tables.Int32Col()
-    reward = tables.Float32Col()
-    progress = tables.Float32Col()
-    pathlength = tables.Float32Col()
-
-
-class TrajectoryLog(tables.IsDescription):
-    episode = tables.Int32Col()
-    path = tables.Float32Col(shape=(2,1000))
-    path_taken = tables.Float32Col(shape=(10000, 2))
+        path_history = os.path.join(path, 'history.h5')
+        if self._episode_writer is not None and self._episode_writer.path == path_history:
+            # The attached writer has already logged the episode
+            self._episode_writer.flush()
+            return
+        episode_writer = EpisodeWriter(path_history)
+        episode_writer.write(self._saved_episode, self.history.row(-1), self.last_episode)
+        episode_writer.close()
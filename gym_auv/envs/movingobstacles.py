@@ -5,6 +5,7 @@ import gym_auv.utils.helpers as helpers
 from gym_auv.objects.vessel import Vessel
 from gym_auv.objects.path import RandomCurveThroughOrigin, Path
 from gym_auv.objects.obstacles import PolygonObstacle, VesselObstacle, CircularObstacle
+from gym_auv.objects.motion_models import ConstantVelocity
 from gym_auv.environment import BaseEnvironment
 from gym_auv.objects.rewarder import ColregRewarder, ColavRewarder, ColavRewarder2, PathRewarder
 import shapely.geometry, shapely.errors
@@ -49,18 +50,16 @@ class MovingObstacles(BaseEnvironment):
 
         # Adding moving obstacles
         for _ in range(self._n_moving_obst):
-            other_vessel_trajectory = []
-
             obst_position, obst_radius = helpers.generate_obstacle(self.rng, self.path, self.vessel, obst_radius_mean=10, displacement_dist_std=500)
             obst_direction = self.rng.rand()*2*np.pi
             obst_speed = np.random.choice(vessel_speed_vals, p=vessel_speed_density)
 
-            for i in range(10000):
-                other_vessel_trajectory.append((i, (
-                    obst_position[0] + i*obst_speed*np.cos(obst_direction), 
-                    obst_position[1] + i*obst_speed*np.sin(obst_direction)
-                )))
-            other_vessel_obstacle = VesselObstacle(width=obst_radius, trajectory=other_vessel_trajectory)
+            other_vessel_motion = ConstantVelocity(
+                obst_position,
+                obst_speed*np.array([np.cos(obst_direction), np.sin(obst_direction)]),
+                duration=9999
+            )
+            other_vessel_obstacle = VesselObstacle(width=obst_radius, motion=other_vessel_motion)
 
             self.obstacles.append(other_vessel_obstacle)
 
@@ -6,6 +6,7 @@ import gym_auv.utils.geomutils as geom
 from gym_auv.objects.vessel import Vessel
 from gym_auv.objects.path import RandomCurveThroughOrigin, Path
 from gym_auv.objects.obstacles import CircularObstacle, VesselObstacle
+from gym_auv.objects.motion_models import ConstantVelocity, PiecewiseLinear
 from gym_auv.environment import BaseEnvironment
 
 import os
@@ -17,7 +18,7 @@ deg2rad = math.pi/180
 
 class TestScenario0(BaseEnvironment):
     def _generate(self):
-        self.path = Path([[0, 0, 50, 50], [0, 500, 600, 1000]])
+        self.path = Path.cached([[0, 0, 50, 50], [0, 500, 600, 1000]])
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -40,7 +41,7 @@ class TestScenario0(BaseEnvironment):
 
 class TestScenario1(BaseEnvironment):
     def _generate(self):
-        self.path = Path([[0, 1100], [0, 1100]])
+        self.path = Path.cached([[0, 1100], [0, 1100]])
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -70,7 +71,7 @@ class TestScenario2(BaseEnvironment):
             waypoint_array.append([x, y])
 
         waypoints = np.vstack(waypoint_array).T
-        self.path = Path(waypoints)
+        self.path = Path.cached(waypoints)
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -102,7 +103,7 @@ class TestScenario2(BaseEnvironment):
 class TestScenario3(BaseEnvironment):
     def _generate(self):
         waypoints = np.vstack([[0, 0], [0, 500]]).T
-        self.path = Path(waypoints)
+        self.path = Path.cached(waypoints)
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -123,7 +124,7 @@ class TestScenario3(BaseEnvironment):
 class TestScenario4(BaseEnvironment):
     def _generate(self):
         waypoints = np.vstack([[0, 0], [0, 500]]).T
-        self.path = Path(waypoints)
+        self.path = Path.cached(waypoints)
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -147,7 +148,7 @@ class TestHeadOn(BaseEnvironment):
     def _generate(self):
 
         waypoints = np.vstack([[0, 0], [0, 250]]).T
-        self.path = Path(waypoints)
+        self.path = Path.cached(waypoints)
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -165,16 +166,13 @@ class TestHeadOn(BaseEnvironment):
         start_x = vessel_pos[0] + trajectory_radius*np.sin(start_angle)
         start_y = vessel_pos[1] + trajectory_radius*np.cos(start_angle)
 
-        vessel_trajectory = [[0, (start_x, start_y)]]
+        vessel_motion = ConstantVelocity(
+            (start_x, start_y),
+            -trajectory_speed*np.array([np.sin(start_angle), np.cos(start_angle)]),
+            duration=4999
+        )
 
-
-        for i in range(1,5000):
-            vessel_trajectory.append((1*i, (
-                start_x - trajectory_speed*np.sin(start_angle)*i,
-                start_y - trajectory_speed*np.cos(start_angle)*i
-            )))
-
-        self.obstacles = [VesselObstacle(width=30, trajectory=vessel_trajectory)]
+        self.obstacles = [VesselObstacle(width=30, motion=vessel_motion)]
 
         self._update()
 
@@ -182,7 +180,7 @@ class TestCrossing(BaseEnvironment):
     def _generate(self):
 
         waypoints = np.vstack([[0, 0], [0, 500]]).T
-        self.path = Path(waypoints)
+        self.path = Path.cached(waypoints)
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -201,15 +199,13 @@ class TestCrossing(BaseEnvironment):
         start_y = vessel_pos[1] + trajectory_radius*np.cos(start_angle)
 
     #    vessel_trajectory = [[0, (vessel_pos[1], trajectory_radius+vessel_pos[0])]] # in front, ahead
-        vessel_trajectory = [[0, (start_x,start_y)]]
+        vessel_motion = ConstantVelocity(
+            (start_x, start_y),
+            trajectory_speed*np.array([np.sin(trajectory_shift), np.cos(trajectory_shift)]),
+            duration=4999
+        )
 
-        for i in range(1,5000):
-            vessel_trajectory.append((1*i, (
-                start_x + trajectory_speed*np.sin(trajectory_shift)*i,
-                start_y + trajectory_speed*np.cos(trajectory_shift)*i
-            )))
-
-        self.obstacles = [VesselObstacle(width=30, trajectory=vessel_trajectory)]
+        self.obstacles = [VesselObstacle(width=30, motion=vessel_motion)]
 
         self._update()
 
@@ -217,7 +213,7 @@ class TestCrossing1(BaseEnvironment):
     def _generate(self):
 
         waypoints = np.vstack([[0, 0], [0, 500]]).T
-        self.path = Path(waypoints)
+        self.path = Path.cached(waypoints)
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -236,15 +232,13 @@ class TestCrossing1(BaseEnvironment):
         start_y = vessel_pos[1] + trajectory_radius*np.cos(start_angle)
 
     #    vessel_trajectory = [[0, (vessel_pos[1], trajectory_radius+vessel_pos[0])]] # in front, ahead
-        vessel_trajectory = [[0, (start_x,start_y)]]
-
-        for i in range(1,5000):
-            vessel_trajectory.append((1*i, (
-                start_x + trajectory_speed*np.sin(trajectory_shift)*i,
-                start_y + trajectory_speed*np.cos(trajectory_shift)*i
-            )))
+        vessel_motion = ConstantVelocity(
+            (start_x, start_y),
+            trajectory_speed*np.array([np.sin(trajectory_shift), np.cos(trajectory_shift)]),
+            duration=4999
+        )
 
-        self.obstacles = [VesselObstacle(width=30, trajectory=vessel_trajectory)]
+        self.obstacles = [VesselObstacle(width=30, motion=vessel_motion)]
 
         self._update()
 
@@ -252,7 +246,7 @@ class EmptyScenario(BaseEnvironment):
 
     def _generate(self):
         waypoints = np.vstack([[25, 10], [25, 200]]).T
-        self.path = Path(waypoints)
+        self.path = Path.cached(waypoints)
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -269,7 +263,7 @@ class EmptyScenario(BaseEnvironment):
 class DebugScenario(BaseEnvironment):
     def _generate(self):
         waypoints = np.vstack([[250, 100], [250, 200]]).T
-        self.path = Path(waypoints)
+        self.path = Path.cached(waypoints)
 
         init_state = self.path(0)
         init_angle = self.path.get_direction(0)
@@ -283,29 +277,29 @@ class DebugScenario(BaseEnvironment):
         self.vessel_obstacles = []
 
         for vessel_idx in range(5):
-            other_vessel_trajectory = []
             trajectory_shift = self.rng.rand()*2*np.pi
             trajectory_radius = self.rng.rand()*40 + 30
             trajectory_speed = self.rng.rand()*0.003 + 0.003
-            for i in range(10000):
-                #other_vessel_trajectory.append((10*i, (250, 400-10*i)))
-                other_vessel_trajectory.append((1*i, (
-                    250 + trajectory_radius*np.cos(trajectory_speed*i + trajectory_shift),
-                    150 + 70*vessel_idx + trajectory_radius*np.sin(trajectory_speed*i + trajectory_shift)
-                )))
-            other_vessel_obstacle = VesselObstacle(width=6, trajectory=other_vessel_trajectory)
+            times = np.arange(10000)
+            other_vessel_motion = PiecewiseLinear(times, np.column_stack([
+                250 + trajectory_radius*np.cos(trajectory_speed*times + trajectory_shift),
+                150 + 70*vessel_idx + trajectory_radius*np.sin(trajectory_speed*times + trajectory_shift)
+            ]))
+            other_vessel_obstacle = VesselObstacle(width=6, motion=other_vessel_motion)
 
             self.obstacles.append(other_vessel_obstacle)
             self.vessel_obstacles.append(other_vessel_obstacle)
 
         for vessel_idx in range(5):
-            other_vessel_trajectory = []
             trajectory_start = self.rng.rand()*200 + 150
             trajectory_speed = self.rng.rand()*0.03 + 0.03
             trajectory_shift = 10*self.rng.rand()
-            for i in range(10000):
-                other_vessel_trajectory.append((i, (245 + 2.5*vessel_idx + trajectory_shift, trajectory_start-10*trajectory_speed*i)))
-            other_vessel_obstacle = VesselObstacle(width=6, trajectory=other_vessel_trajectory)
+            other_vessel_motion = ConstantVelocity(
+                (245 + 2.5*vessel_idx + trajectory_shift, trajectory_start),
+                (0, -10*trajectory_speed),
+                duration=9999
+            )
+            other_vessel_obstacle = VesselObstacle(width=6, motion=other_vessel_motion)
 
             self.obstacles.append(other_vessel_obstacle)
             self.vessel_obstacles.append(other_vessel_obstacle)
@@ -0,0 +1,64 @@
+"""
+This module implements a batched update of the moving obstacles of an
+environment. The hulls of all vessel obstacles are stored as arrays and
+transformed to their new positions and headings at once, while their shapely
+boundaries are only built on demand, e.g. for rendering or distance queries.
+"""
+import numpy as np
+
+from gym_auv.objects.obstacles import VesselObstacle, vessel_hulls
+
+class DynamicObstacleSet():
+    """
+    Batched updater of the dynamic obstacles in a list of obstacles. Vessel
+    obstacles are moved individually according to their motion models, after
+    which their hulls are transformed in one batch. Other dynamic obstacles are
+    updated individually.
+
+    Parameters
+    ----------
+    obstacles : list
+        List of obstacles (BaseObstacle instances), of which the dynamic ones
+        are updated.
+    """
+
+    def __init__(self, obstacles:list) -> None:
+        self._obstacles = obstacles
+        self._n_obstacles = len(obstacles)
+
+        dynamic_obstacles = [obst for obst in obstacles if not obst.static]
+        self._vessels = [obst for obst in dynamic_obstacles if isinstance(obst, VesselObstacle)]
+        self._others = [obst for obst in dynamic_obstacles if not isinstance(obst, VesselObstacle)]
+
+        self._templates = np.array([vessel._hull_template for vessel in self._vessels]).reshape(-1, 5, 2)
+        self._centroids = np.array([vessel._hull_centroid for vessel in self._vessels]).reshape(-1, 2)
+        self.positions = np.zeros((len(self._vessels), 2))
+        self.headings = np.zeros((len(self._vessels),))
+        self.hulls = np.zeros(self._templates.shape)
+
+    def manages(self, obstacles:list) -> bool:
+        """Returns whether the set was built for the given obstacle list."""
+        return obstacles is self._obstacles and len(obstacles) == self._n_obstacles
+
+    def update(self, dt:float) -> None:
+        """
+        Updates all dynamic obstacles, equivalently to calling update(dt) on
+        each of them.
+
+        Parameters
+        ----------
+        dt : float
+            Time step [s].
+        """
+        for k, vessel in enumerate(self._vessels):
+            vessel._update(dt)
+            self.positions[k] = vessel.position
+            self.headings[k] = vessel.heading
+
+        if self._vessels:
+            self.hulls = vessel_hulls(self._templates, self._centroids, self.positions, self.headings)
+            for vessel, hull in zip(self._vessels, self.hulls):
+                vessel._set_hull(hull)
+
+        for obst in self._others:
+            obst.update(dt)
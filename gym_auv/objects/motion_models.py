@@ -0,0 +1,164 @@
+"""
+This module implements the motion models of the moving obstacles, i.e. compact
+descriptions of their trajectories from which velocities and positions are
+evaluated on demand, instead of being stored for every second of the trajectory.
+
+A trajectory starts at t = 0 and is traversed in steps of one second, the
+velocity being constant within each step. A trajectory of duration T thus
+holds the velocities of the steps 0, 1, ..., T - 1.
+"""
+import numpy as np
+from abc import ABC, abstractmethod
+
+class MotionModel(ABC):
+    """Base class of the motion models of VesselObstacle."""
+
+    @property
+    @abstractmethod
+    def duration(self) -> int:
+        """Number of one-second steps of the trajectory."""
+
+    @property
+    @abstractmethod
+    def times(self) -> np.ndarray:
+        """Array of shape (N,) holding the times [s] of the waypoints."""
+
+    @property
+    @abstractmethod
+    def waypoints(self) -> np.ndarray:
+        """Array of shape (N, 2) holding the waypoints of the trajectory."""
+
+    @property
+    def start_position(self) -> np.ndarray:
+        """Position at t = 0."""
+        return np.array(self.waypoints[0], dtype=float)
+
+    @property
+    def trajectory(self) -> list:
+        """The trajectory as a list of tuples (t, (x, y)), built on demand."""
+        return [(t, (x, y)) for t, (x, y) in zip(self.times.tolist(), self.waypoints.tolist())]
+
+    @abstractmethod
+    def velocity(self, index:int) -> np.ndarray:
+        """
+        Returns the velocity during the given step of the trajectory.
+
+        Parameters
+        ----------
+        index : int
+            Step index, in [0, duration).
+
+        Returns
+        -------
+        velocity : np.ndarray
+            Velocity [m/s] as an array [vx, vy].
+        """
+
+    def position_at(self, t:float) -> np.ndarray:
+        """
+        Returns the position at time t by linear interpolation between the
+        waypoints. Times outside the trajectory are clamped to its end points.
+
+        Parameters
+        ----------
+        t : float
+            Time [s] since the start of the trajectory.
+
+        Returns
+        -------
+        position : np.ndarray
+            Position as an array [x, y].
+        """
+        waypoints = self.waypoints
+        return np.array([np.interp(t, self.times, waypoints[:, 0]), np.interp(t, self.times, waypoints[:, 1])])
+
+class ConstantVelocity(MotionModel):
+    """
+    Straight trajectory traversed at constant velocity.
+
+    Parameters
+    ----------
+    position : np.ndarray
+        Position [x, y] at t = 0.
+    velocity : np.ndarray
+        Velocity [vx, vy] in m/s.
+    duration : int
+        Number of one-second steps of the trajectory.
+    """
+
+    def __init__(self, position:np.ndarray, velocity:np.ndarray, duration:int) -> None:
+        self._position = np.array(position, dtype=float)
+        self._velocity = np.array(velocity, dtype=float)
+        self._duration = int(duration)
+
+    @property
+    def duration(self) -> int:
+        return self._duration
+
+    @property
+    def times(self) -> np.ndarray:
+        return np.array([0, self._duration])
+
+    @property
+    def waypoints(self) -> np.ndarray:
+        return np.vstack([self._position, self._position + self._duration*self._velocity])
+
+    def velocity(self, index:int) -> np.ndarray:
+        return self._velocity
+
+    def position_at(self, t:float) -> np.ndarray:
+        return self._position + min(max(t, 0), self._duration)*self._velocity
+
+class PiecewiseLinear(MotionModel):
+    """
+    Trajectory through time-stamped waypoints, traversed at constant velocity
+    between consecutive waypoints. Waypoints with a time not later than the
+    preceding one get no steps, as in the legacy trajectory lists of
+    VesselObstacle.
+
+    Parameters
+    ----------
+    times : np.ndarray
+        Array of shape (N,) holding the times [s] of the waypoints, as
+        integers counted from the first waypoint.
+    waypoints : np.ndarray
+        Array of shape (N, 2) holding the waypoints.
+    """
+
+    def __init__(self, times:np.ndarray, waypoints:np.ndarray) -> None:
+        self._times = np.asarray(times, dtype=np.int64)
+        self._waypoints = np.asarray(waypoints, dtype=float).reshape(-1, 2)
+        assert len(self._times) == len(self._waypoints), 'Expected one time per waypoint'
+
+        dt = np.diff(self._times)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._velocities = np.diff(self._waypoints, axis=0)/dt[:, None]
+        # Index of the first step after each segment
+        self._segment_ends = np.cumsum(np.maximum(dt, 0))
+        self._duration = int(self._segment_ends[-1]) if len(self._segment_ends) else 0
+
+    @classmethod
+    def from_trajectory(cls, trajectory:list) -> 'PiecewiseLinear':
+        """
+        Returns the motion model of a trajectory given as a list of tuples
+        (t, (x, y)).
+        """
+        if len(trajectory) == 0:
+            return cls(np.zeros(0), np.zeros((0, 2)))
+        times, waypoints = zip(*trajectory)
+        return cls(np.array(times), np.array(waypoints))
+
+    @property
+    def duration(self) -> int:
+        return self._duration
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._times
+
+    @property
+    def waypoints(self) -> np.ndarray:
+        return self._waypoints
+
+    def velocity(self, index:int) -> np.ndarray:
+        return self._velocities[np.searchsorted(self._segment_ends, index, side='right')]
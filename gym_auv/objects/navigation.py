@@ -0,0 +1,127 @@
+"""
+This module implements the navigation states of vessels following a path,
+i.e. their attitude with respect to the path, computed for several vessels in
+one vectorised pass. Vessel.navigate evaluates it for a single vessel, and the
+navigation features can be written directly into a preallocated observation
+buffer.
+
+The vessel states are given as an array of shape (N, 6) holding the rows
+[x, y, psi, u, v, r], as Vessel._state.
+"""
+import numpy as np
+
+import gym_auv.utils.geomutils as geom
+
+# Columns of the navigation features, as Vessel.NAVIGATION_FEATURES
+NAVIGATION_FEATURES = (
+    'surge_velocity',
+    'sway_velocity',
+    'yaw_rate',
+    'look_ahead_heading_error',
+    'heading_error',
+    'cross_track_error'
+)
+
+def compute_navigation(path, states:np.ndarray, look_ahead_distance:float, extra_look_ahead_distances:tuple=(),
+                       arclength_hints:np.ndarray=None, table_resolution:float=None, out:np.ndarray=None) -> tuple:
+    """
+    Computes the navigation states of vessels following the same path.
+
+    Parameters
+    ----------
+    path : Path
+        Path followed by all vessels.
+    states : np.ndarray
+        Array of shape (N, 6) holding the vessel states [x, y, psi, u, v, r].
+    look_ahead_distance : float
+        Path look-ahead distance [m] of the navigation features.
+    extra_look_ahead_distances : tuple
+        Further look-ahead distances [m], each adding the look-ahead heading
+        error and the heading error to the look-ahead point at this distance
+        as two columns after the navigation features.
+    arclength_hints : np.ndarray
+        Array of shape (N,) holding the closest arclengths of the vessels at
+        the previous step, used to speed up the closest-point search, see
+        Path.get_closest_arclengths. NaN entries, or None, mean no hint.
+    table_resolution : float
+        If given, the path is interpolated from its sample table of this
+        resolution instead of evaluating the spline, see
+        Path.build_sample_table.
+    out : np.ndarray
+        Array of shape (N, 6 + 2*len(extra_look_ahead_distances)) the
+        features are written into, e.g. a view of an observation buffer.
+
+    Returns
+    -------
+    features : np.ndarray
+        Array of shape (N, 6 + 2*len(extra_look_ahead_distances)) holding
+        the NAVIGATION_FEATURES of each vessel, followed by the features of
+        the extra look-ahead distances. This is out if given.
+    navigation : dict
+        Dictionary of arrays of shape (N,) holding the navigation states,
+        with the keys of Vessel._last_navi_state_dict and 'progress'.
+    """
+    states = np.asarray(states, dtype=float).reshape(-1, 6)
+    positions = states[:, 0:2]
+    headings = states[:, 2]
+    n_vessels = len(states)
+
+    if table_resolution is not None:
+        path.build_sample_table(table_resolution)
+        get_position, get_direction = path.lookup_position, path.lookup_direction
+    else:
+        get_position, get_direction = path, path.get_direction
+
+    # Calculating path arclength at reference point, i.e. the point closest to the vessel
+    vessel_arclengths = path.get_closest_arclengths(positions, arclength_hints)
+
+    # Evaluating the path at the reference points and at all look-ahead points in one call
+    look_ahead_distances = np.array((look_ahead_distance,) + tuple(extra_look_ahead_distances), dtype=float)
+    target_arclengths = np.minimum(path.length, vessel_arclengths[:, np.newaxis] + look_ahead_distances)
+    arclengths = np.concatenate([vessel_arclengths, target_arclengths.ravel()])
+    path_positions = get_position(arclengths).reshape(2, -1)
+    path_directions = get_direction(arclengths).ravel()
+
+    # Calculating tangential path direction and cross-track error at reference point
+    path_direction = path_directions[:n_vessels]
+    errors = path_positions[:, :n_vessels].T - positions
+    cross_track_error = np.sin(-path_direction)*errors[:, 0] + np.cos(-path_direction)*errors[:, 1]
+
+    # Calculating heading errors with respect to the path direction at, and the vector to, the look-ahead points
+    look_ahead_path_directions = path_directions[n_vessels:].reshape(n_vessels, -1)
+    look_ahead_heading_errors = geom.princip(look_ahead_path_directions - headings[:, np.newaxis])
+    target_vectors = path_positions[:, n_vessels:].reshape(2, n_vessels, -1) - positions.T[:, :, np.newaxis]
+    target_headings = np.arctan2(target_vectors[1], target_vectors[0])
+    heading_errors = geom.princip(target_headings - headings[:, np.newaxis])
+
+    goal_vectors = path.end - positions
+    goal_distance = np.sqrt(goal_vectors[:, 0]*goal_vectors[:, 0] + goal_vectors[:, 1]*goal_vectors[:, 1])
+
+    n_features = len(NAVIGATION_FEATURES) + 2*len(extra_look_ahead_distances)
+    if out is None:
+        out = np.empty((n_vessels, n_features))
+    elif out.shape != (n_vessels, n_features):
+        raise ValueError('Expected an output array of shape {}, got {}'.format((n_vessels, n_features), out.shape))
+    out[:, 0:3] = states[:, 3:6]
+    out[:, 3] = look_ahead_heading_errors[:, 0]
+    out[:, 4] = heading_errors[:, 0]
+    out[:, 5] = cross_track_error/100
+    out[:, 6::2] = look_ahead_heading_errors[:, 1:]
+    out[:, 7::2] = heading_errors[:, 1:]
+
+    navigation = {
+        'surge_velocity': states[:, 3],
+        'sway_velocity': states[:, 4],
+        'yaw_rate': states[:, 5],
+        'look_ahead_heading_error': look_ahead_heading_errors[:, 0],
+        'heading_error': heading_errors[:, 0],
+        'cross_track_error': cross_track_error/100,
+        'target_heading': target_headings[:, 0],
+        'look_ahead_path_direction': look_ahead_path_directions[:, 0],
+        'path_direction': path_direction,
+        'vessel_arclength': vessel_arclengths,
+        'target_arclength': target_arclengths[:, 0],
+        'goal_distance': goal_distance,
+        'progress': vessel_arclengths/path.length
+    }
+    return out, navigation
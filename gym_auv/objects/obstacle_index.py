@@ -0,0 +1,127 @@
+"""
+This module implements a spatial index for looking up the obstacles that are
+within a given distance of a point, e.g. the obstacles within the range of the
+vessel's rangefinder sensors.
+"""
+import numpy as np
+import shapely.geometry
+import shapely.strtree
+
+class ObstacleIndex():
+    """
+    Spatial index over a list of obstacles. Static obstacles are stored in a
+    shapely STRtree that is built once, while dynamic obstacles are stored in a
+    uniform grid that is incrementally updated as they move.
+
+    Parameters
+    ----------
+    obstacles : list
+        List of obstacles (BaseObstacle instances) to index.
+    cell_size : float
+        Side length of the grid cells used for the dynamic obstacles [m].
+        Should be in the order of the typical query distance.
+    """
+
+    def __init__(self, obstacles:list, cell_size:float=150.0) -> None:
+        self._obstacles = obstacles
+        self._n_obstacles = len(obstacles)
+        self._cell_size = float(cell_size)
+
+        self._static_idx = [i for i, obst in enumerate(obstacles) if obst.static]
+        self._dynamic_idx = [i for i, obst in enumerate(obstacles) if not obst.static]
+
+        self._static_boundaries = [obstacles[i].boundary for i in self._static_idx]
+        self._static_tree = shapely.strtree.STRtree(self._static_boundaries) if self._static_boundaries else None
+        self._static_geom_ids = {id(boundary): i for i, boundary in zip(self._static_idx, self._static_boundaries)}
+
+        self._grid = {}
+        self._dynamic_cells = {}
+        self._refresh_dynamic()
+
+    def indexes(self, obstacles:list) -> bool:
+        """Returns whether the index was built for the given obstacle list."""
+        return obstacles is self._obstacles and len(obstacles) == self._n_obstacles
+
+    def query(self, point, distance:float) -> list:
+        """
+        Returns the obstacles whose boundary is closer than distance to the point,
+        in the order they appear in the indexed obstacle list.
+
+        Parameters
+        ----------
+        point : shapely.geometry.Point
+            Query point.
+        distance : float
+            Query distance [m].
+
+        Returns
+        -------
+        obstacles : list
+        """
+        self._refresh_dynamic()
+        candidates = self._query_static(point, distance) + self._query_dynamic(point, distance)
+        return [
+            self._obstacles[i] for i in sorted(candidates)
+            if float(point.distance(self._obstacles[i].boundary)) < distance
+        ]
+
+    def _query_static(self, point, distance:float) -> list:
+        if self._static_tree is None:
+            return []
+        result = self._static_tree.query(shapely.geometry.box(
+            point.x - distance, point.y - distance, point.x + distance, point.y + distance
+        ))
+        if len(result) and np.issubdtype(np.asarray(result).dtype, np.integer):
+            # Shapely 2.x returns the indices of the matching geometries
+            return [self._static_idx[i] for i in result]
+        # Shapely 1.x returns the matching geometries themselves
+        return [self._static_geom_ids[id(boundary)] for boundary in result]
+
+    def _query_dynamic(self, point, distance:float) -> list:
+        if not self._dynamic_idx:
+            return []
+        i_min, j_min, i_max, j_max = self._cell_range(
+            (point.x - distance, point.y - distance, point.x + distance, point.y + distance)
+        )
+        candidates = set()
+        for i in range(i_min, i_max + 1):
+            for j in range(j_min, j_max + 1):
+                candidates.update(self._grid.get((i, j), ()))
+        return list(candidates)
+
+    def _cell_range(self, bounds:tuple) -> tuple:
+        x_min, y_min, x_max, y_max = bounds
+        return (
+            int(np.floor(x_min/self._cell_size)),
+            int(np.floor(y_min/self._cell_size)),
+            int(np.floor(x_max/self._cell_size)),
+            int(np.floor(y_max/self._cell_size))
+        )
+
+    def _refresh_dynamic(self) -> None:
+        """Moves the dynamic obstacles that have left their grid cells since the
+        last refresh to the grid cells covered by their new bounding box."""
+        for obst_idx in self._dynamic_idx:
+            cells = self._cell_range(self._obstacles[obst_idx].bounds)
+            old_cells = self._dynamic_cells.get(obst_idx)
+            if cells == old_cells:
+                continue
+            if old_cells is not None:
+                self._remove_from_grid(obst_idx, old_cells)
+            self._add_to_grid(obst_idx, cells)
+            self._dynamic_cells[obst_idx] = cells
+
+    def _add_to_grid(self, obst_idx:int, cells:tuple) -> None:
+        i_min, j_min, i_max, j_max = cells
+        for i in range(i_min, i_max + 1):
+            for j in range(j_min, j_max + 1):
+                self._grid.setdefault((i, j), set()).add(obst_idx)
+
+    def _remove_from_grid(self, obst_idx:int, cells:tuple) -> None:
+        i_min, j_min, i_max, j_max = cells
+        for i in range(i_min, i_max + 1):
+            for j in range(j_min, j_max + 1):
+                cell = self._grid[(i, j)]
+                cell.discard(obst_idx)
+                if not cell:
+                    del self._grid[(i, j)]
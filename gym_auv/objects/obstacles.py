@@ -1,27 +1,75 @@
 import numpy as np
 import shapely.geometry
-import shapely.affinity
 import gym_auv.utils.geomutils as geom
+import gym_auv.utils.raycast as raycast
+from gym_auv.objects.motion_models import PiecewiseLinear
 from abc import ABC, abstractmethod
 import copy
 
+def vessel_hulls(templates:np.ndarray, centroids:np.ndarray, positions:np.ndarray, headings:np.ndarray) -> np.ndarray:
+    """
+    Returns the hull vertices of a batch of vessels, rotating the hull templates
+    by the headings about their centroids and translating them to the positions.
+    The arithmetic follows shapely.affinity.rotate and translate, such that the
+    vertices are identical to those of the transformed template polygons.
+
+    Parameters
+    ----------
+    templates : np.ndarray
+        Array of shape (K, V, 2) holding the hull vertices at the origin and zero heading.
+    centroids : np.ndarray
+        Array of shape (K, 2) holding the centroids of the template hulls.
+    positions : np.ndarray
+        Array of shape (K, 2) holding the positions of the vessels.
+    headings : np.ndarray
+        Array of shape (K,) holding the headings of the vessels.
+
+    Returns
+    -------
+    hulls : np.ndarray
+        Array of shape (K, V, 2).
+    """
+    cosp = np.cos(headings)
+    sinp = np.sin(headings)
+    cosp[np.abs(cosp) < 2.5e-16] = 0.0
+    sinp[np.abs(sinp) < 2.5e-16] = 0.0
+    x0, y0 = centroids[:, 0], centroids[:, 1]
+    xoff = (x0 - x0*cosp + y0*sinp)[:, None]
+    yoff = (y0 - x0*sinp - y0*cosp)[:, None]
+    x, y = templates[:, :, 0], templates[:, :, 1]
+    hulls = np.empty(templates.shape)
+    hulls[:, :, 0] = (cosp[:, None]*x + (-sinp)[:, None]*y + xoff) + positions[:, 0, None]
+    hulls[:, :, 1] = (sinp[:, None]*x + cosp[:, None]*y + yoff) + positions[:, 1, None]
+    return hulls
+
 class BaseObstacle(ABC):
     def __init__(self, *args, **kwargs) -> None:
         """Initializes obstacle instance by calling private setup method implemented by
          subclasses of BaseObstacle and calculating obstacle boundary."""
         self._prev_position = []
         self._prev_heading = []
+        self._segments = None
         self._setup(*args, **kwargs)
-        self._boundary = self._calculate_boundary()
-        if not self._boundary.is_valid:
-            self._boundary = self._boundary.buffer(0)
-        self._init_boundary = copy.deepcopy(self._boundary)
+        self._boundary, self._init_boundary = self._calculate_initial_boundaries()
+
+    def _calculate_initial_boundaries(self) -> tuple:
+        """Returns the boundary of the obstacle, repaired if invalid, and a copy of
+        it kept as the initial boundary."""
+        boundary = self._calculate_boundary()
+        if not boundary.is_valid:
+            boundary = boundary.buffer(0)
+        return boundary, copy.deepcopy(boundary)
 
 
     @property
     def boundary(self) -> shapely.geometry.Polygon:
         """shapely.geometry.Polygon object used for simulating the 
-        sensors' detection of the obstacle instance."""
+        sensors' detection of the obstacle instance. Recalculated on
+        demand after the obstacle has changed."""
+        if self._boundary is None:
+            self._boundary = self._calculate_boundary()
+            if not self._boundary.is_valid:
+                self._boundary = self._boundary.buffer(0)
         return self._boundary
 
     @property
@@ -30,14 +78,31 @@ class BaseObstacle(ABC):
         sensors' detection of the obstacle instance."""
         return self._init_boundary
 
+    @property
+    def segments(self) -> np.ndarray:
+        """Array of shape (M, 4) holding the line segments [x1, y1, x2, y2] of
+        the obstacle boundary, used by the vectorised sensor simulation."""
+        if self._segments is None:
+            self._segments = raycast.boundary_segments(self.boundary)
+        return self._segments
+
+    @property
+    def bounds(self) -> tuple:
+        """Bounding box (x_min, y_min, x_max, y_max) of the obstacle boundary."""
+        return self.boundary.bounds
+
+    @property
+    def filled(self) -> bool:
+        """Whether the obstacle has an area, i.e. blocks rays starting inside it."""
+        return self.boundary.geom_type in raycast.FILLED_GEOM_TYPES
+
     def update(self, dt:float) -> None:
         """Updates the obstacle according to its dynamic behavior, e.g. 
         a ship model and recalculates the boundary."""
         has_changed = self._update(dt)
         if has_changed:
-            self._boundary = self._calculate_boundary()
-            if not self._boundary.is_valid:
-                self._boundary = self._boundary.buffer(0)
+            self._boundary = None
+            self._segments = None
 
     @abstractmethod
     def _calculate_boundary(self) -> shapely.geometry.Polygon:
@@ -89,14 +154,26 @@ class CircularObstacle(BaseObstacle):
         return shapely.geometry.Point(*self.position).buffer(self.radius).boundary.simplify(0.3, preserve_topology=False)
 
 class PolygonObstacle(BaseObstacle):
-    def _setup(self, points, color=(0.6, 0, 0)):
+    def _setup(self, points, color=(0.6, 0, 0), boundary=None):
+        """If boundary is given, e.g. a previously repaired boundary loaded from
+        a cache, it is used instead of the polygon spanned by points."""
         self.static = True
         self.color = color
         self.points = points
+        self._given_boundary = boundary
 
     def _calculate_boundary(self):
+        if self._given_boundary is not None:
+            return self._given_boundary
         return shapely.geometry.Polygon(self.points)
 
+    def _calculate_initial_boundaries(self):
+        if self._given_boundary is None:
+            return super()._calculate_initial_boundaries()
+        # A given boundary has already been validated, and as static obstacles are
+        # never modified, it is neither checked again nor copied
+        return self._given_boundary, self._given_boundary
+
 class LineObstacle(BaseObstacle):
     def _setup(self, points):
         self.static = True
@@ -106,26 +183,15 @@ class LineObstacle(BaseObstacle):
         return shapely.geometry.LineString(self.points)
 
 class VesselObstacle(BaseObstacle):
-    def _setup(self, width, trajectory, init_position=None, init_heading=None, init_update=True, name=''):
+    def _setup(self, width, trajectory=None, init_position=None, init_heading=None, init_update=True, name='', motion=None):
+        """The trajectory is given either as a MotionModel instance, or as a list of
+        tuples (t, (x, y)), which is converted to a PiecewiseLinear motion model."""
         self.static = False
         self.width = width
-        self.trajectory = trajectory
-        self.trajectory_velocities = []
+        if motion is None and trajectory is not None:
+            motion = PiecewiseLinear.from_trajectory(trajectory)
+        self.motion = motion
         self.name = name
-        i = 0
-        while i < len(trajectory)-1:
-            cur_t = trajectory[i][0]
-            next_t = trajectory[i+1][0]
-            cur_waypoint = trajectory[i][1]
-            next_waypoint = trajectory[i+1][1]
-
-            dx = (next_waypoint[0] - cur_waypoint[0])/(next_t - cur_t)
-            dy = (next_waypoint[1] - cur_waypoint[1])/(next_t - cur_t)
-
-            for _ in range(cur_t, next_t):
-                self.trajectory_velocities.append((dx, dy))
-            
-            i+= 1
 
         self.waypoint_counter = 0
         self.points = [
@@ -135,10 +201,13 @@ class VesselObstacle(BaseObstacle):
             (3/2*self.width, 0),
             (self.width/2, -self.width/2),
         ]
+        self._hull_template = np.array(self.points, dtype=float)
+        self._hull_centroid = np.array(shapely.geometry.Polygon(self.points).centroid.coords[0])
+        self._hull = None
         if init_position is not None:
             self.position = init_position
         else:
-            self.position = np.array(self.trajectory[0][1])
+            self.position = self.motion.start_position
         self.init_position = self.position.copy() 
         if init_heading is not None:
             self.heading = init_heading
@@ -148,18 +217,59 @@ class VesselObstacle(BaseObstacle):
         if init_update:
             self.update(dt=0.1)
 
+    @property
+    def trajectory(self) -> list:
+        """The trajectory of the obstacle as a list of tuples (t, (x, y))."""
+        return self.motion.trajectory
+
+    @property
+    def hull(self) -> np.ndarray:
+        """Array of shape (5, 2) holding the vertices of the hull at the current
+        position and heading."""
+        if self._hull is None:
+            self._hull = vessel_hulls(
+                self._hull_template[None], self._hull_centroid[None], np.reshape(self.position, (1, 2)), np.array([self.heading])
+            )[0]
+        return self._hull
+
+    @property
+    def segments(self) -> np.ndarray:
+        if self._segments is None:
+            self._segments = np.hstack([self.hull, np.roll(self.hull, -1, axis=0)])
+        return self._segments
+
+    @property
+    def bounds(self) -> tuple:
+        x_min, y_min = self.hull.min(axis=0)
+        x_max, y_max = self.hull.max(axis=0)
+        return (x_min, y_min, x_max, y_max)
+
+    @property
+    def filled(self) -> bool:
+        return True
+
+    def update(self, dt:float) -> None:
+        super().update(dt)
+        self._hull = None
+
+    def _set_hull(self, hull:np.ndarray) -> None:
+        """Sets the hull vertices after an update, as calculated in a batch by
+        DynamicObstacleSet, and invalidates the boundary."""
+        self._hull = hull
+        self._boundary = None
+        self._segments = None
+
     def _update(self, dt):
         self.waypoint_counter += dt
 
         index = int(np.floor(self.waypoint_counter))
 
-        if index >= len(self.trajectory_velocities) - 1:
+        if index >= self.motion.duration - 1:
             self.waypoint_counter = 0
             index = 0
-            self.position = np.array(self.trajectory[0][1])
+            self.position = self.motion.start_position
 
-        dx = self.trajectory_velocities[index][0]
-        dy = self.trajectory_velocities[index][1]
+        dx, dy = self.motion.velocity(index)
 
         self.dx = dt*dx
         self.dy = dt*dy
@@ -171,12 +281,6 @@ class VesselObstacle(BaseObstacle):
         return True
 
     def _calculate_boundary(self):
-        ship_angle = self.heading# float(geom.princip(self.heading))
-
-        boundary_temp = shapely.geometry.Polygon(self.points)
-        boundary_temp = shapely.affinity.rotate(boundary_temp, ship_angle, use_radians=True, origin='centroid')
-        boundary_temp = shapely.affinity.translate(boundary_temp, xoff=self.position[0], yoff=self.position[1])
-
-        return boundary_temp
+        return shapely.geometry.Polygon(self.hull)
 
 
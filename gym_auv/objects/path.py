@@ -1,40 +1,143 @@
 from copy import deepcopy
+from collections import OrderedDict
 import numpy as np
 import numpy.linalg as linalg
 import shapely.geometry
 from scipy.optimize import minimize
+from scipy.spatial import cKDTree
 
 from scipy import interpolate
 
 import gym_auv.utils.geomutils as geom
 
+# Paths built by Path.cached, most recently used last
+_PATH_CACHE = OrderedDict()
+PATH_CACHE_SIZE = 32
+
 def _arc_len(coords):
     diff = np.diff(coords, axis=1)
     delta_arc = np.sqrt(np.sum(diff ** 2, axis=0))
     return np.concatenate([[0], np.cumsum(delta_arc)])
 
+def _project_on_segment_groups(positions, group_sizes, starts, ends, start_arclengths, segment_lengths):
+    """
+    Projects points onto groups of segments of a polyline, following the
+    arithmetic of shapely's LineString.project, such that the results match.
+    The segments are given as consecutive groups, where position i is
+    projected onto the group_sizes[i] segments following those of the
+    previous positions. All groups must be non-empty.
+
+    Returns
+    -------
+    idx : np.ndarray
+        Index of the closest segment within each group, the first one in case
+        of ties.
+    arclengths : np.ndarray
+        Distances along the polyline of the closest points.
+    """
+    single_group = len(group_sizes) == 1
+    if single_group:
+        px, py = positions[0, 0], positions[0, 1]
+    else:
+        owners = np.repeat(np.arange(len(group_sizes)), group_sizes)
+        px, py = positions[owners, 0], positions[owners, 1]
+    dx = ends[:, 0] - starts[:, 0]
+    dy = ends[:, 1] - starts[:, 1]
+    len2 = dx*dx + dy*dy
+    # Degenerate segments get r = 0, i.e. the distance to their start point
+    len2[len2 == 0] = 1
+    wx = px - starts[:, 0]
+    wy = py - starts[:, 1]
+    r = (wx*dx + wy*dy)/len2
+    s = ((starts[:, 1] - py)*dx - (starts[:, 0] - px)*dy)/len2
+    vx = px - ends[:, 0]
+    vy = py - ends[:, 1]
+    distances = np.where(
+        r <= 0, np.sqrt(wx*wx + wy*wy),
+        np.where(r >= 1, np.sqrt(vx*vx + vy*vy), np.abs(s)*np.sqrt(len2))
+    )
+
+    # First segment of each group at the smallest distance of the group
+    if single_group:
+        group_offsets = 0
+        closest = np.array([np.argmin(distances)])
+    else:
+        group_offsets = np.concatenate([[0], np.cumsum(group_sizes)[:-1]]).astype(np.int64)
+        min_distances = np.minimum.reduceat(distances, group_offsets)
+        candidates = np.flatnonzero(distances == min_distances[owners])
+        closest = candidates[np.unique(owners[candidates], return_index=True)[1]]
+
+    fraction = np.minimum(np.maximum(r[closest], 0.0), 1.0)
+    arclengths = np.where(
+        fraction <= 0, start_arclengths[closest],
+        np.where(fraction < 1, start_arclengths[closest] + fraction*segment_lengths[closest], start_arclengths[closest] + segment_lengths[closest])
+    )
+    return closest - group_offsets, arclengths
+
 class Path():
-    def __init__(self, waypoints:list) -> None:
-        """Initializes path based on specified waypoints."""
+    # Half-width [m] of the arclength window scanned by warm-started closest point queries
+    WARM_START_WINDOW = 10.0
+
+    def __init__(self, waypoints:list, table_resolution:float=None) -> None:
+        """Initializes path based on specified waypoints. If table_resolution
+        is given, a sample table of this arclength spacing [m] is built, see
+        build_sample_table."""
 
         self.init_waypoints = waypoints.copy()
 
         for _ in range(3):
             self._arclengths = _arc_len(waypoints)
             path_coords = interpolate.pchip(x=self._arclengths, y=waypoints, axis=1)
-            path_derivatives = path_coords.derivative()
-            path_dderivatives = path_derivatives.derivative()
             waypoints = path_coords(np.linspace(self._arclengths[0], self._arclengths[-1], 1000))
 
         self._waypoints = waypoints.copy()
         self._path_coords = path_coords
-        self._path_derivatives = path_derivatives
-        self._path_dderivatives = path_dderivatives
+        self._path_derivatives = path_coords.derivative()
+        self._path_dderivatives = self._path_derivatives.derivative()
+        self._end = self._path_coords(self.length)
 
         #print("DEBUG: path.py, Path() class initialization, self.length =", self.length)
         S = np.linspace(0, round(self.length), 10*round(self.length))
         self._points = np.transpose(self._path_coords(S))
-        self._linestring = shapely.geometry.LineString(self._points)
+        self._linestring = None
+
+        # Arclengths along the polyline, as measured by LineString.project
+        segments = np.diff(self._points, axis=0)
+        self._segment_lengths = np.sqrt(segments[:, 0]*segments[:, 0] + segments[:, 1]*segments[:, 1])
+        self._segment_arclengths = np.concatenate([[0], np.cumsum(self._segment_lengths)])
+        self._max_segment_length = self._segment_lengths.max() if len(self._segment_lengths) else 0
+        self._point_tree = None
+
+        self._table_resolution = None
+        if table_resolution is not None:
+            self.build_sample_table(table_resolution)
+
+    @classmethod
+    def cached(cls, waypoints:list) -> 'Path':
+        """
+        Returns the path through the specified waypoints, reusing the path
+        built by an earlier call with the same waypoints if it is among the
+        PATH_CACHE_SIZE most recently used ones. Meant for scenarios with
+        fixed paths, which would otherwise rebuild them on every reset. The
+        returned path is shared, and must thus not be modified.
+        """
+        waypoints_arr = np.asarray(waypoints, dtype=float)
+        key = (cls, waypoints_arr.shape, waypoints_arr.tobytes())
+        if key in _PATH_CACHE:
+            _PATH_CACHE.move_to_end(key)
+            return _PATH_CACHE[key]
+        path = cls(waypoints)
+        _PATH_CACHE[key] = path
+        if len(_PATH_CACHE) > PATH_CACHE_SIZE:
+            _PATH_CACHE.popitem(last=False)
+        return path
+
+    @property
+    def linestring(self) -> shapely.geometry.LineString:
+        """The sampled path as a shapely LineString, built on demand."""
+        if self._linestring is None:
+            self._linestring = shapely.geometry.LineString(self._points)
+        return self._linestring
 
     @property
     def length(self) -> float:
@@ -49,7 +152,7 @@ class Path():
     @property
     def end(self) -> np.ndarray:
         """Coordinates of the path's end point."""
-        return self._path_coords(self.length)
+        return self._end.copy()
 
     def __call__(self, arclength:float) -> np.ndarray:
         """
@@ -74,16 +177,227 @@ class Path():
         derivative = self._path_derivatives(arclength)
         return np.arctan2(derivative[1], derivative[0])
 
-    def get_closest_arclength(self, position:np.ndarray) -> float:  
+    def get_curvature(self, arclength:float) -> float:
+        """
+        Returns the signed curvature [1/m], positive when the path
+        turns counter-clockwise.
+
+        Returns
+        -------
+        curvature : float
+        """
+        derivative = self._path_derivatives(arclength)
+        dderivative = self._path_dderivatives(arclength)
+        speed = np.sqrt(derivative[0]**2 + derivative[1]**2)
+        return (derivative[0]*dderivative[1] - derivative[1]*dderivative[0])/speed**3
+
+    def build_sample_table(self, resolution:float=1.0) -> None:
+        """
+        Samples the position, direction and curvature of the path at
+        uniformly spaced arclengths, from which lookup_position,
+        lookup_direction and lookup_curvature interpolate linearly instead
+        of evaluating the spline. Does nothing if a table of the same
+        resolution already exists.
+
+        Linear interpolation of a quantity f between samples spaced h apart
+        is off by at most h**2/8*max|f''|. The position error is thus bounded
+        by h**2/8 times the maximum curvature, e.g. 1.25 mm for h = 1 m and
+        a turning radius of 100 m, and the direction error by h**2/8 times
+        the maximum derivative of the curvature. The largest errors found
+        between the samples are stored in table_error.
+
+        Parameters
+        ----------
+        resolution : float
+            Maximum arclength spacing [m] of the samples.
+        """
+        if self._table_resolution == resolution:
+            return
+        # Covering the arclengths returned by get_closest_arclength
+        table_length = max(self.length, self._segment_arclengths[-1])
+        n_samples = max(2, int(np.ceil(table_length/resolution)) + 1)
+        arclengths = np.linspace(0, table_length, n_samples)
+        self._table_resolution = resolution
+        self._table_arclengths = arclengths
+        # Positions as complex numbers x + iy, interpolated in a single np.interp call
+        positions = self._path_coords(arclengths)
+        self._table_positions = positions[0] + 1j*positions[1]
+        derivatives = self._path_derivatives(arclengths)
+        self._table_directions = np.unwrap(np.arctan2(derivatives[1], derivatives[0]))
+        self._table_curvatures = self.get_curvature(arclengths)
+
+        midpoints = 0.5*(arclengths[:-1] + arclengths[1:])
+        self.table_error = {
+            'position': np.sqrt(np.sum((self.lookup_position(midpoints) - self._path_coords(midpoints))**2, axis=0)).max(),
+            'direction': np.abs(geom.princip(self.lookup_direction(midpoints) - self.get_direction(midpoints))).max()
+        }
+
+    def lookup_position(self, arclength) -> np.ndarray:
+        """
+        Returns the (x,y) point corresponding to the specified arclength, or
+        an array of shape (2, N) for an array of N arclengths, interpolated
+        from the sample table. Arclengths are clamped to the table.
+
+        Returns
+        -------
+        point : np.array
+        """
+        position = np.interp(arclength, self._table_arclengths, self._table_positions)
+        return np.array([position.real, position.imag])
+
+    def lookup_direction(self, arclength):
+        """
+        Returns the direction in radians with respect to the positive
+        x-axis, in [-pi, pi), interpolated from the sample table. Accepts
+        arrays of arclengths.
+
+        Returns
+        -------
+        direction : float
+        """
+        return geom.princip(np.interp(arclength, self._table_arclengths, self._table_directions))
+
+    def lookup_curvature(self, arclength):
+        """
+        Returns the signed curvature [1/m] interpolated from the sample
+        table. Accepts arrays of arclengths.
+
+        Returns
+        -------
+        curvature : float
+        """
+        return np.interp(arclength, self._table_arclengths, self._table_curvatures)
+
+    def get_closest_arclength(self, position:np.ndarray, arclength_hint:float=None) -> float:
         """
         Returns the arc length value corresponding to the point 
         on the path which is closest to the specified position.
-        
+
+        The closest point is searched among the segments near the position,
+        which are found with a KD-tree of the path points, and matches
+        LineString.project of the sampled path. If the closest arclength of
+        a nearby position is given as hint, e.g. that of the previous time
+        step, only the segments within WARM_START_WINDOW meters of it are
+        scanned. The tree search is used as fallback if the closest point is
+        at the border of this window or if the closest path point lies
+        outside of it, such that the result can only differ from the global
+        one where another part of the path is within half a segment length
+        (about 5 cm) of being equally close.
+
+        Parameters
+        ----------
+        position : np.ndarray
+            Position [x, y].
+        arclength_hint : float
+            Closest arclength of a nearby position.
+
         Returns
         -------
-        point : np.array
+        arclength : float
         """
-        return self._linestring.project(shapely.geometry.Point(position))
+        n_segments = len(self._segment_lengths)
+        if n_segments == 0:
+            return 0.0
+        position = np.asarray(position, dtype=float).reshape(1, 2)
+
+        if self._point_tree is None:
+            self._point_tree = cKDTree(self._points)
+        point_dist, point_idx = self._point_tree.query(position[0])
+
+        if arclength_hint is not None:
+            # Segments lo, ..., hi - 1, spanning the window around the hint
+            lo = max(0, int(np.searchsorted(self._segment_arclengths, arclength_hint - Path.WARM_START_WINDOW, side='right')) - 1)
+            hi = min(n_segments, int(np.searchsorted(self._segment_arclengths, arclength_hint + Path.WARM_START_WINDOW)))
+            if lo < hi and lo <= point_idx <= hi:
+                idx, arclength = self._project(position, [hi - lo], np.arange(lo, hi))
+                if (lo == 0 or idx[0] > 0) and (hi == n_segments or idx[0] < hi - lo - 1):
+                    return float(arclength[0])
+
+        # Any segment as close as the closest path point has an end point
+        # within half a segment length of this distance
+        radius = point_dist + 0.5*self._max_segment_length
+        point_indices = self._point_tree.query_ball_point(position[0], radius*(1 + 1e-9) + 1e-9)
+        point_indices = np.asarray(point_indices, dtype=np.int64)
+        segment_indices = np.unique(np.concatenate([point_indices - 1, point_indices]))
+        segment_indices = segment_indices[(segment_indices >= 0) & (segment_indices < n_segments)]
+        _, arclength = self._project(position, [len(segment_indices)], segment_indices)
+        return float(arclength[0])
+
+    def get_closest_arclengths(self, positions:np.ndarray, arclength_hints:np.ndarray=None) -> np.ndarray:
+        """
+        Returns the arclengths of the points on the path closest to several
+        positions at once, with the same search and results as
+        get_closest_arclength, which is used for a single position.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            Array of shape (N, 2) holding the positions [x, y].
+        arclength_hints : np.ndarray
+            Array of shape (N,) holding the closest arclengths of nearby
+            positions. NaN entries, or None, mean no hint.
+
+        Returns
+        -------
+        arclengths : np.ndarray
+            Array of shape (N,).
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        n_positions = len(positions)
+        if n_positions == 1:
+            # The batched search has a larger fixed cost
+            hint = None if arclength_hints is None else float(np.ravel(arclength_hints)[0])
+            return np.array([self.get_closest_arclength(positions[0], None if hint is None or np.isnan(hint) else hint)])
+        n_segments = len(self._segment_lengths)
+        arclengths = np.zeros(n_positions)
+        if n_segments == 0 or n_positions == 0:
+            return arclengths
+
+        if self._point_tree is None:
+            self._point_tree = cKDTree(self._points)
+        point_dists, point_indices = self._point_tree.query(positions)
+        pending = np.ones(n_positions, dtype=bool)
+
+        if arclength_hints is not None:
+            arclength_hints = np.asarray(arclength_hints, dtype=float).reshape(n_positions)
+            # Segments lo, ..., hi - 1, spanning the windows around the hints
+            lo = np.maximum(0, np.searchsorted(self._segment_arclengths, arclength_hints - Path.WARM_START_WINDOW, side='right') - 1)
+            hi = np.minimum(n_segments, np.searchsorted(self._segment_arclengths, arclength_hints + Path.WARM_START_WINDOW))
+            hinted = np.flatnonzero(~np.isnan(arclength_hints) & (lo < hi) & (lo <= point_indices) & (point_indices <= hi))
+            if len(hinted):
+                lo, hi = lo[hinted], hi[hinted]
+                window_sizes = hi - lo
+                segment_indices = np.arange(window_sizes.sum()) + np.repeat(lo - np.cumsum(window_sizes) + window_sizes, window_sizes)
+                idx, hinted_arclengths = self._project(positions[hinted], window_sizes, segment_indices)
+                accepted = ((lo == 0) | (idx > 0)) & ((hi == n_segments) | (idx < window_sizes - 1))
+                arclengths[hinted[accepted]] = hinted_arclengths[accepted]
+                pending[hinted[accepted]] = False
+
+        searched = np.flatnonzero(pending)
+        if len(searched):
+            # Any segment as close as the closest path point has an end point
+            # within half a segment length of this distance
+            radii = point_dists[searched] + 0.5*self._max_segment_length
+            neighbours = self._point_tree.query_ball_point(positions[searched], radii*(1 + 1e-9) + 1e-9)
+            neighbour_counts = np.array([len(points) for points in neighbours], dtype=np.int64)
+            neighbour_points = np.concatenate([np.asarray(points, dtype=np.int64) for points in neighbours])
+            owners = np.repeat(np.arange(len(searched)), neighbour_counts)
+
+            # The segments ending or starting at the neighbouring points, sorted by owner and index
+            segment_indices = np.concatenate([neighbour_points - 1, neighbour_points])
+            segment_owners = np.concatenate([owners, owners])
+            valid = (segment_indices >= 0) & (segment_indices < n_segments)
+            keys = np.unique(segment_owners[valid]*n_segments + segment_indices[valid])
+            group_sizes = np.bincount(keys//n_segments, minlength=len(searched))
+            _, arclengths[searched] = self._project(positions[searched], group_sizes, keys % n_segments)
+
+        return arclengths
+
+    def _project(self, positions, group_sizes, segment_indices):
+        return _project_on_segment_groups(
+            positions, group_sizes, self._points[segment_indices], self._points[segment_indices + 1],
+            self._segment_arclengths[segment_indices], self._segment_lengths[segment_indices]
+        )
 
 class RandomCurveThroughOrigin(Path):
     def __init__(self, rng, nwaypoints, length=400):
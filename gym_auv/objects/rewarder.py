@@ -14,6 +14,12 @@ def _sample_eta():
     y = np.random.gamma(shape=1.9, scale=0.6)
     return y
 
+def _sequential_sum(values):
+    """Returns the sum of values, accumulated in order like in a Python loop. Unlike
+    np.sum, which uses pairwise summation, this gives results identical to the
+    per-sensor loops the rewards were originally calculated with."""
+    return np.cumsum(values)[-1] if len(values) else 0
+
 class BaseRewarder(ABC):
     def __init__(self, vessel, test_mode) -> None:
         self._vessel = vessel
@@ -49,6 +55,15 @@ class BaseRewarder(ABC):
         """
         return np.array([])
 
+    def _closeness_reward(self, measured_distances, measured_speeds, sensor_weights, sensor_weight_sum):
+        """Returns the obstacle avoidance reward component of ColavRewarder and ColavRewarder2,
+        i.e. the negative weighted mean of the closeness penalties of all sensors."""
+        x = np.asarray(measured_distances)
+        speed_y = np.asarray(measured_speeds)[:, 1]
+        raw_penalties = self._vessel.config["sensor_range"]*np.exp(
+            -self.params['gamma_x']*x + self.params['gamma_v_y']*np.where(speed_y > 0, speed_y, 0))
+        return -_sequential_sum(sensor_weights*raw_penalties)/sensor_weight_sum
+
 
 class PathRewarder(BaseRewarder):
     def __init__(self, vessel, test_mode):
@@ -125,6 +140,10 @@ class ColavRewarder2(BaseRewarder):
         self.params['lambda'] = 0.5  # _sample_lambda(scale=0.2)
         self.params['eta'] = 0  # _sample_eta()
 
+        # The sensor angles are fixed, and so are the weights of the sensors
+        self._sensor_weights = 1 / (1 + np.abs(self.params['gamma_theta'] * self._vessel.sensor_angles))
+        self._sensor_weight_sum = _sequential_sum(self._sensor_weights)
+
     N_INSIGHTS = 0
 
     def insight(self):
@@ -154,21 +173,10 @@ class ColavRewarder2(BaseRewarder):
                     1 + cross_track_performance) - 1
 
         # Calculating obstacle avoidance reward component
-        closeness_penalty_num = 0
-        closeness_penalty_den = 0
         if self._vessel.n_sensors > 0:
-            for isensor in range(self._vessel.n_sensors):
-                angle = self._vessel.sensor_angles[isensor]
-                x = measured_distances[isensor]
-                speed_vec = measured_speeds[isensor]
-                weight = 1 / (1 + np.abs(self.params['gamma_theta'] * angle))
-                raw_penalty = self._vessel.config["sensor_range"] * np.exp(
-                    -self.params['gamma_x'] * x + self.params['gamma_v_y'] * max(0, speed_vec[1]))
-                weighted_penalty = weight * raw_penalty
-                closeness_penalty_num += weighted_penalty
-                closeness_penalty_den += weight
-
-            closeness_reward = -closeness_penalty_num / closeness_penalty_den
+            closeness_reward = self._closeness_reward(
+                measured_distances, measured_speeds, self._sensor_weights, self._sensor_weight_sum
+            )
         else:
             closeness_reward = 0
 
@@ -200,6 +208,10 @@ class ColavRewarder(BaseRewarder):
         self.params['lambda'] = 0.5 #_sample_lambda(scale=0.2)
         self.params['eta'] = 0#_sample_eta()
 
+        # The sensor angles are fixed, and so are the weights of the sensors
+        self._sensor_weights = 1 / (1 + np.abs(self.params['gamma_theta']*self._vessel.sensor_angles))
+        self._sensor_weight_sum = _sequential_sum(self._sensor_weights)
+
     N_INSIGHTS = 0
     def insight(self):
         return np.array([])
@@ -227,20 +239,10 @@ class ColavRewarder(BaseRewarder):
         path_reward = (1 + np.cos(heading_error)*self._vessel.speed/self._vessel.max_speed)*(1 + cross_track_performance) - 1
         
         # Calculating obstacle avoidance reward component
-        closeness_penalty_num = 0
-        closeness_penalty_den = 0
         if self._vessel.n_sensors > 0:
-            for isensor in range(self._vessel.n_sensors):
-                angle = self._vessel.sensor_angles[isensor]
-                x = measured_distances[isensor]
-                speed_vec = measured_speeds[isensor]
-                weight = 1 / (1 + np.abs(self.params['gamma_theta']*angle))
-                raw_penalty = self._vessel.config["sensor_range"]*np.exp(-self.params['gamma_x']*x +self.params['gamma_v_y']*max(0, speed_vec[1]))
-                weighted_penalty = weight*raw_penalty
-                closeness_penalty_num += weighted_penalty
-                closeness_penalty_den += weight
-
-            closeness_reward = -closeness_penalty_num/closeness_penalty_den
+            closeness_reward = self._closeness_reward(
+                measured_distances, measured_speeds, self._sensor_weights, self._sensor_weight_sum
+            )
         else:
             closeness_reward = 0
 
@@ -280,6 +282,11 @@ class ColregRewarder(BaseRewarder):
         self.params['gamma_min_x'] = 0.04
         self.params['gamma_weight'] = 2
 
+        # The sensor angles are fixed, and so are the weights and sides of the sensors
+        angles = self._vessel.sensor_angles
+        self._moving_sensor_weights = 2 / (1 + np.exp(self.params['gamma_weight']*np.abs(angles)))
+        self._static_sensor_weights = 1 / (1 + np.abs(self.params['gamma_theta']*angles))
+        self._starboard_sensors = (angles < 0*deg2rad) & (angles > -112.5*deg2rad) #straffer høyre side
 
     N_INSIGHTS = 1
     def insight(self):
@@ -307,64 +314,44 @@ class ColregRewarder(BaseRewarder):
         path_reward = (1 + np.cos(heading_error)*self._vessel.speed/self._vessel.max_speed)*(1 + cross_track_performance) - 1
 
         # Calculating obstacle avoidance reward component
-        closeness_penalty_num = 0
-        closeness_penalty_den = 0
-        static_closeness_penalty_num = 0
-        static_closeness_penalty_den = 0
         closeness_reward = 0
         static_closeness_reward = 0
-        moving_distances = []
-        lambdas = []
+        path_lambda = 1
 
         speed_weight = 2
 
         if self._vessel.n_sensors > 0:
-            for isensor in range(self._vessel.n_sensors):
-                angle = self._vessel.sensor_angles[isensor]
-                x = measured_distances[isensor]
-                speed_vec = measured_speeds[isensor]
-
-
-                if speed_vec.any():
-
-                    if speed_vec[1] > 0:
-                        self.params['lambda'] = 1/(1+np.exp(-0.04*x+4))
-                    if speed_vec[1] < 0:
-                        self.params['lambda'] = 1/(1+np.exp(-0.06*x+3))
-                    lambdas.append(self.params['lambda'])
-
-                    weight = 2 / (1 + np.exp(self.params['gamma_weight']*np.abs(angle)))
-                    moving_distances.append(x)
-
-                    if angle < 0*deg2rad and angle > -112.5*deg2rad: #straffer høyre side
-
-                        raw_penalty = 100*np.exp(-self.params['gamma_x_starboard']*x + speed_weight*speed_vec[1])
-                    else:
-                        raw_penalty = 100*np.exp(-self.params['gamma_x_port']*x + speed_weight*speed_vec[1])
-                    #else:
-                    #    raw_penalty = 100*np.exp(-self.params['gamma_x_stat']*x)
-
-                    weighted_penalty = (1-self.params['lambda'])*weight*raw_penalty
-                    closeness_penalty_num += weighted_penalty
-                    closeness_penalty_den += weight
-
-                else:
-
-                    weight = 1 / (1 + np.abs(self.params['gamma_theta']*angle))
-                    raw_penalty = 100*np.exp(-self.params['gamma_x_stat']*x)
-                    weighted_penalty = weight*raw_penalty
-                    static_closeness_penalty_num += weighted_penalty
-                    static_closeness_penalty_den += weight
-
-
-
-            if closeness_penalty_num:
-                closeness_reward = -closeness_penalty_num/closeness_penalty_den
-
-
-            if static_closeness_penalty_num:
-                static_closeness_reward = -static_closeness_penalty_num/static_closeness_penalty_den
-
+            x = np.asarray(measured_distances)
+            speeds = np.asarray(measured_speeds)
+            speed_y = speeds[:, 1]
+            moving = speeds.any(axis=1)
+
+            # Sensors detecting a moving obstacle update lambda depending on whether the
+            # obstacle is approaching, and otherwise use the lambda of the preceding sensor
+            lambda_updated = moving & ((speed_y > 0) | (speed_y < 0))
+            sensor_lambdas = np.where(
+                speed_y > 0, 1/(1+np.exp(-0.04*x+4)), 1/(1+np.exp(-0.06*x+3))
+            )
+            last_update = np.maximum.accumulate(np.where(lambda_updated, np.arange(len(x)), -1))
+            sensor_lambdas = np.where(last_update >= 0, sensor_lambdas[last_update], self.params['lambda'])
+            if lambda_updated.any():
+                self.params['lambda'] = sensor_lambdas[-1]
+
+            if moving.any():
+                gamma_x = np.where(self._starboard_sensors, self.params['gamma_x_starboard'], self.params['gamma_x_port'])
+                raw_penalties = 100*np.exp(-gamma_x[moving]*x[moving] + speed_weight*speed_y[moving])
+                weighted_penalties = (1-sensor_lambdas[moving])*self._moving_sensor_weights[moving]*raw_penalties
+                closeness_penalty_num = _sequential_sum(weighted_penalties)
+                if closeness_penalty_num:
+                    closeness_reward = -closeness_penalty_num/_sequential_sum(self._moving_sensor_weights[moving])
+                path_lambda = np.amin(sensor_lambdas[moving])
+
+            static = ~moving
+            if static.any():
+                raw_penalties = 100*np.exp(-self.params['gamma_x_stat']*x[static])
+                static_closeness_penalty_num = _sequential_sum(self._static_sensor_weights[static]*raw_penalties)
+                if static_closeness_penalty_num:
+                    static_closeness_reward = -static_closeness_penalty_num/_sequential_sum(self._static_sensor_weights[static])
 
         #if len(moving_distances) != 0:
         #    min_dist = np.amin(moving_distances)
@@ -373,11 +360,6 @@ class ColregRewarder(BaseRewarder):
         #else:
         #    self.params['lambda'] = 1
 
-        if len(lambdas):
-            path_lambda = np.amin(lambdas)
-        else:
-            path_lambda = 1
-
         #if path_reward > 0:
         #    path_reward = path_lambda*path_reward
         # Calculating living penalty
@@ -1,37 +1,21 @@
 """
 This module implements an AUV that is simulated in the horizontal plane.
 """
+import functools
 import numpy as np
 import numpy.linalg as linalg
 from itertools import islice, chain, repeat
 import shapely.geometry, shapely.errors, shapely.strtree, shapely.ops, shapely.prepared
-from scipy.integrate import solve_ivp
 
 import gym_auv.utils.constants as const
 import gym_auv.utils.geomutils as geom
+import gym_auv.utils.integrators as integrators
+from gym_auv.utils.trajectory_buffer import TrajectoryBuffer
+import gym_auv.utils.dynamics as dynamics
+import gym_auv.utils.raycast as raycast
 from gym_auv.objects.obstacles import LineObstacle
 from gym_auv.objects.path import Path
-
-def _odesolver45(f, y, h):
-    """Calculate the next step of an IVP of a time-invariant ODE with a RHS
-    described by f, with an order 4 approx. and an order 5 approx.
-    Parameters:
-        f: function. RHS of ODE.
-        y: float. Current position.
-        h: float. Step length.
-    Returns:
-        q: float. Order 2 approx.
-        w: float. Order 3 approx.
-    """
-    s1 = f(y)
-    s2 = f(y+h*s1/4.0)
-    s3 = f(y+3.0*h*s1/32.0+9.0*h*s2/32.0)
-    s4 = f(y+1932.0*h*s1/2197.0-7200.0*h*s2/2197.0+7296.0*h*s3/2197.0)
-    s5 = f(y+439.0*h*s1/216.0-8.0*h*s2+3680.0*h*s3/513.0-845.0*h*s4/4104.0)
-    s6 = f(y-8.0*h*s1/27.0+2*h*s2-3544.0*h*s3/2565+1859.0*h*s4/4104.0-11.0*h*s5/40.0)
-    w = y + h*(25.0*s1/216.0+1408.0*s3/2565.0+2197.0*s4/4104.0-s5/5.0)
-    q = y + h*(16.0*s1/135.0+6656.0*s3/12825.0+28561.0*s4/56430.0-9.0*s5/50.0+2.0*s6/55.0)
-    return w, q
+from gym_auv.objects.navigation import NAVIGATION_FEATURES, compute_navigation
 
 def _standardize_intersect(intersect):
     if intersect.is_empty:
@@ -43,39 +27,197 @@ def _standardize_intersect(intersect):
     else:
         return list(intersect.geoms)
 
-def _feasibility_pooling(x, width, theta):
-    N_sensors = x.shape[0]
-    sort_idx = np.argsort(x)
-    for idx in sort_idx:
-        surviving = x > x[idx] + width
-        d = x[idx]*theta
-        opening_width = 0
-        opening_span = 0
-        opening_start = -theta*(N_sensors-1)/2
-        found_opening = False
-        for isensor, sensor_survives in enumerate(surviving):
-            if sensor_survives:
-                opening_width += d
-                opening_span += theta
-                if opening_width > width:
-                    opening_center = opening_start + opening_span/2
-                    if abs(opening_center) < theta*(N_sensors-1)/4:
-                        found_opening = True
-            else:
-                opening_width += 0.5*d
-                opening_span += 0.5*theta
-                if opening_width > width:
-                    opening_center = opening_start + opening_span/2
-                    if abs(opening_center) < theta*(N_sensors-1)/4:
-                        found_opening = True
-                opening_width = 0
-                opening_span = 0
-                opening_start = -theta*(N_sensors-1)/2 + isensor*theta
+def _find_openings(x, valid, candidates, opening_starts, opening_max_center, span_sums, width, theta):
+    """
+    Tests whether there are sufficiently wide openings beyond the given candidate
+    distances. The opening widths and spans are taken from cumulative sums that are
+    bitwise equal to the running sums of the original loop over the sensors.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Array of shape (B, n + 1) holding the sensor arrays, preceded by a column
+        of -inf representing a blocked sensor before the first sensor.
+    valid : np.ndarray
+        Boolean array of shape (B, n), False for the padding sensors.
+    candidates : np.ndarray
+        Array of shape (B, C) holding the candidate distances.
+    opening_starts : np.ndarray
+        Array of shape (B, n + 1) holding the start angle of an opening following
+        the blocked sensor with the given (1-based) index.
+    opening_max_center : np.ndarray
+        Array of shape (B, 1) holding the maximum absolute angle of the opening center.
+    span_sums : np.ndarray
+        Array of shape (n + 1,) holding the cumulative sums of theta.
+
+    Returns
+    -------
+    found_opening : np.ndarray
+        Boolean array of shape (B, C).
+    """
+    n_rows, n_candidates = candidates.shape
+    n_cols = x.shape[1]
+    d = candidates*theta
+    sensor_survives = x[:, np.newaxis, :] > (candidates + width)[:, :, np.newaxis]
+
+    # Index of the last blocked sensor before each sensor, and the number of
+    # surviving sensors since then, including the sensor itself
+    last_blocked = np.maximum.accumulate(np.where(sensor_survives, 0, np.arange(n_cols)), axis=2)
+    prev_blocked = last_blocked[:, :, :-1]
+    sensor_blocked = ~sensor_survives[:, :, 1:]
+    n_surviving = np.arange(1, n_cols) - prev_blocked - sensor_blocked
+
+    width_sums = np.zeros((n_rows, n_candidates, n_cols))
+    width_sums[:, :, 1:] = d[:, :, np.newaxis]
+    width_sums = np.cumsum(width_sums, axis=2)
+    opening_width = width_sums.ravel()[(np.arange(n_rows*n_candidates)*n_cols).reshape(n_rows, n_candidates, 1) + n_surviving]
+    opening_width = opening_width + sensor_blocked*(0.5*d)[:, :, np.newaxis]
+    opening_span = span_sums[n_surviving] + sensor_blocked*(0.5*theta)
+    opening_start = opening_starts.ravel()[(np.arange(n_rows)*n_cols)[:, np.newaxis, np.newaxis] + prev_blocked]
+    opening_center = opening_start + opening_span/2
+
+    return np.any(
+        valid[:, np.newaxis, :] & (opening_width > width) & (np.abs(opening_center) < opening_max_center[:, :, np.newaxis]),
+        axis=2
+    )
 
-        if not found_opening:
-            return max(0, x[idx])
+def _feasibility_pooling_padded(x, lengths, width, theta):
+    """
+    Feasibility pooling of a batch of sensor arrays of different lengths.
+
+    The feasible distance of a sensor array is the smallest sensor distance beyond
+    which there is no opening wide enough for the vessel, where the candidate
+    distances are tested in increasing order for all arrays simultaneously. As most
+    arrays are resolved by one of their smallest distances, the candidates are
+    tested in chunks of increasing size, only for the arrays not yet resolved.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Array of shape (B, n) holding B sensor arrays, where row b holds
+        lengths[b] sensor values followed by np.inf padding.
+    lengths : np.ndarray
+        Array of shape (B,) holding the number of sensors in each row.
+    width : float
+        Width of the vessel opening [m].
+    theta : float
+        Angle between neighbouring sensors [rad].
+
+    Returns
+    -------
+    feasible_distances : np.ndarray
+        Array of shape (B,).
+    """
+    n_rows, n_max = x.shape
+    candidates = np.sort(x, axis=1)
+    smallest = candidates[:, 0]
+
+    # By default, i.e. if all candidates have an opening, the largest distance is used.
+    # If no sensor survives the smallest candidate, the running opening width never
+    # exceeds half a sensor's width, and the smallest candidate is used if that is
+    # not wide enough.
+    feasible_distances = candidates[np.arange(n_rows), lengths - 1]
+    trivial = (feasible_distances <= smallest + width) & (0.5*(smallest*theta) <= width)
+    feasible_distances = np.where(trivial, smallest, feasible_distances)
+    if np.all(trivial):
+        return np.maximum(0, feasible_distances)
+
+    unresolved = np.flatnonzero(~trivial)
+    valid = np.arange(n_max) < lengths[:, np.newaxis]
+    opening_min_start = (-theta*(lengths - 1)/2)[:, np.newaxis]
+    opening_starts = opening_min_start + np.maximum(np.arange(n_max + 1) - 1, 0)*theta
+    opening_max_center = (theta*(lengths - 1)/4)[:, np.newaxis]
+    span_sums = np.cumsum(np.append(0, np.full(n_max, theta)))
+    extended_x = np.hstack([np.full((n_rows, 1), -np.inf), x])
+
+    chunk_start, chunk_size = 0, 4
+    while len(unresolved) and chunk_start < n_max:
+        chunk_candidates = candidates[unresolved, chunk_start:chunk_start + chunk_size]
+        valid_candidates = np.isfinite(chunk_candidates)
+        found_opening = _find_openings(
+            extended_x[unresolved], valid[unresolved], np.where(valid_candidates, chunk_candidates, 0),
+            opening_starts[unresolved], opening_max_center[unresolved], span_sums, width, theta
+        ) | ~valid_candidates
+
+        resolved = ~np.all(found_opening, axis=1)
+        first_blocking = np.argmin(found_opening[resolved], axis=1)
+        feasible_distances[unresolved[resolved]] = chunk_candidates[resolved, first_blocking]
+        unresolved = unresolved[~resolved & valid_candidates[:, -1]]
+        chunk_start += chunk_size
+        chunk_size *= 4
+
+    return np.maximum(0, feasible_distances)
 
-    return max(0, np.max(x))
+def _feasibility_pooling(x, width, theta):
+    """Feasibility pooling of the sensor array x of shape (n,), or of each row of
+    a batch x of shape (E, n)."""
+    x = np.asarray(x, dtype=np.float64)
+    batch = x.reshape(-1, x.shape[-1])
+    feasible_distances = _feasibility_pooling_padded(batch, np.full(len(batch), x.shape[-1]), width, theta)
+    if x.ndim == 1:
+        return feasible_distances[0]
+    return feasible_distances.reshape(x.shape[:-1])
+
+@functools.lru_cache(maxsize=None)
+def _sector_layout(sector_start_indeces, n_sensors):
+    """Returns the indeces gathering the sensors of each sector into rows padded
+    to the largest sector, where the padding refers to index n_sensors, and the
+    number of sensors in each sector."""
+    sector_start_indeces = np.array(sector_start_indeces)
+    lengths = np.diff(np.append(sector_start_indeces, n_sensors))
+    sector_indeces = sector_start_indeces[:, np.newaxis] + np.arange(np.max(lengths))
+    sector_indeces[sector_indeces >= (sector_start_indeces + lengths)[:, np.newaxis]] = n_sensors
+    return sector_indeces, lengths
+
+def _sector_feasibility_pooling(x, sector_start_indeces, width, theta):
+    """
+    Feasibility pooling of all sectors of the sensor arrays of one or several
+    vessels at once.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Array of shape (n_sensors,) or (E, n_sensors) holding the distance
+        measurements of one or E vessels.
+    sector_start_indeces : list
+        Index of the first sensor of each sector.
+    width : float
+        Width of the vessel opening [m].
+    theta : float
+        Angle between neighbouring sensors [rad].
+
+    Returns
+    -------
+    sector_feasible_distances : np.ndarray
+        Array of shape (n_sectors,) or (E, n_sectors).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n_sensors = x.shape[-1]
+    sector_indeces, lengths = _sector_layout(tuple(sector_start_indeces), n_sensors)
+
+    batch = np.empty((x.size//n_sensors, n_sensors + 1))
+    batch[:, :n_sensors] = x.reshape(-1, n_sensors)
+    batch[:, n_sensors] = np.inf
+    padded = batch[:, sector_indeces]
+    feasible_distances = _feasibility_pooling_padded(
+        padded.reshape(-1, padded.shape[-1]), np.tile(lengths, len(batch)), width, theta
+    )
+    return feasible_distances.reshape(x.shape[:-1] + (len(lengths),))
+
+def _sensor_closeness(distances, sensor_range, log_transform, out=None, scratch=None):
+    """Returns the closenesses of the given distances, i.e. 1 at zero distance and 0
+    at the sensor range, on a logarithmic scale if log_transform is set. The
+    closenesses are evaluated in scratch, a float64 array of the shape of
+    distances, if given, and written into out, if given."""
+    closeness = np.empty(np.shape(distances)) if scratch is None else scratch
+    if log_transform:
+        np.add(1, distances, out=closeness)
+        np.log(closeness, out=closeness)
+        np.divide(closeness, np.log(1 + sensor_range), out=closeness)
+    else:
+        np.divide(distances, sensor_range, out=closeness)
+    np.clip(closeness, 0, 1, out=closeness)
+    return np.subtract(1, closeness, out=out)
 
 def _simulate_sensor(sensor_angle, p0_point, sensor_range, obstacles):
     sensor_endpoint = (
@@ -110,16 +252,29 @@ def _simulate_sensor(sensor_angle, p0_point, sensor_range, obstacles):
 
     return (measured_distance, obst_speed_vec_rel, ray_blocked)
 
+def _simulate_sensors(sensor_angles, position, sensor_range, obstacles):
+    """Vectorised equivalent of _simulate_sensor, simulating all the given sensor
+    angles at once using gym_auv.utils.raycast."""
+    packed_obstacles = raycast.pack_obstacles(obstacles)
+    measured_distances, obstacle_ids, rays_blocked = raycast.cast_rays(
+        position, sensor_angles, sensor_range, *packed_obstacles
+    )
+
+    obst_speeds = np.array([(0, 0) if obst.static else (obst.dx, obst.dy) for obst in obstacles], dtype=np.float64)
+    obst_speeds_rel = np.zeros((len(sensor_angles), 2))
+    if np.any(rays_blocked):
+        hit_speeds = obst_speeds[obstacle_ids[rays_blocked]]
+        rel_angles = -sensor_angles[rays_blocked] - np.pi/2
+        crel = np.cos(rel_angles)
+        srel = np.sin(rel_angles)
+        obst_speeds_rel[rays_blocked, 0] = crel*hit_speeds[:, 0] - srel*hit_speeds[:, 1]
+        obst_speeds_rel[rays_blocked, 1] = srel*hit_speeds[:, 0] + crel*hit_speeds[:, 1]
+
+    return measured_distances, obst_speeds_rel, rays_blocked
+
 class Vessel():
 
-    NAVIGATION_FEATURES = [
-        'surge_velocity',
-        'sway_velocity',
-        'yaw_rate',
-        'look_ahead_heading_error',
-        'heading_error',
-        'cross_track_error'
-    ]
+    NAVIGATION_FEATURES = list(NAVIGATION_FEATURES)
 
     def __init__(self, config:dict, init_state:np.ndarray, width:float=4) -> None:
         """
@@ -155,6 +310,7 @@ class Vessel():
         self._sensor_interval = max(1, int(1/self.config["sensor_frequency"]))
         self._observe_interval = max(1, int(1/self.config["observe_frequency"]))
         self._virtual_environment = None
+        self._integrator = integrators.get_integrator(self.config["integrator"])
 
         # Calculating sensor partitioning
         last_isector = -1
@@ -185,11 +341,8 @@ class Vessel():
         for isector in range(self._n_sectors):
             self._sector_end_indeces[isector] = self._sector_start_indeces[isector] + self._n_sensors_per_sector[isector]
 
-        # Calculating feasible closeness
-        if self.config["sensor_log_transform"]:
-            self._get_closeness = lambda x: 1 - np.clip(np.log(1 + x)/np.log(1 + self.config["sensor_range"]), 0, 1)
-        else:
-            self._get_closeness = lambda x: 1 - np.clip(x/self.config["sensor_range"], 0, 1)
+        # Scratch array of the closenesses written into an output array by _get_closeness
+        self._closeness_scratch = None
 
         # Initializing vessel to initial position
         self.reset(init_state)
@@ -221,6 +374,16 @@ class Vessel():
         """Returns an array holding the heading of the AUV for all timesteps."""
         return self._prev_states[:, 2]
 
+    @property
+    def _prev_states(self) -> np.ndarray:
+        """Returns a view of the stored states of the AUV, oldest first."""
+        return self._state_history.data
+
+    @property
+    def _prev_inputs(self) -> np.ndarray:
+        """Returns a view of the stored motor thrusts of the AUV, oldest first."""
+        return self._input_history.data
+
     @property
     def heading(self) -> float:
         """Returns the heading of the AUV with respect to true north."""
@@ -276,14 +439,17 @@ class Vessel():
         init_state = np.array(init_state, dtype=np.float64)
         init_speed = np.array(init_speed, dtype=np.float64)
         self._state = np.hstack([init_state, init_speed])
-        self._prev_states = np.vstack([self._state])
         self._input = [0, 0]
-        self._prev_inputs =np.vstack([self._input])
+        self._state_history = TrajectoryBuffer(len(self._state), max_length=self.config["trajectory_max_length"])
+        self._state_history.append(self._state)
+        self._input_history = TrajectoryBuffer(len(self._input), max_length=self.config["trajectory_max_length"])
+        self._input_history.append(self._input)
         self._last_sensor_dist_measurements = np.ones((self._n_sensors,))*self.config["sensor_range"]
         self._last_sensor_speed_measurements = np.zeros((self._n_sensors,2))
         self._last_sector_dist_measurements = np.zeros((self._n_sectors,))
         self._last_sector_feasible_dists = np.zeros((self._n_sectors,))
         self._last_navi_state_dict = dict((state, 0) for state in Vessel.NAVIGATION_FEATURES)
+        self._last_navi_path = None
         self._virtual_environment = None
         self._collision = False
         self._progress = 0
@@ -293,6 +459,24 @@ class Vessel():
         self._perceive_counter = 0
         self._nearby_obstacles = []
 
+    def set_trajectory_max_length(self, max_length:int) -> None:
+        """
+        Sets the number of most recent states kept in the trajectory history,
+        discarding older states.
+
+        Parameters
+        ----------
+        max_length : int
+            Number of most recent states to keep. If None, all states are kept.
+        """
+        state_history, input_history = self._state_history, self._input_history
+        self._state_history = TrajectoryBuffer(state_history.data.shape[1], max_length=max_length)
+        self._input_history = TrajectoryBuffer(input_history.data.shape[1], max_length=max_length)
+        n_kept = len(state_history) if max_length is None else min(len(state_history), max_length)
+        for state, thrust in zip(state_history.data[-n_kept:], input_history.data[-n_kept:]):
+            self._state_history.append(state)
+            self._input_history.append(thrust)
+
     def step(self, action:list) -> None:
         """
         Simulates the vessel one step forward after applying the given action.
@@ -301,34 +485,102 @@ class Vessel():
         ----------
         action : np.ndarray[thrust_left_motor, thrust_right_motor]
         """
-        self._input = np.array([self._thrust_left_motor(action[0]), self._thrust_right_motor(action[1])])
-        # # ODE45 integration, does noe work for stiff systems
-        # w, q = _odesolver45(self._state_dot, self._state, self.config["t_step_size"])
-        # self._state = q
-        # self._state[2] = geom.princip(self._state[2])
-
-        # Scipy for integration
-        sol = solve_ivp(lambda t, state: self._state_dot(t, state), [0, self.config["t_step_size"]], self._state, method='BDF')
-        self._state = sol.y[:,-1]
+        thrust = np.array([self._thrust_left_motor(action[0]), self._thrust_right_motor(action[1])])
+        self._tau = dynamics.thrust_to_tau(thrust, self.config)
+
+        state = integrators.integrate(
+            self._integrator, self._state_dot, self._state, self.config["t_step_size"],
+            n_substeps=self.config["integrator_substeps"]
+        )
+        self.set_state(state, thrust)
+
+    def set_state(self, state:np.ndarray, thrust:np.ndarray) -> None:
+        """
+        Sets the state of the vessel after one simulation step. Used by step(), and
+        by vectorised environments that simulate the dynamics of many vessels at once.
+
+        Parameters
+        ----------
+        state : np.ndarray
+            The new state [x, y, psi, u, v, r] of the vessel.
+        thrust : np.ndarray
+            The motor thrusts [left, right] applied during the step.
+        """
+        self._input = thrust
+        self._state = state
         self._state[2] = geom.princip(self._state[2])
-        
-        # print(f"State from vessel step: {self._state}")
 
-        self._prev_states = np.vstack([self._prev_states,self._state])
-        self._prev_inputs = np.vstack([self._prev_inputs,self._input])
+        self._state_history.append(self._state)
+        self._input_history.append(self._input)
 
         self._step_counter += 1
 
     # TODO: Add position of dock as observation?
-    def perceive(self, obstacles:list, dock=None) -> np.ndarray:
+    def perceive(self, obstacles:list, dock=None, obstacle_index=None, distance_field=None, out:np.ndarray=None) -> np.ndarray:
         """
         Simulates the sensor suite and returns observation arrays of the environment.
 
+        Parameters
+        ----------
+        obstacles : list
+            List of obstacles in the environment.
+        obstacle_index : ObstacleIndex
+            Optional spatial index over obstacles, used for loading nearby obstacles.
+        distance_field : DistanceField
+            Optional distance field over the static obstacles. If provided, the static
+            obstacles are sensed through the distance field, and only the dynamic
+            obstacles are intersected exactly.
+        out : np.ndarray
+            Array of shape (1, n_sensors) the sensor closenesses are written into,
+            e.g. a view of an observation buffer.
+
         Returns
         -------
         sector_closenesses : np.ndarray
         sector_velocities : np.ndarray
         """
+        if self.simulate_sensors(obstacles, obstacle_index=obstacle_index, distance_field=distance_field):
+            sector_feasible_distances = _sector_feasibility_pooling(
+                self._last_sensor_dist_measurements, self._sector_start_indeces, self._feasibility_width, self._d_sensor_angle
+            )
+            sector_closenesses = self._get_closeness(sector_feasible_distances)
+        else:
+            sector_feasible_distances = np.ones((self._n_sectors,))*self.config["sensor_range"]
+            sector_closenesses = np.zeros((self._n_sectors,))
+        self.set_sector_perception(sector_feasible_distances, sector_closenesses)
+
+        return self._get_closeness(self._last_sensor_dist_measurements.reshape(1,self.n_sensors), out=out)
+        #sensor_speed_x = self._last_sensor_speed_measurements[:, 0]
+        #sensor_speed_y = self._last_sensor_speed_measurements[:, 1]
+        #return np.vstack((self._last_sensor_dist_measurements,
+        #                  sensor_speed_x,
+        #                  sensor_speed_y)
+        #                 ).reshape(3, self.n_sensors)
+
+    def simulate_sensors(self, obstacles:list, obstacle_index=None, distance_field=None) -> bool:
+        """
+        Simulates the rangefinder sensors, i.e. the first part of perceive(), updating
+        the sensor distance and speed measurements and the collision state. The
+        sector perception is left to be pooled from the distance measurements, e.g.
+        for the vessels of several environments at once by AUVVecEnv, and set with
+        set_sector_perception().
+
+        Parameters
+        ----------
+        obstacles : list
+            List of obstacles in the environment.
+        obstacle_index : ObstacleIndex
+            Optional spatial index over obstacles, used for loading nearby obstacles.
+        distance_field : DistanceField
+            Optional distance field over the static obstacles.
+
+        Returns
+        -------
+        pooling_needed : bool
+            Whether obstacles were nearby. If not, all sensors measure the sensor
+            range, the sector feasible distances are the sensor range and the
+            sector closenesses are 0.
+        """
 
         # Initializing variables
         sensor_range = self.config["sensor_range"]
@@ -336,39 +588,65 @@ class Vessel():
 
         # Loading nearby obstacles, i.e. obstacles within the vessel's detection range
         if self._step_counter % self.config["sensor_interval_load_obstacles"] == 0:
-            self._nearby_obstacles = list(filter(
-                lambda obst: float(p0_point.distance(obst.boundary)) - self._width < sensor_range, obstacles
-            ))
+            if obstacle_index is not None:
+                self._nearby_obstacles = obstacle_index.query(p0_point, sensor_range + self._width)
+            else:
+                self._nearby_obstacles = list(filter(
+                    lambda obst: float(p0_point.distance(obst.boundary)) - self._width < sensor_range, obstacles
+                ))
 
         if not self._nearby_obstacles:
             self._last_sensor_dist_measurements = np.ones((self._n_sensors,))*sensor_range
-            sector_feasible_distances = np.ones((self._n_sectors,))*sensor_range
-            sector_closenesses = np.zeros((self._n_sectors,))
-            sector_velocities = np.zeros((2*self._n_sectors,))
-            collision = False
+            self._collision = False
+            self._perceive_counter += 1
+            return False
 
         else:
             should_observe = (self._perceive_counter % self._observe_interval == 0) or self._virtual_environment is None
             if should_observe:
                 geom_targets = self._nearby_obstacles
+                if distance_field is not None:
+                    geom_targets = [obst for obst in geom_targets if not obst.static]
             else:
                 geom_targets = self._virtual_environment
 
             # Simulating all sensors using _simulate_sensor subroutine
             sensor_angles_ned = self._sensor_angles + self.heading
             activate_sensor = lambda i: (i % self._sensor_interval) == (self._perceive_counter % self._sensor_interval)
-            sensor_sim_args = (p0_point, sensor_range, geom_targets)
-            sensor_output_arrs = list(map(
-                lambda i: _simulate_sensor(sensor_angles_ned[i], *sensor_sim_args) if activate_sensor(i) else (
-                    self._last_sensor_dist_measurements[i],
-                    self._last_sensor_speed_measurements[i],
-                    True
-                ),
-                range(self._n_sensors)
-            ))
-            sensor_dist_measurements, sensor_speed_measurements, sensor_blocked_arr = zip(*sensor_output_arrs)
-            sensor_dist_measurements = np.array(sensor_dist_measurements)
-            sensor_speed_measurements = np.array(sensor_speed_measurements)
+            if self.config["sensor_engine"] == 'numpy':
+                active_sensors = activate_sensor(np.arange(self._n_sensors))
+                sensor_dist_measurements = np.array(self._last_sensor_dist_measurements, dtype=np.float64)
+                sensor_speed_measurements = np.array(self._last_sensor_speed_measurements, dtype=np.float64)
+                sensor_blocked_arr = np.ones((self._n_sensors,), dtype=bool)
+                (
+                    sensor_dist_measurements[active_sensors],
+                    sensor_speed_measurements[active_sensors],
+                    sensor_blocked_arr[active_sensors]
+                ) = _simulate_sensors(sensor_angles_ned[active_sensors], self.position, sensor_range, geom_targets)
+            else:
+                sensor_sim_args = (p0_point, sensor_range, geom_targets)
+                sensor_output_arrs = list(map(
+                    lambda i: _simulate_sensor(sensor_angles_ned[i], *sensor_sim_args) if activate_sensor(i) else (
+                        self._last_sensor_dist_measurements[i],
+                        self._last_sensor_speed_measurements[i],
+                        True
+                    ),
+                    range(self._n_sensors)
+                ))
+                sensor_dist_measurements, sensor_speed_measurements, sensor_blocked_arr = zip(*sensor_output_arrs)
+                sensor_dist_measurements = np.array(sensor_dist_measurements)
+                sensor_speed_measurements = np.array(sensor_speed_measurements)
+                sensor_blocked_arr = np.array(sensor_blocked_arr)
+
+            # Simulating the active sensors against the static terrain
+            if should_observe and distance_field is not None:
+                active_idx = np.flatnonzero(activate_sensor(np.arange(self._n_sensors)))
+                terrain_distances = distance_field.cast_rays(self.position, sensor_angles_ned[active_idx], sensor_range)
+                terrain_closer = terrain_distances < sensor_dist_measurements[active_idx]
+                terrain_idx = active_idx[terrain_closer]
+                sensor_dist_measurements[terrain_idx] = terrain_distances[terrain_closer]
+                sensor_speed_measurements[terrain_idx] = 0
+                sensor_blocked_arr[terrain_idx] = True
             self._last_sensor_dist_measurements = sensor_dist_measurements
             self._last_sensor_speed_measurements = sensor_speed_measurements
 
@@ -393,14 +671,6 @@ class Vessel():
             sector_dist_measurements = np.split(sensor_dist_measurements, self._sector_start_indeces[1:])
             sector_speed_measurements = np.split(sensor_speed_measurements, self._sector_start_indeces[1:], axis=0)
 
-            # Performing feasibility pooling
-            sector_feasible_distances = np.array(list(
-                map(lambda x: _feasibility_pooling(x, self._feasibility_width, self._d_sensor_angle), sector_dist_measurements)
-            ))
-
-            # Calculating feasible closeness
-            sector_closenesses = self._get_closeness(sector_feasible_distances)
-
             # Retrieving obstacle speed for closest obstacle within each sector
             closest_obst_sensor_indeces = list(map(np.argmin, sector_dist_measurements))
             sector_velocities = np.concatenate(
@@ -408,79 +678,58 @@ class Vessel():
             )
 
             # Testing if vessel has collided
-            collision = np.any(sensor_dist_measurements < self.width)
+            self._collision = np.any(sensor_dist_measurements < self.width)
+            self._perceive_counter += 1
+            return True
 
+    def set_sector_perception(self, sector_feasible_distances:np.ndarray, sector_closenesses:np.ndarray) -> None:
+        """Sets the sector feasible distances and closenesses pooled from the latest
+        sensor distance measurements, completing the perception of the time-step."""
         self._last_sector_dist_measurements = sector_closenesses
         self._last_sector_feasible_dists = sector_feasible_distances
-        self._collision = collision
-        self._perceive_counter += 1
-
-        return self._get_closeness(self._last_sensor_dist_measurements.reshape(1,self.n_sensors))
-        #sensor_speed_x = self._last_sensor_speed_measurements[:, 0]
-        #sensor_speed_y = self._last_sensor_speed_measurements[:, 1]
-        #return np.vstack((self._last_sensor_dist_measurements,
-        #                  sensor_speed_x,
-        #                  sensor_speed_y)
-        #                 ).reshape(3, self.n_sensors)
 
-    def navigate(self, path:Path) -> np.ndarray:
+    def navigate(self, path:Path, out:np.ndarray=None) -> np.ndarray:
         """
         Calculates and returns navigation states representing the vessel's attitude
         with respect to the desired path.
 
+        Parameters
+        ----------
+        path : Path
+            Path followed by the vessel.
+        out : np.ndarray
+            Array of shape (1, len(NAVIGATION_FEATURES)) the navigation states are
+            written into, e.g. a view of an observation buffer.
+
         Returns
         -------
         navigation_states : np.ndarray
         """
 
-        # Calculating path arclength at reference point, i.e. the point closest to the vessel
-        vessel_arclength = path.get_closest_arclength(self.position)
-
-        # Calculating tangential path direction at reference point
-        path_direction = path.get_direction(vessel_arclength)
-        cross_track_error = geom.Rzyx(0, 0, -path_direction).dot(
-            np.hstack([path(vessel_arclength) - self.position, 0])
-        )[1]
-
-        # Calculating tangential path direction at look-ahead point
-        target_arclength = min(path.length, vessel_arclength + self.config["look_ahead_distance"])
-        look_ahead_path_direction = path.get_direction(target_arclength)
-        look_ahead_heading_error = float(geom.princip(look_ahead_path_direction - self.heading))
-
-        # Calculating vector difference between look-ahead point and vessel position
-        target_vector = path(target_arclength) - self.position
-
-        # Calculating heading error
-        target_heading = np.arctan2(target_vector[1], target_vector[0])
-        heading_error = float(geom.princip(target_heading - self.heading))
+        # Searching the point on the path closest to the vessel near the one of the previous step
+        arclength_hint = self._last_navi_state_dict['vessel_arclength'] if path is self._last_navi_path else np.nan
+        navigation_states, navigation = compute_navigation(
+            path,
+            self._state[np.newaxis, :],
+            self.config["look_ahead_distance"],
+            arclength_hints=np.array([arclength_hint]),
+            table_resolution=self.config["path_table_resolution"],
+            out=out
+        )
+        self._last_navi_path = path
 
         # Calculating path progress
-        progress = vessel_arclength/path.length
+        progress = navigation.pop('progress')[0]
         self._progress = progress
 
+        self._last_navi_state_dict = {state: value[0] for state, value in navigation.items()}
+
         # Deciding if vessel has reached the goal
-        goal_distance = linalg.norm(path.end - self.position)
+        goal_distance = self._last_navi_state_dict['goal_distance']
         reached_goal = goal_distance <= self.config["min_goal_distance"] or progress >= self.config["min_path_progress"]
         self._reached_goal = reached_goal
 
-        # Concatenating states
-        self._last_navi_state_dict = {
-            'surge_velocity': self.velocity[0],
-            'sway_velocity': self.velocity[1],
-            'yaw_rate': self.yaw_rate,
-            'look_ahead_heading_error': look_ahead_heading_error,
-            'heading_error': heading_error,
-            'cross_track_error': cross_track_error/100,
-            'target_heading': target_heading,
-            'look_ahead_path_direction': look_ahead_path_direction,
-            'path_direction': path_direction,
-            'vessel_arclength': vessel_arclength,
-            'target_arclength': target_arclength,
-            'goal_distance': goal_distance
-        }
-        navigation_states = np.array([self._last_navi_state_dict[state] for state in Vessel.NAVIGATION_FEATURES])
-
-        return navigation_states[np.newaxis, :]
+        return navigation_states
 
     def req_latest_data(self) -> dict:
         """Returns dictionary containing the most recent perception and navigation
@@ -515,25 +764,21 @@ class Vessel():
     #     return state_dot
     
     
-    # Made this outside the Vessel-class because of problems passing
-    # self when used in solve_ivp(...)
-    def _state_dot(self, t, state):
-                psi = state[2]
-                nu = state[3:]
-
-                tau = np.array([self._input[0] + self._input[1], 0,
-                                - self.config['lever_arm_left_propeller']*self._input[0]
-                                - self.config['lever_arm_right_propeller']*self._input[1]]) # Math is now correct,
-                                                                                            # but the boat turns the wrong way
-
-                eta_dot = geom.Rzyx(0, 0, geom.princip(psi)).dot(nu)
-                nu_dot = const.M_inv.dot(
-                    tau
-                    # - const.D(nu).dot(nu)
-                    - const.N(nu).dot(nu)
-                )
-                state_dot = np.concatenate([eta_dot, nu_dot])
-                return state_dot
+    def _state_dot(self, state):
+        return dynamics.state_dot(state, self._tau)
+
+    def _get_closeness(self, distances, out=None):
+        """Returns the closenesses of the given distances, see _sensor_closeness. If
+        out is given, the closenesses are evaluated in a reused float64 scratch array
+        and written into out, as the returned array cast to the dtype of out."""
+        scratch = None
+        if out is not None:
+            if self._closeness_scratch is None or self._closeness_scratch.shape != out.shape:
+                self._closeness_scratch = np.empty(out.shape)
+            scratch = self._closeness_scratch
+        return _sensor_closeness(
+            distances, self.config["sensor_range"], self.config["sensor_log_transform"], out=out, scratch=scratch
+        )
 
 
     def _thrust_surge(self, surge):
@@ -0,0 +1,7 @@
+"""
+Renderers of the gym_auv environments. The renderers require a display and are
+imported on demand, whereas the constants below are shared with the
+environments, which may run headless.
+"""
+
+FPS = 50    # Frame rate of the rendered videos
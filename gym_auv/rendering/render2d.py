@@ -20,6 +20,7 @@ from numpy import sin, cos, arctan2
 from gym import error
 import torch as th
 import gym_auv.utils.geomutils as geom
+from gym_auv.rendering import FPS
 from gym_auv.objects.obstacles import CircularObstacle, PolygonObstacle, VesselObstacle
 from gym_auv.objects.vessel import _feasibility_pooling
 
@@ -37,7 +38,6 @@ WINDOW_H = VIDEO_H
 
 SCALE       = 5.0        # Track scale
 PLAYFIELD   = 5000   # Game over boundary
-FPS         = 50
 ZOOM        = 2       # Camera ZOOM
 DYNAMIC_ZOOM = False
 CAMERA_ROTATION_SPEED = 0.02
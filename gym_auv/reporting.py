@@ -31,72 +31,167 @@ SHADOW_LENGTH = 100
 
 #matplotlib.use('pdf')
 
-class Log(tables.IsDescription):
-    episode = tables.Int32Col()
-    timesteps = tables.Int32Col()
-    duration = tables.Float32Col()
-    reached_goal = tables.Int32Col()
-    collision = tables.Int32Col()
-    cross_track_error = tables.Int32Col()
-    reward = tables.Float32Col()
-    progress = tables.Float32Col()
-    pathlength = tables.Float32Col()
-
-
-class TrajectoryLog(tables.IsDescription):
-    episode = tables.Int32Col()
-    path = tables.Float32Col(shape=(2,1000))
-    path_taken = tables.Float32Col(shape=(10000, 2))
-    obstacles = tables.Float32Col(shape=(500, 2))
-
-
-def read_hdf5_report(report_dir):
-    f = tables.open_file(os.path.join(report_dir, 'history.h5'), mode='r')
-    history_table = f.root.RL_Agent.history
-    trajectory_table = f.root.RL_Agent.trajectory
-    hist_columns = history_table.coldescrs.keys()
-    traj_columns = trajectory_table.coldescrs.keys()
-
-    history = {
-        'collisions'            : [],
-        'cross_track_errors'    : [],
-        'progresses'            : [],
-        'rewards'               : [],
-        'timesteps'             : [],
-        'durations'             : [],
-        'pathlengths'           : [],
-        'speeds'                : []
-    }
-
-    for row in history_table.iterrows():
-        for col in hist_columns:
-            history[col].append(row[col])
-
-    trajectories = {
-        'episode'       : [],
-        'path'          : [],
-        'path_takes'    : [],
-        'obstacles'     : []
-    }
-
-    for row in trajectory_table.iterrows():
-        for col in traj_columns:
-            trajectories[col].append(row[col])
+class EpisodeReader():
+    """
+    Reader of the HDF5 history files written by gym_auv.utils.episode_writer.EpisodeWriter.
+    Statistics are read column-wise and only for the selected episodes, while
+    trajectories are read one episode at a time, so that large training logs can
+    be reported with bounded memory.
 
-    f.close()
+    Can be used in place of BaseEnvironment.history, e.g. by report(), as indexing
+    with a statistic returns it as a tables.Column, which is only read from the
+    file when sliced.
 
-    for (hist_field, traj_field) in zip(history.keys(), trajectories.keys()):
-        history_table[hist_field] = np.array(history[hist_field])
-        trajectory_table[traj_field] = np.array(trajectory_table[traj_field])
+    Parameters
+    ----------
+    path : str
+        Path of the HDF5 file, or of the directory holding history.h5.
+    """
 
+    def __init__(self, path:str) -> None:
+        if os.path.isdir(path):
+            path = os.path.join(path, 'history.h5')
+        self._file = tables.open_file(path, mode='r')
+        if '/RL_agent/history' not in self._file:
+            self._file.close()
+            raise ValueError('{} is not a history file, as it has no /RL_agent/history table'.format(path))
+        self._history_table = self._file.root.RL_agent.history
+        self._trajectory_group = self._file.root.RL_agent.trajectory if '/RL_agent/trajectory' in self._file else None
+        # Files written before EpisodeWriter store the trajectories as a table with one
+        # zero-padded row per episode, instead of a group of variable-length arrays
+        self._legacy_trajectories = isinstance(self._trajectory_group, tables.Table)
+
+    def __enter__(self) -> 'EpisodeReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._history_table.nrows
+
+    def __getitem__(self, column:str) -> tables.Column:
+        return self._history_table.cols._f_col(column)
+
+    def keys(self) -> list:
+        """Returns the names of the statistics."""
+        return [column for column in self._history_table.colnames if column != 'episode']
+
+    def close(self) -> None:
+        self._file.close()
+
+    def history(self, columns:list=None, lastn:int=None, episodes:tuple=None) -> dict:
+        """
+        Returns the statistics of the selected episodes, by default all of them.
+
+        Parameters
+        ----------
+        columns : list
+            Names of the statistics to read. If None, all are read.
+        lastn : int
+            If given, only the last lastn episodes are read.
+        episodes : tuple
+            If given, only the episodes with numbers in the range [first, last] are read.
+
+        Returns
+        -------
+        history : dict
+            Dictionary holding an array for each statistic, and for 'episode'.
+        """
+        columns = self._history_table.colnames if columns is None else ['episode'] + list(columns)
+        if episodes is not None:
+            rows = self._history_table.read_where(
+                '(episode >= first) & (episode <= last)', condvars={'first': episodes[0], 'last': episodes[1]}
+            )
+            return {column: rows[column] for column in columns}
+        start = 0 if lastn is None else max(0, len(self) - lastn)
+        return {column: self._history_table.read(start=start, field=column) for column in columns}
+
+    def trajectory_episodes(self) -> np.ndarray:
+        """Returns the episode numbers of the stored trajectories."""
+        if self._trajectory_group is None:
+            return np.zeros(0, dtype=np.int32)
+        if self._legacy_trajectories:
+            return self._trajectory_group.col('episode')
+        return self._trajectory_group.episode.read()
+
+    def iter_trajectories(self, lastn:int=None, episodes:tuple=None):
+        """
+        Yields the stored trajectories of the selected episodes one at a time, as
+        dictionaries holding 'episode', 'path' of shape (2, n), 'path_taken' of
+        shape (n, 2) and 'obstacles' of shape (n, 2) holding the obstacle centroids.
+
+        Parameters
+        ----------
+        lastn : int
+            If given, only the last lastn trajectories are read.
+        episodes : tuple
+            If given, only the episodes with numbers in the range [first, last] are read.
+        """
+        trajectory_episodes = self.trajectory_episodes()
+        start, stop = 0, len(trajectory_episodes)
+        if episodes is not None:
+            start = np.searchsorted(trajectory_episodes, episodes[0], side='left')
+            stop = np.searchsorted(trajectory_episodes, episodes[1], side='right')
+        elif lastn is not None:
+            start = max(0, stop - lastn)
+        for idx in range(start, stop):
+            if self._legacy_trajectories:
+                row = self._trajectory_group[idx]
+                yield {
+                    'episode': trajectory_episodes[idx],
+                    'path': row['path'],
+                    'path_taken': _strip_padding(row['path_taken']),
+                    'obstacles': _strip_padding(row['obstacles'])
+                }
+                continue
+            yield {
+                'episode': trajectory_episodes[idx],
+                'path': self._trajectory_group.path[idx].T,
+                'path_taken': self._trajectory_group.path_taken[idx],
+                'obstacles': self._trajectory_group.obstacles[idx]
+            }
+
+
+def _strip_padding(points:np.ndarray) -> np.ndarray:
+    """Returns the points of a zero-padded array of shape (n, 2) of the legacy
+    trajectory table, without the trailing rows of zeros."""
+    nonzero_rows = np.flatnonzero(np.any(points != 0, axis=1))
+    return points[:nonzero_rows[-1] + 1] if len(nonzero_rows) else points[:0]
+
+
+def read_hdf5_report(report_dir, lastn=None):
+    """Returns the statistics and trajectories of the last lastn episodes (all if None)
+    stored in the history file in report_dir, as a dictionary of arrays and a
+    dictionary of lists, respectively."""
+    with EpisodeReader(report_dir) as reader:
+        history = reader.history(lastn=lastn)
+        trajectories = {'episode': [], 'path': [], 'path_taken': [], 'obstacles': []}
+        for trajectory in reader.iter_trajectories(lastn=lastn):
+            for field in trajectories.keys():
+                trajectories[field].append(trajectory[field])
     return history, trajectories
 
-def report(env, report_dir, lastn=100):
+def report(env, report_dir, lastn=100, history=None):
+    """
+    Writes a text summary and plots of the training statistics to report_dir.
+
+    Parameters
+    ----------
+    env : BaseEnvironment
+        Environment whose history is reported, unless history is given.
+    report_dir : str
+        Directory to write the report to.
+    lastn : int
+        Number of episodes to report.
+    history : EpisodeReader
+        Statistics to report, e.g. read from a training log. Defaults to env.history.
+    """
     try:
         os.makedirs(report_dir, exist_ok=True)
 
-        #history, _ = read_hdf5_report(report_dir)
-        history = env.history
+        if history is None:
+            history = env.history
 
         #if lastn >= len(history["episodes"]):
         #    lastn = len(history["episodes"])
@@ -313,8 +408,8 @@ def plot_trajectory(report_dir, env, fig_dir, local=False, size=100, fig_prefix=
             #     #ax.plot(x_arr, y_arr, dashes=[6, 2], color='red', linewidth=0.5, alpha=0.3)
 
             if (not local) and isinstance(obst, VesselObstacle):
-                x_arr = [elm[1][0] for elm in obst.trajectory]
-                y_arr = [elm[1][1] for elm in obst.trajectory]
+                x_arr = obst.motion.waypoints[:, 0]
+                y_arr = obst.motion.waypoints[:, 1]
                 ax.plot(x_arr, y_arr, dashes=[6, 2], color='red', linewidth=0.5, alpha=0.3)
 
             if not local:
@@ -554,8 +649,8 @@ def plot_scenario(env, fig_dir, fig_postfix='', show=True):
         if not obst.static:
             
             if isinstance(obst, VesselObstacle):
-                x_arr = [elm[1][0] for elm in obst.trajectory]
-                y_arr = [elm[1][1] for elm in obst.trajectory]
+                x_arr = obst.motion.waypoints[:, 0]
+                y_arr = obst.motion.waypoints[:, 1]
                 ax.plot(x_arr, y_arr, dashes=[6, 2], color='red', linewidth=0.5, alpha=0.3)
 
             plt.arrow(
@@ -0,0 +1,44 @@
+"""
+This module implements atomic writes of the cache files stored next to the
+scenario resources, e.g. distance fields, scaled terrain and traffic stores.
+These files are memory-mapped by all processes on a node, so they must never be
+truncated or rewritten in place while another process, e.g. a SubprocVecEnv
+worker starting at the same time, has them open.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+@contextmanager
+def atomic_write(path:str, mode:str='wb'):
+    """
+    Opens a temporary file in the directory of path for writing, which replaces
+    path once the block completes without errors. Processes that open path in
+    the meantime see the complete previous file, and processes that have already
+    memory-mapped it keep the previous file, as it is replaced rather than
+    overwritten.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file to write.
+    mode : str
+        Mode the temporary file is opened in, 'wb' or 'w'.
+
+    Yields
+    ------
+    f : file
+        The opened temporary file.
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + filename + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        # mkstemp creates the file readable by the owner only
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
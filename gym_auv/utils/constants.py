@@ -28,15 +28,19 @@ M =  np.array([[m - X_udot, 0, 0],
 M_inv = np.linalg.inv(M)
 
 def N(nu):
-    u = nu[0]
-    v = nu[1]
-    r = nu[2]
+    # Broadcasts over velocity vectors nu of shape (..., 3), as used by the batched
+    # model in gym_auv.utils.dynamics, returning matrices of shape (..., 3, 3)
+    nu = np.asarray(nu)
+    u = nu[..., 0]
+    v = nu[..., 1]
+    r = nu[..., 2]
+    zero = np.zeros(u.shape)
     N = np.array([
-        [-X_u, -m*r, -m*x_g*r+Y_vdot*v],
-        [m*r, -Y_v, -X_udot*u],
-        [m*x_g*r-Y_vdot*v, X_udot*u, -N_r]
+        [zero-X_u, -m*r, -m*x_g*r+Y_vdot*v],
+        [m*r, zero-Y_v, -X_udot*u],
+        [m*x_g*r-Y_vdot*v, X_udot*u, zero-N_r]
     ])
-    return N
+    return np.moveaxis(N, (0, 1), (-2, -1))
 
 
 
@@ -0,0 +1,78 @@
+"""
+This module implements the 3-DOF vessel model described by gym_auv.utils.constants
+as vectorised array operations. All functions accept states of shape (6,) for a
+single vessel, or (N, 6) for N vessels that are simulated at once.
+"""
+import numpy as np
+
+import gym_auv.utils.constants as const
+import gym_auv.utils.geomutils as geom
+import gym_auv.utils.integrators as integrators
+
+def action_to_thrust(action, config):
+    """Maps actions in [-1, 1] to motor thrusts in Newton, using the maximum
+    forward and backward thrust of the motors."""
+    action = np.clip(np.asarray(action, dtype=np.float64), -1, 1)
+    return np.where(
+        action > 0,
+        action*config['thrusters_max_forward'],
+        action*config['thrusters_max_backwards']
+    )
+
+def thrust_to_tau(thrust, config):
+    """Returns the generalized forces [surge, sway, yaw] resulting from the
+    thrusts [left, right] of the two motors."""
+    thrust = np.asarray(thrust, dtype=np.float64)
+    tau = np.zeros(thrust.shape[:-1] + (3,))
+    tau[..., 0] = thrust[..., 0] + thrust[..., 1]
+    tau[..., 2] = - config['lever_arm_left_propeller']*thrust[..., 0] \
+                  - config['lever_arm_right_propeller']*thrust[..., 1]
+    return tau
+
+def state_dot(state, tau):
+    """Time derivative of the state [x, y, psi, u, v, r] given the generalized
+    forces tau."""
+    psi = state[..., 2]
+    nu = state[..., 3:]
+    cpsi = np.cos(psi)
+    spsi = np.sin(psi)
+
+    state_dot = np.empty(state.shape)
+    state_dot[..., 0] = cpsi*nu[..., 0] - spsi*nu[..., 1]
+    state_dot[..., 1] = spsi*nu[..., 0] + cpsi*nu[..., 1]
+    state_dot[..., 2] = nu[..., 2]
+    state_dot[..., 3:] = (tau - np.matmul(const.N(nu), nu[..., np.newaxis])[..., 0]).dot(const.M_inv.T)
+    return state_dot
+
+def step(states, thrusts, config, integrator=None):
+    """
+    Simulates N vessels one timestep forward.
+
+    Parameters
+    ----------
+    states : np.ndarray
+        Array of shape (N, 6) holding the vessel states [x, y, psi, u, v, r].
+    thrusts : np.ndarray
+        Array of shape (N, 2) holding the thrust [left, right] in Newton
+        applied by the motors of each vessel.
+    config : dict
+        Environment configuration, providing the timestep, the integrator
+        and the propeller lever arms.
+    integrator : function
+        Integrator to use. Defaults to the one given by config["integrator"].
+
+    Returns
+    -------
+    states : np.ndarray
+        Array of shape (N, 6) holding the new vessel states. The heading
+        is mapped to [-pi, pi).
+    """
+    if integrator is None:
+        integrator = integrators.get_integrator(config["integrator"])
+    tau = thrust_to_tau(thrusts, config)
+    states = integrators.integrate(
+        integrator, lambda state: state_dot(state, tau), np.asarray(states, dtype=np.float64),
+        config["t_step_size"], n_substeps=config["integrator_substeps"]
+    )
+    states[..., 2] = geom.princip(states[..., 2])
+    return states
@@ -0,0 +1,75 @@
+"""
+This module implements an append-only columnar storage for the statistics of
+completed episodes, e.g. the reward, the number of timesteps and whether the
+vessel collided.
+"""
+import numpy as np
+
+class EpisodeStatistics():
+    """
+    Append-only table with one row per episode and one column per statistic.
+    Rows are stored in fixed-size chunks, so appending an episode never copies
+    the previous ones. Besides reading whole columns like a dict of arrays, the
+    rows appended since the last call of read_new() can be read, which allows
+    training processes to only transfer the new episodes.
+
+    Parameters
+    ----------
+    columns : list
+        Names of the statistics stored for each episode.
+    chunk_size : int
+        Number of rows in each storage chunk.
+    """
+
+    def __init__(self, columns:list, chunk_size:int=1024) -> None:
+        self._columns = list(columns)
+        self._column_idx = {column: i for i, column in enumerate(self._columns)}
+        self._chunk_size = chunk_size
+        self._chunks = []
+        self._n_rows = 0
+        self._n_read = 0
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __contains__(self, column:str) -> bool:
+        return column in self._column_idx
+
+    def __getitem__(self, column:str) -> np.ndarray:
+        """Returns an array holding the given statistic for all episodes."""
+        return self._rows(0, self._n_rows)[:, self._column_idx[column]]
+
+    def keys(self) -> list:
+        """Returns the names of the statistics."""
+        return list(self._columns)
+
+    def row(self, index:int) -> dict:
+        """Returns the statistics of the episode with the given index as a dict."""
+        chunk_idx, row_idx = divmod(range(self._n_rows)[index], self._chunk_size)
+        return dict(zip(self._columns, self._chunks[chunk_idx][row_idx]))
+
+    def append(self, stats:dict) -> None:
+        """Appends an episode, given as a dict holding a value for every column."""
+        chunk_idx, row_idx = divmod(self._n_rows, self._chunk_size)
+        if chunk_idx == len(self._chunks):
+            self._chunks.append(np.empty((self._chunk_size, len(self._columns))))
+        self._chunks[chunk_idx][row_idx] = [stats[column] for column in self._columns]
+        self._n_rows += 1
+
+    def read_new(self) -> dict:
+        """Returns a dict holding an array for each statistic, with the episodes
+        appended since the last call, and marks them as read."""
+        rows = self._rows(self._n_read, self._n_rows)
+        self._n_read = self._n_rows
+        return {column: rows[:, i] for i, column in enumerate(self._columns)}
+
+    def _rows(self, start:int, stop:int) -> np.ndarray:
+        if start >= stop:
+            return np.empty((0, len(self._columns)))
+        first_chunk, last_chunk = start//self._chunk_size, (stop - 1)//self._chunk_size
+        rows = np.concatenate(self._chunks[first_chunk:last_chunk + 1])
+        offset = first_chunk*self._chunk_size
+        return rows[start - offset:stop - offset]
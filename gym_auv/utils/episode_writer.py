@@ -0,0 +1,158 @@
+"""
+This module implements a writer logging the statistics and trajectories of
+completed episodes to an HDF5 file, which is kept open during training.
+"""
+import os
+
+import numpy as np
+import tables
+
+class Log(tables.IsDescription):
+    episode = tables.Int32Col()
+    timesteps = tables.Int32Col()
+    duration = tables.Float32Col()
+    reached_goal = tables.Int32Col()
+    collision = tables.Int32Col()
+    cross_track_error = tables.Int32Col()
+    reward = tables.Float32Col()
+    progress = tables.Float32Col()
+    pathlength = tables.Float32Col()
+
+TRAJECTORY_FIELDS = ['path', 'path_taken', 'obstacles']
+
+class EpisodeWriter():
+    """
+    Writes episodes to the group /RL_agent of an HDF5 file, holding the table
+    'history' with one row of statistics per episode, and the group 'trajectory'
+    holding, for each episode, its number in 'episode' and the variable-length
+    arrays of points 'path', 'path_taken' and 'obstacles' (obstacle centroids),
+    compressed with blosc.
+
+    The file is opened on the first write and kept open until close() is called,
+    while episodes are buffered in memory and written in blocks. Existing files
+    written by an EpisodeWriter are appended to, while files in another layout,
+    e.g. history files written before EpisodeWriter, raise a ValueError before
+    anything is written. As HDF5 files must not be written by several processes,
+    each training process should use its own file, see worker_filename().
+
+    Parameters
+    ----------
+    path : str
+        Path of the HDF5 file.
+    flush_interval : int
+        Number of buffered episodes written to the file at once.
+    complevel : int
+        Blosc compression level of the trajectories (0-9).
+    """
+
+    def __init__(self, path:str, flush_interval:int=100, complevel:int=5) -> None:
+        self.path = path
+        self._flush_interval = flush_interval
+        self._filters = tables.Filters(complevel=complevel, complib='blosc', shuffle=True)
+        self._file = None
+        self._buffer = []
+
+    def write(self, episode:int, stats:dict, trajectory:dict=None) -> None:
+        """
+        Buffers an episode, writing the buffer to the file when it is full.
+
+        Parameters
+        ----------
+        episode : int
+            Episode number.
+        stats : dict
+            Statistics of the episode, holding a value for each column of Log
+            except 'episode'.
+        trajectory : dict
+            Trajectory data of the episode, i.e. BaseEnvironment.last_episode.
+            If None, only the statistics are written.
+        """
+        points = None if trajectory is None else _trajectory_points(trajectory)
+        self._buffer.append((episode, stats, points))
+        if len(self._buffer) >= self._flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered episodes to the file."""
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._open()
+
+        history_table = self._file.root.RL_agent.history
+        columns = history_table.colnames
+        history_table.append([
+            tuple(episode if column == 'episode' else stats[column] for column in columns)
+            for episode, stats, _ in self._buffer
+        ])
+
+        trajectory_group = self._file.root.RL_agent.trajectory
+        for episode, _, points in self._buffer:
+            if points is None:
+                continue
+            trajectory_group.episode.append([episode])
+            for field, field_points in zip(TRAJECTORY_FIELDS, points):
+                getattr(trajectory_group, field).append(field_points)
+
+        self._buffer = []
+        self._file.flush()
+
+    def close(self) -> None:
+        """Writes the buffered episodes and closes the file."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = tables.open_file(self.path, mode='a', title="Training Statistics")
+        if '/RL_agent' in self._file:
+            if not self._has_writer_layout():
+                self._file.close()
+                self._file = None
+                raise ValueError(
+                    '{} cannot be appended to, as /RL_agent is not in the layout written by '
+                    'EpisodeWriter, e.g. as it was written by an older version'.format(self.path)
+                )
+            return
+        group = self._file.create_group("/", "RL_agent", "DRL Agent Training statistics")
+        self._file.create_table(group, "history", Log, "History")
+        trajectory_group = self._file.create_group(group, "trajectory", "Trajectories")
+        self._file.create_earray(trajectory_group, "episode", tables.Int32Atom(), shape=(0,), title="Episode")
+        for field in TRAJECTORY_FIELDS:
+            self._file.create_vlarray(
+                trajectory_group, field, tables.Float32Atom(shape=(2,)), title=field, filters=self._filters
+            )
+
+    def _has_writer_layout(self) -> bool:
+        """Returns whether the /RL_agent group of the open file holds the history
+        table and the trajectory group written by _open()."""
+        group = self._file.root.RL_agent
+        if not isinstance(group, tables.Group) or 'history' not in group or 'trajectory' not in group:
+            return False
+        if not isinstance(group.history, tables.Table) or set(group.history.colnames) != set(Log.columns):
+            return False
+        trajectory_group = group.trajectory
+        if not isinstance(trajectory_group, tables.Group):
+            return False
+        if not isinstance(getattr(trajectory_group, 'episode', None), tables.EArray):
+            return False
+        return all(
+            isinstance(getattr(trajectory_group, field, None), tables.VLArray) for field in TRAJECTORY_FIELDS
+        )
+
+def worker_filename(worker_index:int=None) -> str:
+    """Returns the name of the history file written by the training process or
+    environment with the given index, or 'history.h5' if None."""
+    if worker_index is None:
+        return 'history.h5'
+    return 'history_{}.h5'.format(worker_index)
+
+def _trajectory_points(trajectory:dict) -> list:
+    """Returns the path, path taken and obstacle centroids of the given trajectory
+    data as arrays of shape (n, 2)."""
+    path = np.zeros((0, 2)) if trajectory['path'] is None else np.asarray(trajectory['path']).T
+    path_taken = np.asarray(trajectory['path_taken']).reshape(-1, 2)
+    obstacles = np.array([obst.boundary.centroid.coords[0] for obst in trajectory['obstacles']]).reshape(-1, 2)
+    return [path, path_taken, obstacles]
@@ -0,0 +1,122 @@
+"""
+This module implements the numerical integrators that can be used for simulating
+the vessel dynamics. Every integrator advances the state y of a time-invariant
+ODE y' = f(y) by a single step of length h and returns the new state.
+"""
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.linalg import expm
+
+import gym_auv.utils.constants as const
+
+def odesolver45(f, y, h):
+    """Calculate the next step of an IVP of a time-invariant ODE with a RHS
+    described by f, with an order 4 approx. and an order 5 approx.
+    Parameters:
+        f: function. RHS of ODE.
+        y: float. Current position.
+        h: float. Step length.
+    Returns:
+        q: float. Order 2 approx.
+        w: float. Order 3 approx.
+    """
+    s1 = f(y)
+    s2 = f(y+h*s1/4.0)
+    s3 = f(y+3.0*h*s1/32.0+9.0*h*s2/32.0)
+    s4 = f(y+1932.0*h*s1/2197.0-7200.0*h*s2/2197.0+7296.0*h*s3/2197.0)
+    s5 = f(y+439.0*h*s1/216.0-8.0*h*s2+3680.0*h*s3/513.0-845.0*h*s4/4104.0)
+    s6 = f(y-8.0*h*s1/27.0+2*h*s2-3544.0*h*s3/2565+1859.0*h*s4/4104.0-11.0*h*s5/40.0)
+    w = y + h*(25.0*s1/216.0+1408.0*s3/2565.0+2197.0*s4/4104.0-s5/5.0)
+    q = y + h*(16.0*s1/135.0+6656.0*s3/12825.0+28561.0*s4/56430.0-9.0*s5/50.0+2.0*s6/55.0)
+    return w, q
+
+def rk4(f, y, h):
+    """Classical fixed-step 4th order Runge-Kutta step."""
+    k1 = f(y)
+    k2 = f(y + 0.5*h*k1)
+    k3 = f(y + 0.5*h*k2)
+    k4 = f(y + h*k3)
+    return y + h/6.0*(k1 + 2*k2 + 2*k3 + k4)
+
+def rk45(f, y, h):
+    """Fixed-step Runge-Kutta-Fehlberg step, using the order 5 approximation
+    from odesolver45 without any step size control."""
+    _, q = odesolver45(f, y, h)
+    return q
+
+def semi_implicit_euler(f, y, h):
+    """Symplectic Euler step. The velocities nu = y[..., 3:] are updated first,
+    and the pose eta = y[..., :3] is then advanced using the new velocities."""
+    y_next = np.array(y, dtype=np.float64)
+    y_next[..., 3:] = y[..., 3:] + h*f(y)[..., 3:]
+    y_next[..., :3] = y[..., :3] + h*f(y_next)[..., :3]
+    return y_next
+
+def linearized(f, y, h):
+    """Closed-form step of the 3-DOF model linearised about the current state.
+
+    The velocity dynamics nu' = M^-1 (tau - N(nu) nu) are approximated by the
+    affine system nu' = A nu + b with A = -M^-1 N(nu_k) frozen over the step,
+    and b chosen such that the approximation is exact at nu_k. The affine system,
+    together with the integral of nu over the step, is solved exactly by a single
+    matrix exponential. The heading is then advanced by the integrated yaw rate,
+    and the position by the integrated surge and sway velocities rotated by the
+    heading at the middle of the step.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    states = y.reshape(-1, 6)
+    states_dot = f(y).reshape(-1, 6)
+    states_next = np.empty(states.shape)
+
+    for i, (state, state_dot) in enumerate(zip(states, states_dot)):
+        nu = state[3:]
+        A = -const.M_inv.dot(const.N(nu))
+        b = state_dot[3:] - A.dot(nu)
+
+        # Augmented system z = [nu, 1, int(nu)]
+        Z = np.zeros((7, 7))
+        Z[0:3, 0:3] = A
+        Z[0:3, 3] = b
+        Z[4:7, 0:3] = np.eye(3)
+        z = expm(Z*h).dot(np.hstack([nu, 1, 0, 0, 0]))
+        nu_next = z[0:3]
+        nu_int = z[4:7]
+
+        psi_mid = state[2] + 0.5*nu_int[2]
+        cpsi = np.cos(psi_mid)
+        spsi = np.sin(psi_mid)
+        states_next[i, 0] = state[0] + cpsi*nu_int[0] - spsi*nu_int[1]
+        states_next[i, 1] = state[1] + spsi*nu_int[0] + cpsi*nu_int[1]
+        states_next[i, 2] = state[2] + nu_int[2]
+        states_next[i, 3:] = nu_next
+
+    return states_next.reshape(y.shape)
+
+def bdf(f, y, h):
+    """Variable-step implicit BDF integration using scipy. This is accurate, but
+    slow, and is mostly meant as a reference for the other integrators."""
+    y = np.asarray(y, dtype=np.float64)
+    sol = solve_ivp(lambda t, state: f(state.reshape(y.shape)).ravel(), [0, h], y.ravel(), method='BDF')
+    return sol.y[:, -1].reshape(y.shape)
+
+INTEGRATORS = {
+    'rk4': rk4,
+    'rk45': rk45,
+    'semi_implicit_euler': semi_implicit_euler,
+    'linearized': linearized,
+    'bdf': bdf
+}
+
+def get_integrator(name):
+    """Returns the integrator function registered under the given name."""
+    try:
+        return INTEGRATORS[name]
+    except KeyError:
+        raise ValueError('Unknown integrator "{}", expected one of {}'.format(name, list(INTEGRATORS.keys())))
+
+def integrate(integrator, f, y, h, n_substeps=1):
+    """Advances y by h using n_substeps equally sized steps of the given integrator."""
+    dt = h/n_substeps
+    for _ in range(n_substeps):
+        y = integrator(f, y, dt)
+    return y
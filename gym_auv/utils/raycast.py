@@ -0,0 +1,146 @@
+"""
+This module implements a vectorised rangefinder simulation. The obstacle boundaries
+are flattened into one packed array of line segments, and the intersections between
+all sensor rays and all segments are solved at once using array broadcasting.
+"""
+import numpy as np
+
+FILLED_GEOM_TYPES = ('Polygon', 'MultiPolygon')
+
+def _line_coords(geometry):
+    """Returns the coordinate arrays of all lines and rings making up the geometry."""
+    if geometry.is_empty:
+        return []
+    geom_type = geometry.geom_type
+    if geom_type in ('LineString', 'LinearRing'):
+        return [np.asarray(geometry.coords)[:, :2]]
+    elif geom_type == 'Polygon':
+        return [np.asarray(ring.coords)[:, :2] for ring in [geometry.exterior] + list(geometry.interiors)]
+    elif geom_type in ('MultiLineString', 'MultiPolygon', 'GeometryCollection'):
+        return [coords for part in geometry.geoms for coords in _line_coords(part)]
+    return []
+
+def boundary_segments(boundary):
+    """
+    Returns the line segments making up an obstacle boundary.
+
+    Parameters
+    ----------
+    boundary : shapely.geometry.base.BaseGeometry
+        Obstacle boundary, i.e. a (multi)polygon or a (multi)linestring.
+
+    Returns
+    -------
+    segments : np.ndarray
+        Array of shape (M, 4) where each row holds a segment [x1, y1, x2, y2].
+    """
+    segments = [
+        np.hstack([coords[:-1], coords[1:]]) for coords in _line_coords(boundary) if len(coords) > 1
+    ]
+    if not segments:
+        return np.zeros((0, 4))
+    return np.vstack(segments).astype(np.float64)
+
+def pack_obstacles(obstacles):
+    """
+    Flattens the boundaries of the given obstacles into one segment array.
+
+    Parameters
+    ----------
+    obstacles : list
+        List of obstacles, each providing the segments and filled properties of BaseObstacle.
+
+    Returns
+    -------
+    segments : np.ndarray
+        Array of shape (M, 4) holding the segments of all obstacles.
+    segment_obstacle_ids : np.ndarray
+        Array of shape (M,) holding the index of the obstacle each segment belongs to.
+    filled : np.ndarray
+        Boolean array of shape (len(obstacles),), True for obstacles with an area,
+        i.e. obstacles that block a ray starting inside them.
+    """
+    obstacle_segments = [obst.segments for obst in obstacles]
+    if obstacle_segments:
+        segments = np.vstack(obstacle_segments)
+    else:
+        segments = np.zeros((0, 4))
+    segment_obstacle_ids = np.repeat(np.arange(len(obstacles)), [len(s) for s in obstacle_segments])
+    filled = np.array([obst.filled for obst in obstacles], dtype=bool)
+    return segments, segment_obstacle_ids, filled
+
+def points_inside(point, segments, segment_obstacle_ids, filled):
+    """Returns a boolean array of shape (len(filled),), which is True for the filled
+    obstacles containing the point, using the crossing number (even-odd) rule."""
+    x1, y1, x2, y2 = segments.T
+    straddles = (y1 > point[1]) != (y2 > point[1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (point[1] - y1)*(x2 - x1)/(y2 - y1)
+    crossings = straddles & (point[0] < x_cross)
+    n_crossings = np.bincount(segment_obstacle_ids, weights=crossings, minlength=len(filled))
+    return filled & (n_crossings % 2 == 1)
+
+def cast_rays(point, angles, sensor_range, segments, segment_obstacle_ids, filled):
+    """
+    Simulates rangefinder rays against a packed set of obstacle segments.
+
+    Parameters
+    ----------
+    point : np.ndarray
+        Origin [x, y] of the rays.
+    angles : np.ndarray
+        Array of shape (S,) holding the angles of the rays in the global frame.
+    sensor_range : float
+        Length of the rays.
+    segments, segment_obstacle_ids, filled : np.ndarray
+        Packed obstacles, as returned by pack_obstacles.
+
+    Returns
+    -------
+    distances : np.ndarray
+        Array of shape (S,) holding the distance to the closest intersection of
+        each ray, or sensor_range if the ray is not blocked. Rays starting inside
+        a filled obstacle measure 0.
+    obstacle_ids : np.ndarray
+        Array of shape (S,) holding the index of the obstacle blocking each ray,
+        or -1 if the ray is not blocked.
+    blocked : np.ndarray
+        Boolean array of shape (S,), True for the rays that are blocked.
+    """
+    n_rays = len(angles)
+    distances = np.full(n_rays, float(sensor_range))
+    obstacle_ids = np.full(n_rays, -1, dtype=int)
+    if len(segments) == 0:
+        return distances, obstacle_ids, np.zeros(n_rays, dtype=bool)
+
+    point = np.asarray(point, dtype=np.float64)
+    ray_x = (np.cos(angles)*sensor_range)[:, np.newaxis]
+    ray_y = (np.sin(angles)*sensor_range)[:, np.newaxis]
+    seg_x = segments[:, 2] - segments[:, 0]
+    seg_y = segments[:, 3] - segments[:, 1]
+    rel_x = segments[:, 0] - point[0]
+    rel_y = segments[:, 1] - point[1]
+
+    # Solving point + t*ray = segment_start + s*(segment_end - segment_start) for all
+    # (ray, segment) pairs using 2D cross products
+    denom = ray_x*seg_y - ray_y*seg_x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (rel_x*seg_y - rel_y*seg_x)/denom
+        s = (rel_x*ray_y - rel_y*ray_x)/denom
+    hit = (denom != 0) & (t >= 0) & (t <= 1) & (s >= 0) & (s <= 1)
+    t = np.where(hit, t, np.inf)
+
+    closest_segment = np.argmin(t, axis=1)
+    t_min = t[np.arange(n_rays), closest_segment]
+    blocked = np.isfinite(t_min)
+    distances[blocked] = t_min[blocked]*sensor_range
+    obstacle_ids[blocked] = segment_obstacle_ids[closest_segment[blocked]]
+
+    if np.any(filled):
+        inside = np.flatnonzero(points_inside(point, segments, segment_obstacle_ids, filled))
+        if len(inside):
+            distances[:] = 0
+            obstacle_ids[:] = inside[0]
+            blocked[:] = True
+
+    return distances, obstacle_ids, blocked
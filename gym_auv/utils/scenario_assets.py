@@ -0,0 +1,150 @@
+"""
+This module implements a process-wide cache of the resources loaded by the
+real-world scenarios, i.e. the terrain height map, the obstacle perimeters and
+the static obstacles built from them, so that they are loaded once per process
+instead of on every reset.
+
+The scaled terrain is stored once next to the terrain file and memory-mapped
+read-only, so that all processes on a node, e.g. SubprocVecEnv workers, share
+the same physical pages of the file instead of each holding a private copy.
+"""
+import os
+import json
+import hashlib
+
+import numpy as np
+import shapely.wkb
+
+from gym_auv.objects.obstacles import PolygonObstacle
+from gym_auv.utils.cache_files import atomic_write
+
+_LOADED_ASSETS = {}
+
+def load_terrain(path:str, scale:float) -> np.ndarray:
+    """
+    Returns the terrain height map stored in path, divided by scale, as a read-only
+    memory-mapped array. The scaled terrain is cached as '<path>_scaled_<scale>.npy',
+    and rebuilt if the terrain file has changed since.
+
+    Parameters
+    ----------
+    path : str
+        Path of the terrain file, e.g. 'resources/terrain.npy'.
+    scale : float
+        Factor the terrain heights are divided by.
+
+    Returns
+    -------
+    terrain : np.ndarray
+    """
+    key = ('terrain', os.path.realpath(path), float(scale))
+    if key in _LOADED_ASSETS:
+        return _LOADED_ASSETS[key]
+
+    cache_path = '{}_scaled_{}'.format(os.path.splitext(path)[0], scale)
+    source_stat = os.stat(path)
+    # The terrain file is too large to be hashed on every start, so its size and
+    # modification time identify it instead
+    source_id = {'size': source_stat.st_size, 'mtime_ns': source_stat.st_mtime_ns, 'scale': scale}
+
+    metadata = None
+    if os.path.isfile(cache_path + '.json') and os.path.isfile(cache_path + '.npy'):
+        with open(cache_path + '.json') as f:
+            metadata = json.load(f)
+
+    if metadata != source_id:
+        # The terrain is written before its metadata, and both are replaced atomically,
+        # as other processes may be loading or have memory-mapped the previous files
+        with atomic_write(cache_path + '.npy') as f:
+            np.save(f, np.load(path)/scale)
+        with atomic_write(cache_path + '.json', 'w') as f:
+            json.dump(source_id, f)
+
+    terrain = np.load(cache_path + '.npy', mmap_mode='r')
+    _LOADED_ASSETS[key] = terrain
+    return terrain
+
+def load_obstacle_perimeters(path:str) -> np.ndarray:
+    """
+    Returns the obstacle perimeters stored in path, i.e. an object array holding
+    the list of points of each obstacle. The array is loaded once per process and
+    must not be modified.
+
+    Parameters
+    ----------
+    path : str
+        Path of the obstacle file, e.g. 'resources/obstacles_sorbuoya.npy'.
+
+    Returns
+    -------
+    obstacle_perimeters : np.ndarray
+    """
+    key = ('obstacles', os.path.realpath(path))
+    if key not in _LOADED_ASSETS:
+        # The perimeters have different lengths and are therefore stored as a pickled object array
+        obstacle_perimeters = np.load(path, allow_pickle=True)
+        obstacle_perimeters.flags.writeable = False
+        _LOADED_ASSETS[key] = obstacle_perimeters
+    return _LOADED_ASSETS[key]
+
+def load_polygon_obstacles(path:str) -> list:
+    """
+    Returns the static obstacles built from the obstacle perimeters stored in path,
+    skipping perimeters with less than four points. The obstacles are built once
+    per process and shared by all environments and episodes, which is possible
+    as static obstacles are never modified.
+
+    The validated and repaired obstacle boundaries are cached as WKB in
+    '<path>_polygons.npz', so that building the obstacles in new processes does
+    not repeat the repair, nor the validation and copy of the boundaries. The
+    cache is rebuilt if the obstacle file has changed.
+
+    Parameters
+    ----------
+    path : str
+        Path of the obstacle file, e.g. 'resources/obstacles_sorbuoya.npy'.
+
+    Returns
+    -------
+    obstacles : list
+        List of PolygonObstacle instances.
+    """
+    key = ('polygon_obstacles', os.path.realpath(path))
+    if key in _LOADED_ASSETS:
+        return _LOADED_ASSETS[key]
+
+    obstacle_perimeters = [
+        obstacle_perimeter for obstacle_perimeter in load_obstacle_perimeters(path) if len(obstacle_perimeter) > 3
+    ]
+    cache_path = '{}_polygons.npz'.format(os.path.splitext(path)[0])
+    with open(path, 'rb') as f:
+        source_hash = hashlib.sha1(f.read()).hexdigest()
+
+    boundaries = None
+    if os.path.isfile(cache_path):
+        with np.load(cache_path) as cache:
+            if str(cache['source_hash']) == source_hash:
+                wkb, offsets = cache['wkb'].tobytes(), cache['offsets']
+                boundaries = [shapely.wkb.loads(wkb[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+
+    if boundaries is None:
+        obstacles = [PolygonObstacle(obstacle_perimeter) for obstacle_perimeter in obstacle_perimeters]
+        for obstacle in obstacles:
+            assert obstacle.boundary.is_valid, 'The added obstacle is invalid!'
+        wkbs = [shapely.wkb.dumps(obstacle.boundary) for obstacle in obstacles]
+        with atomic_write(cache_path) as f:
+            np.savez(
+                f,
+                wkb=np.frombuffer(b''.join(wkbs), dtype=np.uint8),
+                offsets=np.cumsum([0] + [len(wkb) for wkb in wkbs]),
+                source_hash=np.array(source_hash)
+            )
+    else:
+        # The cached boundaries were validated when the cache was built
+        obstacles = [
+            PolygonObstacle(obstacle_perimeter, boundary=boundary)
+            for obstacle_perimeter, boundary in zip(obstacle_perimeters, boundaries)
+        ]
+
+    _LOADED_ASSETS[key] = obstacles
+    return obstacles
@@ -0,0 +1,149 @@
+"""
+This module implements a lightweight profiler of the stages of
+BaseEnvironment.step, e.g. the obstacle update, the vessel simulation and the
+perception. The duration of each stage is measured with a monotonic clock and
+aggregated into a running histogram, such that the profiles of many steps, and
+of several environments or training processes, are cheap to store and merge.
+"""
+import bisect
+from time import perf_counter
+
+import numpy as np
+
+STEP_STAGES = ('update', 'vessel', 'observe', 'reward', 'save')
+
+# Histogram bin edges [s], with four bins per decade from 1 us to 10 s. The
+# first and last bins hold the durations outside this range.
+HISTOGRAM_BIN_EDGES = np.logspace(-6, 1, 29)
+
+class StepProfiler():
+    """
+    Running histograms of the durations of the stages of a step.
+
+    A step is timed by calling start() before its first stage and lap(stage)
+    at the end of each stage, which records the time passed since the end of
+    the preceding stage.
+
+    Parameters
+    ----------
+    stages : tuple
+        Names of the stages.
+    """
+
+    def __init__(self, stages:tuple=STEP_STAGES) -> None:
+        self.stages = tuple(stages)
+        self._bin_edges = HISTOGRAM_BIN_EDGES.tolist()
+        self._last_time = perf_counter()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears the recorded durations."""
+        self._histograms = {stage: [0]*(len(self._bin_edges) + 1) for stage in self.stages}
+        self._totals = dict.fromkeys(self.stages, 0.0)
+        self._maxima = dict.fromkeys(self.stages, 0.0)
+
+    def start(self, elapsed:float=0.0) -> None:
+        """Starts timing the first stage of a step, counting elapsed seconds already
+        spent on it, e.g. a share of work batched over several environments."""
+        self._last_time = perf_counter() - elapsed
+
+    def lap(self, stage:str) -> None:
+        """Records the time passed since the end of the preceding stage as the
+        duration of the given stage."""
+        now = perf_counter()
+        self.record(stage, now - self._last_time)
+        self._last_time = now
+
+    def record(self, stage:str, duration:float) -> None:
+        """Records a duration [s] of the given stage."""
+        self._histograms[stage][bisect.bisect(self._bin_edges, duration)] += 1
+        self._totals[stage] += duration
+        if duration > self._maxima[stage]:
+            self._maxima[stage] = duration
+
+    def get_profile(self) -> dict:
+        """
+        Returns the recorded durations.
+
+        Returns
+        -------
+        profile : dict
+            Dictionary holding, for each stage, a dict with the number of
+            recorded steps ('count'), the total and maximum duration [s]
+            ('total', 'max') and the histogram of the durations ('histogram'),
+            whose bins are delimited by HISTOGRAM_BIN_EDGES.
+        """
+        profile = {}
+        for stage in self.stages:
+            histogram = np.array(self._histograms[stage], dtype=np.int64)
+            profile[stage] = {
+                'count': int(histogram.sum()),
+                'total': self._totals[stage],
+                'max': self._maxima[stage],
+                'histogram': histogram
+            }
+        return profile
+
+def merge_profiles(profiles:list) -> dict:
+    """
+    Merges the profiles of several environments, e.g. as returned by
+    env_method('get_profile') of a vectorised environment. Profiles that are
+    None, i.e. from environments without profiling, are skipped.
+
+    Parameters
+    ----------
+    profiles : list
+        List of profiles, as returned by StepProfiler.get_profile.
+
+    Returns
+    -------
+    profile : dict
+    """
+    merged = {}
+    for profile in profiles:
+        if profile is None:
+            continue
+        for stage, stats in profile.items():
+            if stage not in merged:
+                merged[stage] = {key: np.copy(value) if key == 'histogram' else value for key, value in stats.items()}
+                continue
+            merged[stage]['count'] += stats['count']
+            merged[stage]['total'] += stats['total']
+            merged[stage]['max'] = max(merged[stage]['max'], stats['max'])
+            merged[stage]['histogram'] += stats['histogram']
+    return merged
+
+def summarize_profile(profile:dict, percentiles:tuple=(50, 95)) -> dict:
+    """
+    Returns summary statistics of a profile. Percentiles are estimated as the
+    upper edge of the histogram bin they fall into, i.e. to within a factor
+    of 10**0.25 from above.
+
+    Parameters
+    ----------
+    profile : dict
+        Profile, as returned by StepProfiler.get_profile or merge_profiles.
+    percentiles : tuple
+        Percentiles of the durations to estimate.
+
+    Returns
+    -------
+    summary : dict
+        Dictionary holding, for each stage with recorded steps, a dict with
+        the mean and maximum duration ('mean', 'max'), the estimated
+        percentiles (e.g. 'p95') and the share of the total step time
+        ('share').
+    """
+    step_total = sum(stats['total'] for stats in profile.values())
+    upper_edges = np.append(HISTOGRAM_BIN_EDGES, np.inf)
+    summary = {}
+    for stage, stats in profile.items():
+        if stats['count'] == 0:
+            continue
+        cumulative = np.cumsum(stats['histogram'])
+        summary[stage] = {'mean': stats['total']/stats['count'], 'max': stats['max']}
+        for percentile in percentiles:
+            bin_idx = np.searchsorted(cumulative, percentile/100*stats['count'])
+            summary[stage]['p{}'.format(percentile)] = float(min(upper_edges[bin_idx], stats['max']))
+        summary[stage]['share'] = stats['total']/step_total if step_total > 0 else 0.0
+    return summary
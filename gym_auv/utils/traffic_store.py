@@ -0,0 +1,231 @@
+"""
+This module implements a preprocessed store of the vessel traffic recorded in
+AIS data files, used for generating the moving obstacles of the real-world
+scenarios. The AIS data is parsed and filtered once per data file, cached on
+disk next to it and memory-mapped when loaded.
+
+The cache can be built offline by running
+    python -m gym_auv.utils.traffic_store resources/vessel_data.csv
+"""
+import os
+import sys
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from gym_auv.objects.motion_models import PiecewiseLinear
+from gym_auv.utils.cache_files import atomic_write
+
+VESSEL_SPEED_RANGE_LOWER = 0.1
+VESSEL_SPEED_RANGE_UPPER = 2
+
+_LOADED_STORES = {}
+
+class TrafficStore():
+    """
+    Trajectory segments of the vessels recorded in an AIS data file. A segment is
+    a sequence of consecutive AIS messages of one vessel, without gaps longer than
+    0.1 days or implausible speeds, and is stored as rows [t, east, north] of a
+    shared points array, where t is the number of seconds since the start of the
+    segment.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        Array of shape (N, 3) holding the points of all segments.
+    segment_offsets : np.ndarray
+        Array of shape (S + 1,), where the points of segment i are
+        points[segment_offsets[i]:segment_offsets[i + 1]].
+    segment_lengths : np.ndarray
+        Array of shape (S,) holding the reported length [dm] of the vessel
+        of each segment.
+    vessel_names : list
+        Names of the vessels, sorted.
+    vessel_offsets : np.ndarray
+        Array of shape (V + 1,), where the segments of vessel j are the
+        segments vessel_offsets[j] to vessel_offsets[j + 1] - 1.
+    """
+
+    def __init__(self, points:np.ndarray, segment_offsets:np.ndarray, segment_lengths:np.ndarray,
+                 vessel_names:list, vessel_offsets:np.ndarray) -> None:
+        self.points = points
+        self.segment_offsets = np.asarray(segment_offsets)
+        self.segment_lengths = np.asarray(segment_lengths, dtype=np.float64)
+        self.vessel_names = list(vessel_names)
+        self.vessel_offsets = np.asarray(vessel_offsets)
+
+    @classmethod
+    def from_csv(cls, path:str) -> 'TrafficStore':
+        """
+        Parses the given AIS data file, keeping the messages of vessels longer than
+        12 m and splitting the trajectory of each vessel into segments at gaps longer
+        than 0.1 days. Segments are discarded if they are interrupted by a speed
+        outside [VESSEL_SPEED_RANGE_LOWER, VESSEL_SPEED_RANGE_UPPER], if they hold
+        less than two messages, or if they are not terminated by a gap reporting a
+        valid vessel length.
+
+        Parameters
+        ----------
+        path : str
+            Path of the AIS data file, e.g. 'resources/vessel_data.csv'.
+
+        Returns
+        -------
+        traffic_store : TrafficStore
+        """
+        df = pd.read_csv(path)
+        vessels = dict(tuple(df.groupby('Vessel_Name')))
+        vessel_names = sorted(list(vessels.keys()))
+
+        points = []
+        segment_offsets = [0]
+        segment_lengths = []
+        vessel_offsets = [0]
+        for vessel_name in vessel_names:
+            vessel = vessels[vessel_name].copy()
+            vessel['AIS_Timestamp'] = pd.to_datetime(vessel['AIS_Timestamp'])
+            vessel['AIS_Timestamp'] -= vessel.iloc[0]['AIS_Timestamp']
+            start_timestamp = None
+
+            last_timestamp = pd.to_timedelta(0, unit='D')
+            last_east = None
+            last_north = None
+            cutoff_dt = pd.to_timedelta(0.1, unit='D')
+            path = []
+            for _, row in vessel.iterrows():
+                east = row['AIS_East']/10.0
+                north = row['AIS_North']/10.0
+                if row['AIS_Length_Overall'] < 12:
+                    continue
+                if len(path) == 0:
+                    start_timestamp = row['AIS_Timestamp']
+                timedelta = row['AIS_Timestamp'] - last_timestamp
+                if timedelta < cutoff_dt:
+                    if last_east is not None:
+                        dx = east - last_east
+                        dy = north - last_north
+                        distance = np.sqrt(dx**2 + dy**2)
+                        seconds = timedelta.seconds
+                        with np.errstate(divide='ignore', invalid='ignore'):
+                            speed = distance/seconds
+                        if speed < VESSEL_SPEED_RANGE_LOWER or speed > VESSEL_SPEED_RANGE_UPPER:
+                            path = []
+                            continue
+
+                    path.append((int((row['AIS_Timestamp']-start_timestamp).total_seconds()), east, north))
+                else:
+                    if len(path) > 1 and not np.isnan(row['AIS_Length_Overall']) and row['AIS_Length_Overall'] > 0:
+                        points.extend(path)
+                        segment_offsets.append(len(points))
+                        segment_lengths.append(row['AIS_Length_Overall'])
+                    path = []
+                last_timestamp = row['AIS_Timestamp']
+                last_east = east
+                last_north = north
+            vessel_offsets.append(len(segment_lengths))
+
+        return cls(
+            np.array(points, dtype=np.float64).reshape(-1, 3), np.array(segment_offsets, dtype=np.int64),
+            np.array(segment_lengths, dtype=np.float64), vessel_names, np.array(vessel_offsets, dtype=np.int64)
+        )
+
+    @classmethod
+    def load_or_build(cls, source_path:str) -> 'TrafficStore':
+        """
+        Returns the traffic store of the given AIS data file. The store is cached in
+        the same directory as source_path, and rebuilt if the cache is missing or
+        the source file has changed since. Loaded stores are memory-mapped and
+        shared within the process.
+
+        Parameters
+        ----------
+        source_path : str
+            Path of the AIS data file, e.g. 'resources/vessel_data.csv'.
+
+        Returns
+        -------
+        traffic_store : TrafficStore
+        """
+        key = os.path.realpath(source_path)
+        if key in _LOADED_STORES:
+            return _LOADED_STORES[key]
+
+        cache_path = '{}_traffic'.format(os.path.splitext(source_path)[0])
+        with open(source_path, 'rb') as f:
+            source_hash = hashlib.sha1(f.read()).hexdigest()
+
+        metadata = None
+        if all(os.path.isfile(cache_path + suffix) for suffix in ['.json', '_points.npy', '_segments.npy']):
+            with open(cache_path + '.json') as f:
+                metadata = json.load(f)
+            if metadata['source_hash'] != source_hash:
+                metadata = None
+
+        if metadata is None:
+            traffic_store = cls.from_csv(source_path)
+            # The arrays are written before the metadata, and all files are replaced
+            # atomically, as other processes may be loading or have memory-mapped them
+            with atomic_write(cache_path + '_points.npy') as f:
+                np.save(f, traffic_store.points)
+            with atomic_write(cache_path + '_segments.npy') as f:
+                np.save(f, traffic_store.segment_offsets)
+            metadata = {
+                'source_hash': source_hash,
+                'segment_lengths': traffic_store.segment_lengths.tolist(),
+                'vessel_names': traffic_store.vessel_names,
+                'vessel_offsets': traffic_store.vessel_offsets.tolist()
+            }
+            with atomic_write(cache_path + '.json', 'w') as f:
+                json.dump(metadata, f)
+
+        traffic_store = cls(
+            np.load(cache_path + '_points.npy', mmap_mode='r'), np.load(cache_path + '_segments.npy'),
+            metadata['segment_lengths'], metadata['vessel_names'], metadata['vessel_offsets']
+        )
+        _LOADED_STORES[key] = traffic_store
+        return traffic_store
+
+    def sample_trajectories(self, rng, n_vessels:int, x0:float, y0:float) -> list:
+        """
+        Samples vessel trajectories for a scenario. Vessels are drawn at random
+        without replacement until at least n_vessels trajectories are sampled, and
+        each segment of a drawn vessel gives one trajectory, starting at a random
+        message of the segment.
+
+        Parameters
+        ----------
+        rng : np.random.RandomState
+            Random number generator of the environment.
+        n_vessels : int
+            Number of trajectories to sample.
+        x0, y0 : float
+            Coordinates of the scenario origin.
+
+        Returns
+        -------
+        vessel_trajectories : list
+            List of tuples (vessel length [m], motion model, vessel name), where the
+            motion model is a PiecewiseLinear instance.
+        """
+        vessel_trajectories = []
+        vessel_indeces = list(range(len(self.vessel_names)))
+        while len(vessel_trajectories) < n_vessels:
+            if len(vessel_indeces) == 0:
+                break
+            vessel_idx = vessel_indeces.pop(rng.randint(0, len(vessel_indeces)))
+            for segment_idx in range(self.vessel_offsets[vessel_idx], self.vessel_offsets[vessel_idx + 1]):
+                start, end = self.segment_offsets[segment_idx], self.segment_offsets[segment_idx + 1]
+                start_index = rng.randint(0, end - start - 1)
+                points = np.array(self.points[start + start_index:end])
+                motion = PiecewiseLinear(points[:, 0].astype(int), points[:, 1:] - np.array([x0, y0]))
+                vessel_trajectories.append((self.segment_lengths[segment_idx]/10.0, motion, self.vessel_names[vessel_idx]))
+        return vessel_trajectories
+
+if __name__ == '__main__':
+    for source_path in sys.argv[1:]:
+        traffic_store = TrafficStore.load_or_build(source_path)
+        print('{}: {} vessels, {} trajectory segments'.format(
+            source_path, len(traffic_store.vessel_names), len(traffic_store.segment_lengths)
+        ))
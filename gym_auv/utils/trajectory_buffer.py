@@ -0,0 +1,70 @@
+"""
+This module implements a preallocated storage for the trajectory of a simulated
+object, i.e. the rows (e.g. states or inputs) appended at every timestep.
+"""
+import numpy as np
+
+class TrajectoryBuffer():
+    """
+    Preallocated array of rows appended one at a time. By default, the whole
+    trajectory is kept and the storage grows geometrically, making appending
+    amortised O(1). In ring-buffer mode, only the max_length most recent rows
+    are kept in a fixed-size storage.
+
+    In both modes, the stored rows are returned as a contiguous view in
+    chronological order, without copying. In ring-buffer mode, every row is
+    written twice, max_length rows apart, so that the most recent rows always
+    form a contiguous slice of the storage.
+
+    Parameters
+    ----------
+    row_size : int
+        Number of values in each row.
+    max_length : int
+        Number of most recent rows to keep. If None, all rows are kept.
+    initial_capacity : int
+        Number of rows initially allocated when all rows are kept.
+    dtype : type
+        Data type of the stored values.
+    """
+
+    def __init__(self, row_size:int, max_length:int=None, initial_capacity:int=1024, dtype=np.float64) -> None:
+        self._max_length = max_length
+        self._n_appended = 0
+        if max_length is None:
+            self._data = np.empty((initial_capacity, row_size), dtype=dtype)
+        else:
+            self._data = np.empty((2*max_length, row_size), dtype=dtype)
+
+    def __len__(self) -> int:
+        if self._max_length is None:
+            return self._n_appended
+        return min(self._n_appended, self._max_length)
+
+    @property
+    def n_appended(self) -> int:
+        """Total number of rows appended, including those no longer kept."""
+        return self._n_appended
+
+    @property
+    def data(self) -> np.ndarray:
+        """Returns a view of shape (len(self), row_size) holding the stored rows,
+        oldest first. The view is only valid until the next append."""
+        if self._max_length is None:
+            return self._data[:self._n_appended]
+        end = self._n_appended % self._max_length + self._max_length
+        return self._data[end - len(self):end]
+
+    def append(self, row:np.ndarray) -> None:
+        """Appends the given row."""
+        if self._max_length is None:
+            if self._n_appended == len(self._data):
+                data = np.empty((2*len(self._data), self._data.shape[1]), dtype=self._data.dtype)
+                data[:self._n_appended] = self._data
+                self._data = data
+            self._data[self._n_appended] = row
+        else:
+            idx = self._n_appended % self._max_length
+            self._data[idx] = row
+            self._data[idx + self._max_length] = row
+        self._n_appended += 1
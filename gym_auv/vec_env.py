@@ -0,0 +1,500 @@
+"""
+Vectorised environments that simulate many gym_auv episodes in a single process.
+
+AUVVecEnv holds a number of BaseEnvironment instances and advances the dynamics
+of all their vessels with one call to the batched model in gym_auv.utils.dynamics,
+and pools the sensor arrays of all their vessels into sectors at once, while each
+slot is automatically reset when its episode ends. ShardedVecEnv runs several
+AUVVecEnv instances in subprocesses, e.g. 8 processes with 32 environments
+each, and exposes them as a single VecEnv.
+
+The environments write their observations directly into the observation buffers
+of AUVVecEnv, and ShardedVecEnv places these buffers in shared memory, such that
+the observations are not pickled when sent from the subprocesses.
+"""
+import multiprocessing
+from collections import OrderedDict
+from copy import deepcopy
+from time import perf_counter
+
+import gym
+import numpy as np
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    # Python < 3.8, where the observations are sent through the pipes instead
+    shared_memory = None
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv, CloudpickleWrapper
+from stable_baselines3.common.vec_env.util import dict_to_obs, obs_space_info
+
+import gym_auv.utils.dynamics as dynamics
+import gym_auv.utils.integrators as integrators
+from gym_auv.objects.vessel import _sector_feasibility_pooling, _sensor_closeness
+
+
+def make_env_fn(env_id, env_config, seed=0, render_mode=None, pilot=None):
+    """Returns a function creating the given gym_auv scenario, seeded with seed.
+    The pilot, if given, is passed on to the environment as in run.create_env."""
+    def _init():
+        kwargs = {} if pilot is None else {'pilot': pilot}
+        env = gym.make(env_id, env_config=env_config, render_mode=render_mode, **kwargs)
+        env.seed(seed)
+        return env
+    return _init
+
+
+def make_auv_vec_env(env_id, env_config, n_envs, n_processes=1, seed=0, start_method=None, use_shared_memory=True, pilot=None):
+    """
+    Creates a vectorised gym_auv environment.
+
+    Parameters
+    ----------
+    env_id : str
+        The gym id of the scenario, e.g. 'gym_auv:MovingObstaclesNoRules-v0'.
+    env_config : dict
+        Configuration parameters for the environments.
+    n_envs : int
+        Total number of environments.
+    n_processes : int
+        Number of processes the environments are distributed over. If 1, all
+        environments are simulated in the current process.
+    seed : int
+        The environment with index i is seeded with seed + i.
+    start_method : str
+        Multiprocessing start method used when n_processes > 1.
+    use_shared_memory : bool
+        Whether the observations are transferred from the processes through shared
+        memory, if available, when n_processes > 1.
+    pilot : str
+        Pilot passed on to each environment, see make_env_fn.
+
+    Returns
+    -------
+    vec_env : VecEnv
+    """
+    env_fns = [make_env_fn(env_id, env_config, seed=seed + i, pilot=pilot) for i in range(n_envs)]
+    if n_processes <= 1:
+        return AUVVecEnv(env_fns)
+    shards = np.array_split(np.arange(n_envs), n_processes)
+    return ShardedVecEnv(
+        [_make_shard_fn([env_fns[i] for i in shard]) for shard in shards],
+        start_method=start_method,
+        use_shared_memory=use_shared_memory
+    )
+
+
+def _make_shard_fn(env_fns):
+    def _init():
+        return AUVVecEnv(env_fns)
+    return _init
+
+
+class AUVVecEnv(VecEnv):
+    """
+    Vectorised environment simulating several gym_auv episodes in the current process.
+
+    The vessel states of all environments are stored in a shared (num_envs, 6) array
+    and advanced together using the batched dynamics model. The sensors are
+    simulated by each environment, as the rays are cast against the obstacles of
+    its own scenario, while the feasibility pooling into sectors and the sensor
+    closenesses are evaluated for all vessels at once. Everything else, e.g.
+    obstacle updates, navigation along the environment's own path and rewards, is
+    handled by the individual environments, which write their observations
+    directly into the observation buffers, see
+    BaseEnvironment.set_observation_buffers. Note that gym wrappers around the
+    environments are bypassed when stepping.
+
+    Parameters
+    ----------
+    env_fns : list
+        Functions that create the gym_auv environments to vectorise. All
+        environments must share the same time step and integrator.
+    """
+
+    def __init__(self, env_fns):
+        self.envs = [fn().unwrapped for fn in env_fns]
+        env = self.envs[0]
+        VecEnv.__init__(self, len(env_fns), env.observation_space, env.action_space)
+
+        self.config = env.config
+        self._integrator = integrators.get_integrator(self.config["integrator"])
+        self.keys, shapes, dtypes = obs_space_info(self.observation_space)
+        self.buf_obs = OrderedDict([
+            (k, np.zeros((self.num_envs,) + tuple(shapes[k]), dtype=dtypes[k])) for k in self.keys
+        ])
+        self.buf_dones = np.zeros((self.num_envs,), dtype=bool)
+        self.buf_rews = np.zeros((self.num_envs,), dtype=np.float32)
+        self.buf_infos = [{} for _ in range(self.num_envs)]
+        self.actions = None
+        self.metadata = env.metadata
+
+        self.vessel_states = np.zeros((self.num_envs, 6))
+        self._closeness_scratch = None
+        for env_idx in range(self.num_envs):
+            self._attach_vessel(env_idx)
+            self._attach_obs_buffers(env_idx)
+
+    def _attach_vessel(self, env_idx):
+        """Copies the state of a (new) vessel into the shared state array."""
+        self.vessel_states[env_idx] = self.envs[env_idx].vessel._state
+
+    def _attach_obs_buffers(self, env_idx):
+        """Makes an environment write its observations into its slot of the observation buffers."""
+        self.envs[env_idx].set_observation_buffers(**{key: self.buf_obs[key][env_idx] for key in self.keys})
+
+    def set_obs_buffers(self, buf_obs):
+        """
+        Replaces the observation buffers, e.g. by arrays in shared memory. The
+        observations are written into the new buffers from the next step or reset.
+
+        Parameters
+        ----------
+        buf_obs : OrderedDict
+            Arrays of shape (num_envs,) + shape of the observation space, for each
+            key of the observation space.
+        """
+        self.buf_obs = buf_obs
+        for env_idx in range(self.num_envs):
+            self._attach_obs_buffers(env_idx)
+
+    def step_async(self, actions):
+        self.actions = actions
+
+    def step_wait(self):
+        actions = np.array([env._pre_step(np.asarray(action)) for env, action in zip(self.envs, self.actions)])
+        start = perf_counter()
+        thrusts = dynamics.action_to_thrust(actions, self.config)
+        self.vessel_states = dynamics.step(self.vessel_states, thrusts, self.config, self._integrator)
+        vessel_duration = perf_counter() - start
+
+        for env_idx, env in enumerate(self.envs):
+            env.vessel.set_state(self.vessel_states[env_idx], thrusts[env_idx])
+            if env.profiler is not None:
+                # The environments share the batched vessel simulation equally
+                env.profiler.record('vessel', vessel_duration/self.num_envs)
+        perception_durations = self._perceive()
+
+        for env_idx, env in enumerate(self.envs):
+            perception_states = None if perception_durations is None else self.buf_obs['perception'][env_idx]
+            if env.profiler is not None:
+                env.profiler.start(0.0 if perception_durations is None else perception_durations[env_idx])
+            obs, self.buf_rews[env_idx], self.buf_dones[env_idx], self.buf_infos[env_idx] = env._post_step(perception_states)
+            if self.buf_dones[env_idx]:
+                # Saving final observation where user can get it, then resetting
+                self.buf_infos[env_idx]["terminal_observation"] = obs
+                env.reset()
+                self._attach_vessel(env_idx)
+
+        return (self._obs_from_buf(), np.copy(self.buf_rews), np.copy(self.buf_dones), deepcopy(self.buf_infos))
+
+    def _perceive(self):
+        """
+        Simulates the sensors of all environments, and pools the sensor arrays of all
+        vessels sharing a sensor layout into sectors at once. The sensor closenesses
+        are written into the perception observation buffer.
+
+        Returns
+        -------
+        perception_durations : np.ndarray
+            Array of shape (num_envs,) holding the time spent on the perception of
+            each environment, including an equal share of the pooling [s], or None
+            if the environments do not use sensing.
+        """
+        if not self.config["sensing"]:
+            return None
+        perception_durations = np.zeros(self.num_envs)
+        pooling_needed = np.zeros(self.num_envs, dtype=bool)
+        for env_idx, env in enumerate(self.envs):
+            start = perf_counter()
+            pooling_needed[env_idx] = env.simulate_sensors()
+            perception_durations[env_idx] = perf_counter() - start
+
+        start = perf_counter()
+        vessels = [env.vessel for env in self.envs]
+        sensor_range = self.config["sensor_range"]
+        log_transform = self.config["sensor_log_transform"]
+        distances = np.stack([vessel._last_sensor_dist_measurements for vessel in vessels])
+        sector_feasible_distances = np.full((self.num_envs, self.config["n_sectors"]), float(sensor_range))
+        sector_closenesses = np.zeros((self.num_envs, self.config["n_sectors"]))
+
+        # Vessels of different widths or sensor layouts are pooled separately
+        layouts = {}
+        for env_idx in np.flatnonzero(pooling_needed):
+            vessel = vessels[env_idx]
+            layout = (vessel._feasibility_width, vessel._d_sensor_angle, tuple(vessel._sector_start_indeces))
+            layouts.setdefault(layout, []).append(env_idx)
+        for (width, theta, sector_start_indeces), env_indeces in layouts.items():
+            sector_feasible_distances[env_indeces] = _sector_feasibility_pooling(
+                distances[env_indeces], sector_start_indeces, width, theta
+            )
+        sector_closenesses[pooling_needed] = _sensor_closeness(
+            sector_feasible_distances[pooling_needed], sensor_range, log_transform
+        )
+        for env_idx, vessel in enumerate(vessels):
+            vessel.set_sector_perception(sector_feasible_distances[env_idx], sector_closenesses[env_idx])
+
+        perception_buffer = self.buf_obs['perception']
+        if self._closeness_scratch is None or self._closeness_scratch.shape != perception_buffer.shape:
+            self._closeness_scratch = np.empty(perception_buffer.shape)
+        _sensor_closeness(
+            distances.reshape(perception_buffer.shape), sensor_range, log_transform,
+            out=perception_buffer, scratch=self._closeness_scratch
+        )
+        perception_durations += (perf_counter() - start)/self.num_envs
+        return perception_durations
+
+    def reset(self):
+        for env_idx, env in enumerate(self.envs):
+            env.reset()
+            self._attach_vessel(env_idx)
+        return self._obs_from_buf()
+
+    def seed(self, seed=None):
+        if seed is None:
+            return [env.seed() for env in self.envs]
+        return [env.seed(seed + idx) for idx, env in enumerate(self.envs)]
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+    def get_images(self):
+        return [env.render(mode='rgb_array') for env in self.envs]
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(env, attr_name) for env in self._get_target_envs(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        for env in self._get_target_envs(indices):
+            setattr(env, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(env, method_name)(*method_args, **method_kwargs) for env in self._get_target_envs(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_target_envs(indices)]
+
+    def _obs_from_buf(self):
+        return dict_to_obs(self.observation_space, deepcopy(self.buf_obs))
+
+    def _get_target_envs(self, indices):
+        return [self.envs[i] for i in self._get_indices(indices)]
+
+
+def _attach_shared_obs(specs, start, end):
+    """Returns the slices [start:end] of the shared observation buffers described
+    by specs, along with the shared memory blocks holding them."""
+    blocks = []
+    buf_obs = OrderedDict()
+    for key, name, shape, dtype in specs:
+        # The subprocesses share the resource tracker of the main process, which keeps
+        # the block registered until the main process unlinks it in close(), or unlinks
+        # it itself if the main process exits without closing
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        buf_obs[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)[start:end]
+    return buf_obs, blocks
+
+
+def _shard_worker(remote, parent_remote, shard_fn_wrapper):
+    parent_remote.close()
+    vec_env = shard_fn_wrapper.var()
+    shared_blocks = None
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == 'step':
+                vec_env.step_async(data)
+                obs, rews, dones, infos = vec_env.step_wait()
+                remote.send((None if shared_blocks else obs, rews, dones, infos))
+            elif cmd == 'reset':
+                obs = vec_env.reset()
+                remote.send(None if shared_blocks else obs)
+            elif cmd == 'attach_shared_obs':
+                buf_obs, shared_blocks = _attach_shared_obs(*data)
+                vec_env.set_obs_buffers(buf_obs)
+                remote.send(None)
+            elif cmd == 'seed':
+                remote.send(vec_env.seed(data))
+            elif cmd == 'get_images':
+                remote.send(vec_env.get_images())
+            elif cmd == 'get_attr':
+                remote.send(vec_env.get_attr(data[0], indices=data[1]))
+            elif cmd == 'set_attr':
+                remote.send(vec_env.set_attr(data[0], data[1], indices=data[2]))
+            elif cmd == 'env_method':
+                method_name, method_args, method_kwargs, indices = data
+                remote.send(vec_env.env_method(method_name, *method_args, indices=indices, **method_kwargs))
+            elif cmd == 'get_spaces':
+                remote.send((vec_env.num_envs, vec_env.observation_space, vec_env.action_space))
+            elif cmd == 'close':
+                # The shared memory blocks stay mapped until the process exits, as the
+                # environments still reference their buffers
+                vec_env.close()
+                remote.close()
+                break
+            else:
+                raise NotImplementedError('`{}` is not implemented in the shard worker'.format(cmd))
+        except EOFError:
+            break
+
+
+class ShardedVecEnv(VecEnv):
+    """
+    Runs several in-process vectorised environments (shards), such as AUVVecEnv,
+    in separate subprocesses and exposes them as one VecEnv.
+
+    If use_shared_memory is set, the observation buffers of the shards are slices
+    of arrays in shared memory, which the shards write their observations into,
+    such that only the rewards, dones and infos are sent through the pipes.
+
+    Parameters
+    ----------
+    shard_fns : list
+        Functions that create the VecEnv of each shard. The shared memory transport
+        requires them to implement set_obs_buffers, as AUVVecEnv.
+    start_method : str
+        Multiprocessing start method, defaults to 'forkserver' if available and
+        'spawn' otherwise.
+    use_shared_memory : bool
+        Whether to transfer the observations through shared memory. Ignored if
+        multiprocessing.shared_memory is unavailable, i.e. before Python 3.8.
+    """
+
+    def __init__(self, shard_fns, start_method=None, use_shared_memory=True):
+        self.waiting = False
+        self.closed = False
+
+        if start_method is None:
+            forkserver_available = 'forkserver' in multiprocessing.get_all_start_methods()
+            start_method = 'forkserver' if forkserver_available else 'spawn'
+        ctx = multiprocessing.get_context(start_method)
+        use_shared_memory = use_shared_memory and shared_memory is not None
+        if use_shared_memory:
+            # The subprocesses must share the resource tracker of this process, which
+            # would otherwise be started with the first shared memory block, after
+            # forked subprocesses have started trackers of their own
+            resource_tracker.ensure_running()
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(len(shard_fns))])
+        self.processes = []
+        for work_remote, remote, shard_fn in zip(self.work_remotes, self.remotes, shard_fns):
+            args = (work_remote, remote, CloudpickleWrapper(shard_fn))
+            process = ctx.Process(target=_shard_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        shard_sizes = []
+        for remote in self.remotes:
+            remote.send(('get_spaces', None))
+            shard_size, observation_space, action_space = remote.recv()
+            shard_sizes.append(shard_size)
+        self.shard_offsets = np.concatenate([[0], np.cumsum(shard_sizes)])
+        VecEnv.__init__(self, int(self.shard_offsets[-1]), observation_space, action_space)
+
+        self.shared_obs = None
+        self._shared_blocks = []
+        if use_shared_memory:
+            self._setup_shared_obs()
+
+    def _setup_shared_obs(self):
+        """Allocates the observation buffers of all environments in shared memory and
+        attaches each shard to its slice of them."""
+        keys, shapes, dtypes = obs_space_info(self.observation_space)
+        self.shared_obs = OrderedDict()
+        specs = []
+        for key in keys:
+            shape = (self.num_envs,) + tuple(shapes[key])
+            dtype = np.dtype(dtypes[key])
+            block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape))*dtype.itemsize))
+            self._shared_blocks.append(block)
+            self.shared_obs[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            specs.append((key, block.name, shape, dtype.str))
+        for shard_idx, remote in enumerate(self.remotes):
+            remote.send(('attach_shared_obs', (specs, int(self.shard_offsets[shard_idx]), int(self.shard_offsets[shard_idx + 1]))))
+        for remote in self.remotes:
+            remote.recv()
+
+    def step_async(self, actions):
+        for shard_idx, remote in enumerate(self.remotes):
+            remote.send(('step', actions[self.shard_offsets[shard_idx]:self.shard_offsets[shard_idx + 1]]))
+        self.waiting = True
+
+    def step_wait(self):
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        obs, rews, dones, infos = zip(*results)
+        return self._gather_obs(obs), np.concatenate(rews), np.concatenate(dones), sum(infos, [])
+
+    def reset(self):
+        for remote in self.remotes:
+            remote.send(('reset', None))
+        return self._gather_obs([remote.recv() for remote in self.remotes])
+
+    def seed(self, seed=None):
+        for shard_idx, remote in enumerate(self.remotes):
+            remote.send(('seed', None if seed is None else seed + int(self.shard_offsets[shard_idx])))
+        return sum([remote.recv() for remote in self.remotes], [])
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for process in self.processes:
+            process.join()
+        self.shared_obs = None
+        for block in self._shared_blocks:
+            block.close()
+            block.unlink()
+        self._shared_blocks = []
+        self.closed = True
+
+    def get_images(self):
+        for remote in self.remotes:
+            remote.send(('get_images', None))
+        return sum([remote.recv() for remote in self.remotes], [])
+
+    def get_attr(self, attr_name, indices=None):
+        return self._call_shards('get_attr', lambda local_indices: (attr_name, local_indices), indices)
+
+    def set_attr(self, attr_name, value, indices=None):
+        self._call_shards('set_attr', lambda local_indices: (attr_name, value, local_indices), indices)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self._call_shards(
+            'env_method', lambda local_indices: (method_name, method_args, method_kwargs, local_indices), indices
+        )
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+    def _call_shards(self, cmd, make_data, indices):
+        """Sends cmd to the shards holding the given environments, and returns the
+        concatenated results ordered by shard."""
+        indices = np.array(list(self._get_indices(indices)), dtype=int)
+        targets = []
+        for shard_idx, remote in enumerate(self.remotes):
+            start, end = self.shard_offsets[shard_idx], self.shard_offsets[shard_idx + 1]
+            local_indices = [int(i - start) for i in indices if start <= i < end]
+            if local_indices:
+                remote.send((cmd, make_data(local_indices)))
+                targets.append(remote)
+        results = [remote.recv() for remote in targets]
+        return [] if cmd == 'set_attr' else sum(results, [])
+
+    def _gather_obs(self, obs_list):
+        """Returns the observations of all environments, copied from the shared buffers
+        if used, and concatenated from those sent by the shards otherwise."""
+        if self.shared_obs is None:
+            return self._concatenate_obs(obs_list)
+        return dict_to_obs(self.observation_space, deepcopy(self.shared_obs))
+
+    def _concatenate_obs(self, obs_list):
+        if isinstance(obs_list[0], dict):
+            return OrderedDict([(key, np.concatenate([obs[key] for obs in obs_list])) for key in obs_list[0].keys()])
+        return np.concatenate(obs_list)
@@ -12,6 +12,8 @@ import torch
 import gym
 import gym_auv
 import gym_auv.reporting
+from gym_auv.vec_env import make_auv_vec_env
+from gym_auv.utils.step_profiler import merge_profiles, summarize_profile
 import multiprocessing
 
 from stable_baselines3.common.utils import set_random_seed
@@ -252,9 +254,13 @@ def main(args):
     env_name = env_id.split(':')[-1] if ':' in env_id else env_id
     envconfig = gym_auv.SCENARIOS[env_name]['config'] if env_name in gym_auv.SCENARIOS else {}  
     envconfig.update(custom_envconfig)
+    if args.mode == 'train' and args.lean_training:
+        envconfig['lean_training'] = True
+    if args.mode == 'train' and args.profile_step:
+        envconfig['profile_step'] = True
 
     #NUM_CPU = multiprocessing.cpu_count()
-    NUM_CPU = 8
+    NUM_CPU = args.num_cpu
     #torch.set_num_threads(multiprocessing.cpu_count()//4)
     #print("Pytorch using {} threads".format(torch.get_num_threads()))
 
@@ -349,9 +355,18 @@ def main(args):
             vec_env = DummyVecEnv([lambda: create_env(env_id, envconfig, pilot=args.pilot)])
         else:
             num_cpu = NUM_CPU
-            vec_env = SubprocVecEnv([make_mp_env(env_id, i, envconfig, pilot=args.pilot) for i in range(num_cpu)])
+            if args.envs_per_cpu > 1:
+                # Seeded as make_mp_env, i.e. environment i is seeded with 0 + i
+                set_random_seed(0)
+                vec_env = make_auv_vec_env(env_id, envconfig, num_cpu*args.envs_per_cpu, n_processes=num_cpu, seed=0, pilot=args.pilot)
+            else:
+                vec_env = SubprocVecEnv([make_mp_env(env_id, i, envconfig, pilot=args.pilot) for i in range(num_cpu)])
             #vec_env = VecFrameStack(_vec_env, n_stack=1, channels_order='first')
 
+        if args.log_episodes:
+            for env_idx in range(vec_env.num_envs):
+                vec_env.env_method('attach_episode_writer', figure_folder, worker_index=env_idx, indices=[env_idx])
+
         if (args.agent is not None):
             agent = model.load(args.agent)
             agent.set_env(vec_env)
@@ -627,6 +642,7 @@ def main(args):
         save_stats_freq = total_timesteps // 100  # Save stats 1000 times during training (EveryNTimesteps)
         save_agent_freq = total_timesteps // 100   # Save the agent 100 times throughout training
         record_agent_freq = total_timesteps // 10  # Evaluate and record 10 times during training (EvalCallback)
+        log_profile_freq = 1000 if args.profile_step else None  # Log the step profile every 1000 vectorised steps
         # StopTrainingOnRewardThreshold could be used when setting total_timesteps = "inf" and stop the training when the agent is perfect. To see how long it actually takes.
         # CallbackList : [list, of, sequential, callbacks]
 
@@ -647,10 +663,11 @@ def main(args):
                 return len(list(self.ls))
 
         class CollectStatisticsCallback(BaseCallback):
-            def __init__(self, env : SubprocVecEnv, total_timesteps: int, save_stats_freq: int, record_agent_freq: int, log_dir: str, verbose=1):
+            def __init__(self, env : SubprocVecEnv, total_timesteps: int, save_stats_freq: int, record_agent_freq: int, log_dir: str, log_profile_freq: int=None, verbose=1):
                 super(CollectStatisticsCallback, self).__init__(verbose)
                 self.save_stats_freq = save_stats_freq
                 self.record_agent_freq = record_agent_freq
+                self.log_profile_freq = log_profile_freq
                 self.save_agent_freq = total_timesteps // 100
                 self.log_dir = log_dir
                 self.save_path = os.path.join(log_dir, 'agents')
@@ -664,9 +681,7 @@ def main(args):
                 #class Struct(object): pass
                 #self.report = Struct()
                 #self.report.history = MaxSizeList(save_stats_freq)
-                self.report = self.vec_env.get_attr("history")[0]
-                for stat in self.report.keys():
-                    self.report[stat] = MaxSizeList(save_stats_freq)
+                self.report = {stat: MaxSizeList(save_stats_freq) for stat in self.vec_env.get_attr("history")[0].keys()}
 
             def _init_callback(self) -> None:
                 # Create folder if needed
@@ -693,12 +708,22 @@ def main(args):
                     # Tensorboard logging
                     #self.vec_env.env_method('store_statistics_to_file', path=figure_folder)
 
-                    # Fetch stats from history attribute and log to tensorboard
-                    stats = np.array(self.vec_env.get_attr("history"))[done_array]
+                    # Fetch the statistics of the new episodes and log to tensorboard
+                    done_indices = [int(i) for i in np.flatnonzero(done_array)]
+                    stats = self.vec_env.env_method("read_new_statistics", indices=done_indices)
                     for _env in stats:
                         for stat in _env.keys():
-                            self.logger.record('stats/'+stat, _env[stat])
-                            self.report[stat].append(_env[stat])
+                            for value in _env[stat]:
+                                self.logger.record('stats/'+stat, value)
+                                self.report[stat].append(value)
+
+                # Fetch the step profiles of all environments and log to tensorboard
+                if self.log_profile_freq is not None and self.n_calls % self.log_profile_freq == 0:
+                    profile = merge_profiles(self.vec_env.env_method("get_profile", reset=True))
+                    for stage, summary in summarize_profile(profile).items():
+                        self.logger.record('profile/'+stage+'_mean_ms', 1e3*summary['mean'])
+                        self.logger.record('profile/'+stage+'_p95_ms', 1e3*summary['p95'])
+                        self.logger.record('profile/'+stage+'_share', summary['share'])
 
                 # Update the progress bar (n_calls is automatically incremented on each step)
                 #self.bar.update(self.num_timesteps)
@@ -746,7 +771,8 @@ def main(args):
 
 
         callback = CollectStatisticsCallback(env=vec_env, total_timesteps=total_timesteps, save_stats_freq=save_stats_freq,
-                                             record_agent_freq=record_agent_freq, log_dir=agent_folder, verbose=1)
+                                             record_agent_freq=record_agent_freq, log_dir=agent_folder,
+                                             log_profile_freq=log_profile_freq, verbose=1)
 
         agent.learn(
             total_timesteps=total_timesteps,
@@ -1025,6 +1051,33 @@ if __name__ == '__main__':
         help='Only use single CPU core for training.',
         action='store_true'
     )
+    parser.add_argument(
+        '--num-cpu',
+        help='Number of processes to use for training.',
+        type=int,
+        default=8
+    )
+    parser.add_argument(
+        '--envs-per-cpu',
+        help='Number of environments simulated by each training process. If larger than 1, the vectorised gym_auv environment is used.',
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        '--lean-training',
+        help='Only keep the running episode statistics in the training environments, skipping trajectory capture.',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--log-episodes',
+        help='Log the statistics and trajectory of every training episode to one HDF5 file per environment.',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--profile-step',
+        help='Time the stages of the training environments\' steps and log them to tensorboard.',
+        action='store_true'
+    )
     parser.add_argument(
         '--stochastic',
         help='Use stochastic actions.',